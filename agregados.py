@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+import armazenamento
+
+
+def calcular_crescimento_percentual(df):
+    """Crescimento (%) entre medições consecutivas de cada base (0 na primeira e quando o anterior é 0)."""
+    df = df.sort_values(['Base', 'Data'])
+    anterior = df.groupby('Base')['Tamanho (MB)'].shift()
+    atual = df['Tamanho (MB)']
+    variacao = (atual - anterior) / anterior.where(anterior != 0) * 100
+    df['Crescimento (%)'] = variacao.fillna(0.0)
+    return df
+
+
+def regressao_em_lote(df, chaves, coluna_x, coluna_y):
+    """Regressão linear simples de cada grupo de `chaves` de uma vez, por somas agrupadas (sem laço por grupo)."""
+    x = df[coluna_x].astype(float)
+    y = df[coluna_y].astype(float)
+    somas = pd.DataFrame({'x': x, 'y': y, 'xx': x * x, 'xy': x * y, 'yy': y * y})
+    somas[chaves] = df[chaves]
+    s = somas.groupby(chaves, observed=True).agg(
+        n=('x', 'size'), sx=('x', 'sum'), sy=('y', 'sum'), sxx=('xx', 'sum'), sxy=('xy', 'sum'),
+        syy=('yy', 'sum'), x_max=('x', 'max'),
+    )
+    n = s['n'].astype(float)
+    media_x, media_y = s['sx'] / n, s['sy'] / n
+    Sxx = s['sxx'] - n * media_x ** 2
+    Sxy = s['sxy'] - n * media_x * media_y
+    Syy = s['syy'] - n * media_y ** 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inclinacao = np.where(Sxx > 0, Sxy / Sxx, 0.0)
+        variancia = np.where(n > 2, np.maximum(Syy - inclinacao * Sxy, 0.0) / (n - 2), np.nan)
+
+    return pd.DataFrame({
+        'n': s['n'],
+        'media_x': media_x,
+        'Sxx': Sxx,
+        'x_max': s['x_max'],
+        'inclinacao': inclinacao,
+        'intercepto': media_y - inclinacao * media_x,
+        'variancia': variancia,
+    }, index=s.index)
+
+
+def crescimento_no_periodo(df):
+    """Tamanho inicial e final de cada base no recorte e o crescimento entre eles (bases com 2+ medições)."""
+    tamanhos = df.sort_values(['Base', 'Data']).groupby('Base', observed=True)['Tamanho (MB)']
+    resumo = pd.DataFrame({
+        'Tamanho Inicial (MB)': tamanhos.first(),
+        'Tamanho Final (MB)': tamanhos.last(),
+        'Medições': tamanhos.size(),
+    })
+    resumo = resumo[resumo['Medições'] >= 2].drop(columns='Medições')
+    inicial, final = resumo['Tamanho Inicial (MB)'], resumo['Tamanho Final (MB)']
+    resumo['Crescimento (MB)'] = final - inicial
+    resumo['Crescimento (%)'] = ((final - inicial) / inicial.where(inicial != 0) * 100).fillna(0.0)
+    resumo = resumo.reset_index()
+    resumo['Base'] = resumo['Base'].astype(str)
+    return resumo
+
+
+def evolucao_total(df):
+    # Soma do tamanho de todas as bases do servidor por data
+    return (
+        df.groupby(['Servidor', 'Data'], as_index=False)['Tamanho (MB)'].sum()
+        .sort_values(['Servidor', 'Data'])
+    )
+
+
+def ultimo_registro_mes(df):
+    """Último registro de cada base no mês mais recente do servidor."""
+    if df.empty:
+        return df
+    ultima_data = df['Data'].max()
+    df_mes = df[(df['Data'].dt.month == ultima_data.month) & (df['Data'].dt.year == ultima_data.year)]
+    return df_mes.sort_values('Data').groupby('Base', as_index=False).last()
+
+
+def projecao_linear(df_total, dias=90):
+    """Projeção linear simples dos próximos `dias` dias a partir da série total."""
+    if len(df_total) < 2:
+        return None
+    x = df_total['Data'].map(pd.Timestamp.toordinal).to_numpy(dtype=float)
+    y = df_total['Tamanho (MB)'].to_numpy(dtype=float)
+    inclinacao, intercepto = np.polyfit(x, y, 1)
+
+    datas_futuras = pd.date_range(df_total['Data'].max() + pd.Timedelta(days=1), periods=dias)
+    previsoes = inclinacao * datas_futuras.map(pd.Timestamp.toordinal).to_numpy(dtype=float) + intercepto
+
+    return pd.DataFrame({
+        'Data': list(df_total['Data']) + list(datas_futuras),
+        'Tamanho (MB)': list(y) + list(previsoes),
+        'Tipo': ['Histórico'] * len(df_total) + ['Projeção'] * dias,
+    })
+
+
+def agregados_servidor(df, top_n=10, dias_projecao=90):
+    """Calcula de uma vez tudo o que os dashboards mostram por servidor."""
+    df = calcular_crescimento_percentual(df)
+    df_total = evolucao_total(df)
+    ultimo_mes = ultimo_registro_mes(df)
+    return {
+        'dados': df,
+        'evolucao_total': df_total,
+        'ultima_data': df['Data'].max() if not df.empty else None,
+        'top': ultimo_mes.nlargest(top_n, 'Tamanho (MB)'),
+        'projecao': projecao_linear(df_total, dias_projecao),
+    }
+
+
+def agregados_frota(fonte, servidores=None, top_n=10, dias_projecao=90):
+    """Agregados de todos os servidores, calculados em paralelo sobre as partições."""
+    return armazenamento.mapear_servidores(
+        lambda df: agregados_servidor(df, top_n, dias_projecao), fonte, servidores
+    )
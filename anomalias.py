@@ -0,0 +1,179 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+
+# Janela de deltas anteriores usada como referência para cada ponto
+JANELA = 8
+# Mínimo de deltas na janela para pontuar um ponto
+MINIMO_PONTOS = 4
+# |z| robusto acima deste valor é um pico/queda isolado
+LIMIAR_Z = 3.5
+# CUSUM sobre os z's: folga por passo, limiar de alarme e corte de cada z
+CUSUM_FOLGA = 0.5
+CUSUM_LIMIAR = 5.0
+CUSUM_CORTE = 4.0
+# Evita escala zero em bases que ficam muito tempo sem mudar de tamanho
+ESCALA_MINIMA_MB = 0.5
+
+CHAVES = ['Servidor', 'Base']
+COLUNAS_JANELA = [f'delta_{k}' for k in range(JANELA)]
+
+
+def caminho_anomalias(fonte):
+    return os.path.join(armazenamento.pasta_fonte(fonte), '_anomalias.parquet')
+
+
+def caminho_estado(fonte):
+    return os.path.join(armazenamento.pasta_fonte(fonte), '_estado_anomalias.parquet')
+
+
+def _referencia(janela):
+    """Mediana e escala robusta (MAD) de cada linha da matriz de deltas anteriores."""
+    with warnings.catch_warnings():
+        # Linhas só com NaN (séries novas) geram aviso de fatia vazia
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mediana = np.nanmedian(janela, axis=1)
+        mad = np.nanmedian(np.abs(janela - mediana[:, None]), axis=1)
+    escala = np.maximum(1.4826 * np.nan_to_num(mad), ESCALA_MINIMA_MB)
+    pontos = np.sum(~np.isnan(janela), axis=1)
+    return mediana, escala, pontos
+
+
+def _pontuar(delta, janela):
+    mediana, escala, pontos = _referencia(janela)
+    z = (delta - mediana) / escala
+    return np.where((pontos >= MINIMO_PONTOS) & ~np.isnan(delta), z, np.nan)
+
+
+def _cusum(z, alta_anterior, queda_anterior):
+    """Um passo do CUSUM bilateral; zera o acumulador que disparou."""
+    z = np.clip(np.nan_to_num(z), -CUSUM_CORTE, CUSUM_CORTE)
+    alta = np.maximum(0.0, alta_anterior + z - CUSUM_FOLGA)
+    queda = np.maximum(0.0, queda_anterior - z - CUSUM_FOLGA)
+    mudanca = np.where(alta > CUSUM_LIMIAR, 1, np.where(queda > CUSUM_LIMIAR, -1, 0))
+    cusum = np.maximum(alta, queda)
+    alta = np.where(mudanca != 0, 0.0, alta)
+    queda = np.where(mudanca != 0, 0.0, queda)
+    return alta, queda, cusum, mudanca
+
+
+def _classificar(df, z, cusum, mudanca):
+    df['Z Robusto'] = z
+    df['CUSUM'] = cusum
+    z_abs = np.abs(np.nan_to_num(z))
+    pico = z_abs > LIMIAR_Z
+    df['Tipo'] = np.select(
+        [pico & (z > 0), pico, mudanca > 0, mudanca < 0],
+        ['Pico', 'Queda', 'Mudança de nível (alta)', 'Mudança de nível (queda)'],
+        default='',
+    )
+    # CUSUM e |z| na mesma escala para ordenar o feed
+    df['Pontuação'] = np.maximum(z_abs, cusum * LIMIAR_Z / CUSUM_LIMIAR)
+    df['Anomalia'] = df['Tipo'] != ''
+    return df
+
+
+def pontuar(df):
+    """Pontua todos os pontos (Servidor, Base, Data) de uma vez.
+
+    Devolve (pontos pontuados, estado final por série) para permitir atualização incremental.
+    """
+    df = df[CHAVES + ['Data', 'Tamanho (MB)']].sort_values(CHAVES + ['Data'], ignore_index=True)
+    codigo = df.groupby(CHAVES, sort=False, observed=True).ngroup().to_numpy()
+    delta = df.groupby(codigo)['Tamanho (MB)'].diff()
+    df['Delta (MB)'] = delta
+
+    # Matriz (pontos x JANELA) com os deltas anteriores de cada ponto
+    por_serie = delta.groupby(codigo)
+    anteriores = np.column_stack([por_serie.shift(k).to_numpy() for k in range(1, JANELA + 1)])
+    z = _pontuar(delta.to_numpy(), anteriores)
+
+    # CUSUM é sequencial no tempo, mas vetorizado entre séries: um passo por posição
+    posicao = df.groupby(codigo).cumcount().to_numpy()
+    n_series = codigo.max() + 1 if len(codigo) else 0
+    alta, queda = np.zeros(n_series), np.zeros(n_series)
+    cusum, mudanca = np.zeros(len(df)), np.zeros(len(df), dtype=int)
+    ordem = np.argsort(posicao, kind='stable')
+    limites = np.cumsum(np.bincount(posicao))[:-1] if len(posicao) else []
+    for linhas in np.split(ordem, limites):
+        series = codigo[linhas]
+        alta[series], queda[series], cusum[linhas], mudanca[linhas] = _cusum(
+            z[linhas], alta[series], queda[series]
+        )
+
+    df = _classificar(df, z, cusum, mudanca)
+
+    # Estado: último ponto de cada série com a janela que servirá de referência ao próximo
+    ultimos = df.groupby(codigo).tail(1).index.to_numpy()
+    janela_final = np.column_stack([delta.to_numpy()[ultimos], anteriores[ultimos, :JANELA - 1]])
+    estado = df.loc[ultimos, CHAVES + ['Data', 'Tamanho (MB)']].reset_index(drop=True)
+    estado[COLUNAS_JANELA] = janela_final
+    estado['CUSUM Alta'] = alta[codigo[ultimos]]
+    estado['CUSUM Queda'] = queda[codigo[ultimos]]
+    return df, estado
+
+
+def atualizar_estado(estado, snapshot):
+    """Pontua um novo snapshot diário usando só o estado guardado, sem reler o histórico."""
+    snapshot = snapshot[CHAVES + ['Data', 'Tamanho (MB)']]
+    junto = snapshot.merge(estado, on=CHAVES, how='left', suffixes=('', ' Anterior'))
+    # Ignora pontos que já foram vistos (snapshot repetido ou fora de ordem)
+    junto = junto[junto['Data Anterior'].isna() | (junto['Data'] > junto['Data Anterior'])].reset_index(drop=True)
+
+    janela = junto[COLUNAS_JANELA].to_numpy(dtype=float)
+    delta = (junto['Tamanho (MB)'] - junto['Tamanho (MB) Anterior']).to_numpy()
+    z = _pontuar(delta, janela)
+    alta, queda, cusum, mudanca = _cusum(
+        z, junto['CUSUM Alta'].fillna(0.0).to_numpy(), junto['CUSUM Queda'].fillna(0.0).to_numpy()
+    )
+
+    pontos = junto[CHAVES + ['Data', 'Tamanho (MB)']].copy()
+    pontos['Delta (MB)'] = delta
+    pontos = _classificar(pontos, z, cusum, mudanca)
+
+    novo = junto[CHAVES + ['Data', 'Tamanho (MB)']].copy()
+    novo[COLUNAS_JANELA] = np.column_stack([delta, janela[:, :JANELA - 1]])
+    novo['CUSUM Alta'] = alta
+    novo['CUSUM Queda'] = queda
+    restantes = estado.merge(novo[CHAVES], on=CHAVES, how='left', indicator=True)
+    restantes = restantes[restantes['_merge'] == 'left_only'].drop(columns='_merge')
+    return pontos, pd.concat([restantes, novo], ignore_index=True)
+
+
+def recalcular(fonte, df):
+    """Varredura completa: usada quando as partições são reconstruídas."""
+    pontos, estado = pontuar(df)
+    armazenamento.gravar_atomico(pontos[pontos['Anomalia']].drop(columns='Anomalia'), caminho_anomalias(fonte))
+    armazenamento.gravar_atomico(estado, caminho_estado(fonte))
+
+
+def atualizar(fonte, snapshot):
+    """Atualização incremental com novos snapshots; acrescenta as anomalias ao feed."""
+    estado = pd.read_parquet(caminho_estado(fonte))
+    # Cada data é um passo (vetorizado entre todas as séries), em ordem cronológica
+    novas = []
+    for _, snapshot_dia in snapshot.groupby('Data', sort=True):
+        pontos, estado = atualizar_estado(estado, snapshot_dia)
+        novas.append(pontos[pontos['Anomalia']].drop(columns='Anomalia'))
+    novas = pd.concat(novas, ignore_index=True) if novas else carregar_feed(fonte).iloc[:0]
+    feed = pd.concat([carregar_feed(fonte), novas], ignore_index=True)
+    armazenamento.gravar_atomico(feed, caminho_anomalias(fonte))
+    armazenamento.gravar_atomico(estado, caminho_estado(fonte))
+    return novas
+
+
+def carregar_feed(fonte):
+    return pd.read_parquet(caminho_anomalias(fonte))
+
+
+def ranking(feed, servidores=None, desde=None, limite=50):
+    """Feed ordenado pela pontuação, opcionalmente filtrado por servidor e data."""
+    if servidores is not None:
+        feed = feed[feed['Servidor'].isin(servidores)]
+    if desde is not None:
+        feed = feed[feed['Data'] >= pd.Timestamp(desde)]
+    return feed.nlargest(limite, 'Pontuação')
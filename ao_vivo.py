@@ -0,0 +1,158 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Probabilidades ao vivo: com o minuto e o placar de cada jogo, os gols esperados pré-jogo são
+# reduzidos ao tempo que falta e a matriz de gols restantes (Poisson com a correção de Dixon-Coles
+# sobre o placar final) dá o 1X2 e os totais. Todos os jogos são recalculados numa única chamada
+# Duração média de um jogo com acréscimos, em minutos
+DURACAO = 95
+MAX_GOLS = 10
+LINHAS_TOTAIS = [0.5, 1.5, 2.5, 3.5, 4.5]
+COLUNAS = ['casa', 'fora', 'minuto', 'gols_casa', 'gols_fora', 'lambda_casa', 'lambda_fora']
+_FATORIAIS = np.r_[1.0, np.cumprod(np.arange(1, MAX_GOLS, dtype='float64'))]
+
+
+def _pmf(lambdas, max_gols):
+    # Sem scipy: exp(-l) * l^k / k! direto em NumPy, bem mais rápido para muitos jogos
+    k = np.arange(max_gols)
+    return np.exp(-lambdas)[:, None] * lambdas[:, None] ** k / _FATORIAIS[:max_gols]
+
+
+def matriz_restante(lambda_casa, lambda_fora, minuto, gols_casa, gols_fora, rho=0.0, max_gols=MAX_GOLS):
+    """P(gols que ainda saem: casa x fora) de cada jogo, shape (jogos, max_gols, max_gols)."""
+    lambda_casa, lambda_fora = np.asarray(lambda_casa, 'float64'), np.asarray(lambda_fora, 'float64')
+    restante = np.clip((DURACAO - np.asarray(minuto, 'float64')) / DURACAO, 0, 1)
+    matriz = _pmf(lambda_casa * restante, max_gols)[:, :, None] * _pmf(lambda_fora * restante, max_gols)[:, None, :]
+    if rho:
+        # A correção vale para o placar final: só pesa onde placar atual + gols restantes fica até 1x1
+        k = np.arange(max_gols)
+        final_casa = np.asarray(gols_casa)[:, None, None] + k[None, :, None]
+        final_fora = np.asarray(gols_fora)[:, None, None] + k[None, None, :]
+        lc, lf = lambda_casa[:, None, None], lambda_fora[:, None, None]
+        matriz = matriz * np.select(
+            [(final_casa == 0) & (final_fora == 0), (final_casa == 0) & (final_fora == 1),
+             (final_casa == 1) & (final_fora == 0), (final_casa == 1) & (final_fora == 1)],
+            [1 - lc * lf * rho, 1 + lc * rho, 1 + lf * rho, 1 - rho],
+            1.0,
+        )
+    return matriz / matriz.sum(axis=(1, 2), keepdims=True)
+
+
+def atualizar(jogos, rho=0.0, linhas=LINHAS_TOTAIS, max_gols=MAX_GOLS):
+    """1X2 e over/under de cada linha para todos os jogos de `jogos` (colunas de COLUNAS), de uma vez."""
+    gols_casa = jogos['gols_casa'].to_numpy(dtype=np.int64)
+    gols_fora = jogos['gols_fora'].to_numpy(dtype=np.int64)
+    matriz = matriz_restante(jogos['lambda_casa'], jogos['lambda_fora'], jogos['minuto'],
+                             gols_casa, gols_fora, rho, max_gols)
+    k = np.arange(max_gols)
+    saldo = (gols_casa - gols_fora)[:, None, None] + k[None, :, None] - k[None, None, :]
+    total = (gols_casa + gols_fora)[:, None, None] + k[None, :, None] + k[None, None, :]
+    probabilidades = {
+        'Win': (matriz * (saldo > 0)).sum(axis=(1, 2)),
+        'Draw': (matriz * (saldo == 0)).sum(axis=(1, 2)),
+        'Loss': (matriz * (saldo < 0)).sum(axis=(1, 2)),
+    }
+    for linha in linhas:
+        probabilidades[f'Over {linha}'] = (matriz * (total > linha)).sum(axis=(1, 2))
+    return jogos[['casa', 'fora', 'minuto', 'gols_casa', 'gols_fora']].reset_index(drop=True).assign(**probabilidades)
+
+
+def ler_arquivo(caminho, com_lambdas=True):
+    """Jogos ao vivo de um CSV ou JSON (lista de registros) com as colunas de COLUNAS.
+
+    Com com_lambdas=False os lambdas pré-jogo podem faltar (vêm depois do modelo).
+    """
+    df = pd.read_json(caminho) if caminho.lower().endswith('.json') else pd.read_csv(caminho)
+    faltando = [c for c in (COLUNAS if com_lambdas else COLUNAS[:5]) if c not in df.columns]
+    if faltando:
+        raise ValueError(f'{caminho}: faltam as colunas {faltando}')
+    return df
+
+
+def lambdas_do_modelo(liga, jogos):
+    """Completa lambda_casa/lambda_fora com a previsão do modelo treinado para a rodada de cada jogo."""
+    import modelo
+    import resultados
+    historico = resultados.carregar([liga])
+    temporada = historico['temporada'].max()
+    pendentes = historico[(historico['temporada'] == temporada) & historico['gols_casa'].isna()]
+    rodadas = pendentes.merge(jogos[['casa', 'fora']], on=['casa', 'fora'])['rodada'].unique()
+    artefato = modelo.carregar(liga)
+    previsoes = pd.concat([modelo.prever(artefato, historico, temporada, r) for r in rodadas], ignore_index=True)
+    completos = jogos.drop(columns=['lambda_casa', 'lambda_fora'], errors='ignore').merge(
+        previsoes[['casa', 'fora', 'lambda_casa', 'lambda_fora']], on=['casa', 'fora'], how='left'
+    )
+    return completos, artefato['rho']
+
+
+def feed_simulado(jogos, passo=1, semente=0):
+    """Feed de teste: o placar de cada jogo evolui minuto a minuto com gols sorteados pelos lambdas.
+
+    A cada `passo` minutos devolve um retrato de todos os jogos (mesmas colunas de COLUNAS).
+    """
+    rng = np.random.default_rng(semente)
+    minutos = np.arange(1, DURACAO + 1)
+    # Gols por minuto de cada jogo, sorteados de uma vez: (jogos, minutos)
+    gols_casa = rng.poisson(jogos['lambda_casa'].to_numpy()[:, None] / DURACAO, (len(jogos), DURACAO)).cumsum(axis=1)
+    gols_fora = rng.poisson(jogos['lambda_fora'].to_numpy()[:, None] / DURACAO, (len(jogos), DURACAO)).cumsum(axis=1)
+    for i in range(passo - 1, DURACAO, passo):
+        yield jogos.assign(minuto=minutos[i], gols_casa=gols_casa[:, i], gols_fora=gols_fora[:, i])[COLUNAS]
+
+
+def jogos_sinteticos(n, semente=0):
+    rng = np.random.default_rng(semente)
+    return pd.DataFrame({
+        'casa': [f'Casa {i}' for i in range(n)],
+        'fora': [f'Fora {i}' for i in range(n)],
+        'minuto': 0, 'gols_casa': 0, 'gols_fora': 0,
+        'lambda_casa': rng.uniform(0.8, 2.2, n),
+        'lambda_fora': rng.uniform(0.5, 1.8, n),
+    })
+
+
+def _mostrar(atualizado, duracao):
+    print(atualizado.round(3).to_string(index=False))
+    print(f'⏳ {len(atualizado)} jogo(s) recalculados em {duracao * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Atualiza as probabilidades de jogos em andamento.')
+    parser.add_argument('--arquivo', help='CSV/JSON com casa, fora, minuto, gols_casa, gols_fora e os lambdas pré-jogo')
+    parser.add_argument('--liga', help='Sem lambdas no arquivo: usa a previsão do modelo treinado desta liga')
+    parser.add_argument('--rho', type=float, default=0.0)
+    parser.add_argument('--acompanhar', type=float, metavar='SEGUNDOS',
+                        help='Recalcula sempre que o arquivo mudar, verificando a cada SEGUNDOS')
+    parser.add_argument('--simular', type=int, metavar='JOGOS', help='Sem arquivo: feed de teste com JOGOS jogos')
+    parser.add_argument('--passo', type=int, default=5, help='Minutos entre retratos do feed de teste')
+    args = parser.parse_args()
+
+    if args.simular:
+        tempos = []
+        for retrato in feed_simulado(jogos_sinteticos(args.simular), args.passo):
+            inicio = time.perf_counter()
+            atualizado = atualizar(retrato, args.rho)
+            tempos.append(time.perf_counter() - inicio)
+        print(atualizado.head(10).round(3).to_string(index=False))
+        print(f'✅ {len(tempos)} retratos de {args.simular} jogos: mediana {np.median(tempos) * 1000:.1f} ms, '
+              f'máximo {np.max(tempos) * 1000:.1f} ms')
+    elif args.arquivo:
+        ultima_mudanca = None
+        while True:
+            mudanca = os.path.getmtime(args.arquivo)
+            if mudanca != ultima_mudanca:
+                ultima_mudanca = mudanca
+                jogos, rho = ler_arquivo(args.arquivo, com_lambdas=not args.liga), args.rho
+                if args.liga:
+                    jogos, rho = lambdas_do_modelo(args.liga, jogos)
+                inicio = time.perf_counter()
+                atualizado = atualizar(jogos, rho)
+                _mostrar(atualizado, time.perf_counter() - inicio)
+            if not args.acompanhar:
+                break
+            time.sleep(args.acompanhar)
+    else:
+        parser.error('informe --arquivo ou --simular')
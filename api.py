@@ -0,0 +1,306 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import urllib.parse
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+import anomalias
+import armazenamento
+import capacidade
+import previsao
+import resumos
+import tendencias
+
+# API HTTP somente leitura com as tabelas que a ingestão e os jobs já deixam prontas (resumos,
+# previsões, capacidade, anomalias) e as probabilidades da rodada do modelo de cada liga, em JSON ou
+# Arrow. Nada é recalculado por requisição: as tabelas ficam em memória até o arquivo mudar, e a
+# versão dos arquivos + a consulta formam o ETag (If-None-Match responde 304 sem tocar nos dados)
+PORTA = 8780
+LIMITE_PADRAO = 500
+LIMITE_MAXIMO = 10_000
+MAX_AGE_S = 60
+# Respostas já codificadas guardadas (as consultas repetidas não refiltram nem reserializam)
+RESPOSTAS_EM_CACHE = 256
+ARROW = 'application/vnd.apache.arrow.stream'
+JSON = 'application/json; charset=utf-8'
+# Parâmetros que não são filtro de coluna
+PARAMETROS = {'desde', 'ate', 'colunas', 'ordenar', 'limite', 'deslocamento', 'formato'}
+# Coluna usada por desde/ate, na primeira que a tabela tiver
+COLUNAS_DATA = ['Data', 'Última Data', 'Mês']
+
+
+def _resumo(nome):
+    return (lambda fonte: [resumos.caminho_resumo(fonte, nome)], lambda fonte: resumos.carregar(fonte, nome))
+
+
+# Tabela da frota -> (arquivos de que depende, leitura); os caminhos são os dos próprios módulos
+TABELAS_FROTA = {
+    'crescimento': _resumo('crescimento_base'),
+    'ranking_crescimento': (
+        lambda fonte: [resumos.caminho_resumo(fonte, 'crescimento_base')],
+        lambda fonte: resumos.ranking_crescimento(resumos.carregar(fonte, 'crescimento_base')),
+    ),
+    'totais_diarios': _resumo('totais_diarios'),
+    'totais_mensais': _resumo('totais_mensais'),
+    'ultimo_por_base': _resumo('ultimo_por_base'),
+    'projecoes': (lambda fonte: [previsao.caminho_previsoes(fonte)], previsao.carregar_previsoes),
+    'modelos_previsao': (lambda fonte: [previsao.caminho_modelos(fonte)], previsao.carregar_modelos),
+    'capacidade': (lambda fonte: [capacidade.caminho_capacidade(fonte)], capacidade.carregar),
+    'anomalias': (lambda fonte: [anomalias.caminho_anomalias(fonte)], anomalias.carregar_feed),
+    'tendencias': (lambda fonte: [tendencias.caminho_tendencias(fonte)], tendencias.carregar),
+}
+
+
+class ErroConsulta(ValueError):
+    """Consulta inválida (parâmetro, coluna ou valor); vira uma resposta 400."""
+
+
+def _versao(arquivos):
+    # FileNotFoundError se alguma tabela ainda não foi gerada
+    return tuple((os.path.basename(a), os.stat(a).st_mtime_ns, os.stat(a).st_size) for a in arquivos)
+
+
+def _ligas():
+    import resultados
+    return {resultados.nome_liga(liga): liga for liga in resultados.LIGAS}
+
+
+def _arquivos_liga(liga):
+    import modelo
+    import resultados
+    return [modelo.caminho_atual(liga), resultados.caminho_temporada(liga, resultados.LIGAS[liga]['temporada'])]
+
+
+def probabilidades_liga(liga):
+    """1X2 e gols esperados do modelo em uso para os jogos das rodadas pendentes da temporada atual."""
+    import modelo
+    import resultados
+    metadados = modelo.versao_atual(liga)
+    if metadados is None:
+        raise FileNotFoundError(f'{liga}: nenhum modelo treinado (python modelo.py)')
+    temporada = resultados.LIGAS[liga]['temporada']
+    jogos = resultados.carregar([liga])
+    artefato = modelo.carregar(liga, metadados['versao'])
+    pendentes = resultados.rodadas_pendentes(jogos[jogos['temporada'] == temporada])
+    partes = [modelo.prever(artefato, jogos, temporada, rodada) for rodada in pendentes]
+    colunas = ['rodada', 'casa', 'fora', 'lambda_casa', 'lambda_fora', 'Win', 'Draw', 'Loss']
+    tabela = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=colunas)
+    return tabela[colunas].assign(temporada=temporada, versao_modelo=metadados['versao'])
+
+
+def _valores(coluna, texto):
+    valores = texto.split(',')
+    try:
+        if pd.api.types.is_datetime64_any_dtype(coluna):
+            return pd.to_datetime(valores)
+        if pd.api.types.is_numeric_dtype(coluna):
+            return pd.to_numeric(valores)
+    except (ValueError, TypeError) as erro:
+        raise ErroConsulta(f'valor inválido para {coluna.name}: {texto}') from erro
+    return valores
+
+
+def consultar(df, parametros):
+    """Filtra, ordena, projeta e pagina `df`; devolve (página, total antes da paginação, limite, deslocamento)."""
+    desconhecidos = [p for p in parametros if p not in PARAMETROS and p not in df.columns]
+    if desconhecidos:
+        raise ErroConsulta(f'parâmetro(s) desconhecido(s) {desconhecidos}; colunas: {list(df.columns)}')
+    mascara = pd.Series(True, index=df.index)
+    for nome, texto in parametros.items():
+        if nome in df.columns:
+            mascara &= df[nome].isin(_valores(df[nome], texto))
+    coluna_data = next((c for c in COLUNAS_DATA if c in df.columns), None)
+    for nome, comparar in (('desde', pd.Series.ge), ('ate', pd.Series.le)):
+        if nome in parametros:
+            if coluna_data is None:
+                raise ErroConsulta(f'{nome}: a tabela não tem coluna de data')
+            mascara &= comparar(df[coluna_data], _valores(df[coluna_data], parametros[nome])[0])
+    df = df[mascara]
+
+    if 'ordenar' in parametros:
+        chaves = parametros['ordenar'].split(',')
+        colunas = [c.lstrip('-') for c in chaves]
+        if any(c not in df.columns for c in colunas):
+            raise ErroConsulta(f'ordenar: coluna inexistente em {colunas}')
+        df = df.sort_values(colunas, ascending=[not c.startswith('-') for c in chaves], kind='stable')
+    if 'colunas' in parametros:
+        colunas = parametros['colunas'].split(',')
+        if any(c not in df.columns for c in colunas):
+            raise ErroConsulta(f'colunas: coluna inexistente em {colunas}')
+        df = df[colunas]
+
+    try:
+        limite = min(int(parametros.get('limite', LIMITE_PADRAO)), LIMITE_MAXIMO)
+        deslocamento = max(int(parametros.get('deslocamento', 0)), 0)
+    except ValueError as erro:
+        raise ErroConsulta('limite e deslocamento devem ser inteiros') from erro
+    if limite < 1:
+        raise ErroConsulta(f'limite deve ser de 1 a {LIMITE_MAXIMO}')
+    return df.iloc[deslocamento:deslocamento + limite], len(df), limite, deslocamento
+
+
+def _json(pagina, total, limite, deslocamento):
+    # to_json já serializa as linhas (datas em ISO); o envelope é montado em volta do texto
+    registros = pagina.to_json(orient='records', date_format='iso', force_ascii=False)
+    return (f'{{"total": {total}, "limite": {limite}, "deslocamento": {deslocamento}, '
+            f'"dados": {registros}}}').encode('utf-8')
+
+
+def _arrow(pagina):
+    import pyarrow as pa
+    tabela = pa.Table.from_pandas(pagina, preserve_index=False)
+    saida = pa.BufferOutputStream()
+    with pa.ipc.new_stream(saida, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return saida.getvalue().to_pybytes()
+
+
+class _Tratador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _responder(self, status, corpo=b'', tipo=JSON, cabecalhos=None):
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _erro(self, status, mensagem):
+        self._responder(status, json.dumps({'erro': mensagem}, ensure_ascii=False).encode('utf-8'))
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        partes = [urllib.parse.unquote(p) for p in url.path.strip('/').split('/') if p]
+        parametros = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            if not partes:
+                return self._responder(200, json.dumps(self.server.indice(), ensure_ascii=False).encode('utf-8'))
+            if partes == ['ligas']:
+                return self._responder(200, json.dumps(self.server.lista_ligas(), ensure_ascii=False).encode('utf-8'))
+            if len(partes) == 3 and partes[0] == 'frota' and partes[1] in armazenamento.FONTES \
+                    and partes[2] in TABELAS_FROTA:
+                arquivos, carregar = TABELAS_FROTA[partes[2]]
+                return self._tabela(('frota', partes[1], partes[2]), arquivos(partes[1]),
+                                    lambda: carregar(partes[1]), parametros)
+            if len(partes) == 3 and partes[0] == 'ligas' and partes[2] == 'probabilidades' \
+                    and partes[1] in _ligas():
+                liga = _ligas()[partes[1]]
+                return self._tabela(('ligas', partes[1], partes[2]), _arquivos_liga(liga),
+                                    lambda: probabilidades_liga(liga), parametros)
+            self._erro(404, f'rota inexistente: {url.path}')
+        except FileNotFoundError as erro:
+            self._erro(404, f'tabela ainda não gerada: {erro}')
+        except ErroConsulta as erro:
+            self._erro(400, str(erro))
+
+    def _tabela(self, chave, arquivos, carregar, parametros):
+        versao = _versao(arquivos)
+        formato = parametros.pop('formato', None) or ('arrow' if ARROW in self.headers.get('Accept', '') else 'json')
+        if formato not in ('json', 'arrow'):
+            raise ErroConsulta('formato deve ser json ou arrow')
+        consulta = tuple(sorted(parametros.items()))
+        etag = '"' + hashlib.blake2b(repr((chave, versao, consulta, formato)).encode(), digest_size=16).hexdigest() + '"'
+        cabecalhos = {'ETag': etag, 'Cache-Control': f'public, max-age={self.server.max_age}', 'Vary': 'Accept'}
+        if etag in (t.strip() for t in self.headers.get('If-None-Match', '').split(',')):
+            return self._responder(304, cabecalhos=cabecalhos)
+
+        resposta = self.server.resposta_em_cache(etag)
+        if resposta is None:
+            df = self.server.tabela(chave, versao, carregar)
+            pagina, total, limite, deslocamento = consultar(df, parametros)
+            corpo = _arrow(pagina) if formato == 'arrow' else _json(pagina, total, limite, deslocamento)
+            extras = {'X-Total-Count': str(total)}
+            # Sem avanço (limite 0) o rel="next" apontaria para a mesma página
+            if limite > 0 and deslocamento + limite < total:
+                proxima = urllib.parse.urlencode({**parametros, 'formato': formato, 'deslocamento': deslocamento + limite})
+                extras['Link'] = f'</{"/".join(chave)}?{proxima}>; rel="next"'
+            resposta = (corpo, ARROW if formato == 'arrow' else JSON, extras)
+            self.server.guardar_resposta(etag, resposta)
+        corpo, tipo, extras = resposta
+        self._responder(200, corpo, tipo, {**cabecalhos, **extras})
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorApi(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, max_age=MAX_AGE_S):
+        super().__init__(endereco, _Tratador)
+        self.max_age = max_age
+        self._trava = threading.Lock()
+        self._tabelas = {}
+        self._respostas = OrderedDict()
+
+    @property
+    def url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def tabela(self, chave, versao, carregar):
+        """Tabela em memória; relida só quando a versão dos arquivos muda."""
+        with self._trava:
+            guardada = self._tabelas.get(chave)
+        if guardada is not None and guardada[0] == versao:
+            return guardada[1]
+        df = carregar()
+        if df is None:
+            raise FileNotFoundError('/'.join(chave))
+        with self._trava:
+            self._tabelas[chave] = (versao, df)
+        return df
+
+    def resposta_em_cache(self, etag):
+        with self._trava:
+            resposta = self._respostas.get(etag)
+            if resposta is not None:
+                self._respostas.move_to_end(etag)
+            return resposta
+
+    def guardar_resposta(self, etag, resposta):
+        with self._trava:
+            self._respostas[etag] = resposta
+            while len(self._respostas) > RESPOSTAS_EM_CACHE:
+                self._respostas.popitem(last=False)
+
+    def indice(self):
+        return {
+            'frota': [f'/frota/{fonte}/{tabela}' for fonte in armazenamento.FONTES for tabela in TABELAS_FROTA],
+            'ligas': [f'/ligas/{slug}/probabilidades' for slug in _ligas()],
+            'parametros': sorted(PARAMETROS) + ['<coluna>=v1,v2'],
+        }
+
+    def lista_ligas(self):
+        import modelo
+        import resultados
+        return [
+            {'liga': liga, 'slug': slug, 'temporada': resultados.LIGAS[liga]['temporada'],
+             'versao_modelo': (modelo.versao_atual(liga) or {}).get('versao')}
+            for slug, liga in _ligas().items()
+        ]
+
+
+def iniciar(porta=0, host='127.0.0.1', max_age=MAX_AGE_S):
+    """Sobe a API numa thread (porta 0 = qualquer livre); a URL fica em `servidor.url`."""
+    servidor = ServidorApi((host, porta), max_age)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='API HTTP somente leitura com as tabelas pré-calculadas.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=PORTA)
+    parser.add_argument('--max-age', type=int, default=MAX_AGE_S, help='Cache-Control max-age das respostas (s)')
+    args = parser.parse_args()
+
+    servidor = ServidorApi((args.host, args.porta), args.max_age)
+    print(f'✅ API em {servidor.url} (índice das rotas em {servidor.url}/)')
+    servidor.serve_forever()
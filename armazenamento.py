@@ -0,0 +1,197 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import series
+
+# Pasta raiz dos dados (pode ser trocada por variável de ambiente, ex.: dados sintéticos)
+PASTA_DADOS = os.environ.get('DASHBOARD_PASTA_DADOS', 'data_raw')
+PASTA_PARTICOES = os.path.join(PASTA_DADOS, 'particionado')
+
+# Aba do Excel usada pelos dashboards
+ABA_CRESCIMENTO = 'Crescimento (%)'
+
+# Fontes conhecidas: arquivo de origem e formato da data
+FONTES = {
+    'saida': {'excel': 'saida.xlsx', 'dayfirst': False},
+    'saida_bancos': {'excel': 'saida_bancos.xlsx', 'dayfirst': True},
+}
+
+# Representação compacta em memória: chaves repetidas viram categorias e as medidas
+# vão para float32 quando o maior erro de arredondamento fica dentro da tolerância
+COLUNAS_CATEGORICAS = ['Servidor', 'Base']
+TOLERANCIA_FLOAT32 = {'Tamanho (MB)': 0.01, 'Diferença (MB)': 0.01, 'Crescimento (%)': 0.001}
+
+
+def ordem_servidor(servidor):
+    # Ordena 's2' antes de 's10'
+    return [int(p) if p.isdigit() else p for p in re.split(r'(\d+)', str(servidor))]
+
+
+def pasta_fonte(fonte):
+    return os.path.join(PASTA_PARTICOES, fonte)
+
+
+def caminho_particao(fonte, servidor):
+    return os.path.join(pasta_fonte(fonte), f'Servidor={servidor}.parquet')
+
+
+def caminho_excel(fonte):
+    return os.path.join(PASTA_DADOS, FONTES[fonte]['excel'])
+
+
+def gravar_atomico(df, caminho):
+    # Grava em arquivo temporário e troca de uma vez para nunca expor arquivo incompleto
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.tmp'
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def particionar(df, fonte):
+    """Grava um DataFrame com coluna 'Servidor' como uma partição por servidor (séries por trechos, series.py)."""
+    servidores = []
+    for servidor, df_servidor in df.groupby('Servidor', sort=False):
+        series.gravar(caminho_particao(fonte, servidor), df_servidor)
+        servidores.append(servidor)
+
+    # Remove partições de servidores que não existem mais na origem
+    for servidor in set(listar_servidores(fonte)) - set(servidores):
+        os.remove(caminho_particao(fonte, servidor))
+
+    return sorted(servidores, key=ordem_servidor)
+
+
+def acrescentar(df, fonte):
+    """Acrescenta novas medições às partições; a medição mais recente de (Base, Data) prevalece."""
+    for servidor, novos in df.groupby('Servidor', sort=False):
+        caminho = caminho_particao(fonte, servidor)
+        if os.path.exists(caminho) and not series.codificado(caminho):
+            # Partição no formato antigo (uma linha por medição): convertida para trechos junto com os novos
+            novos = pd.concat([pd.read_parquet(caminho), novos], ignore_index=True)
+            series.gravar(caminho, novos)
+        else:
+            series.estender(caminho, novos)
+
+
+def particionar_excel(fonte):
+    """Lê o Excel da fonte e mescla suas linhas nas partições Parquet (uma por servidor).
+
+    As partições são a origem: medições que não estão no Excel (ex.: snapshots do coletor) continuam
+    gravadas, e para o mesmo (Servidor, Base, Data) vale a linha do Excel.
+    """
+    df = pd.read_excel(caminho_excel(fonte), sheet_name=ABA_CRESCIMENTO)
+    df['Data'] = pd.to_datetime(df['Data'], dayfirst=FONTES[fonte]['dayfirst'])
+    acrescentar(df, fonte)
+    # Servidores que só existem nas partições também ficam marcados como conferidos com este Excel
+    # (particoes_desatualizadas compara o Excel com a partição mais antiga)
+    for servidor in set(listar_servidores(fonte)) - set(df['Servidor'].astype(str)):
+        os.utime(caminho_particao(fonte, servidor))
+    return listar_servidores(fonte)
+
+
+def particoes_desatualizadas(fonte):
+    servidores = listar_servidores(fonte)
+    if not servidores:
+        return True
+    if not os.path.exists(caminho_excel(fonte)):
+        return False
+    mais_antiga = min(os.path.getmtime(caminho_particao(fonte, s)) for s in servidores)
+    return os.path.getmtime(caminho_excel(fonte)) > mais_antiga
+
+
+def listar_servidores(fonte):
+    """Descobre os servidores a partir das partições gravadas."""
+    pasta = pasta_fonte(fonte)
+    if not os.path.isdir(pasta):
+        return []
+    servidores = [
+        m.group(1) for m in (re.fullmatch(r'Servidor=(.+)\.parquet', nome) for nome in os.listdir(pasta)) if m
+    ]
+    return sorted(servidores, key=ordem_servidor)
+
+
+def assinatura(fonte):
+    # Muda sempre que alguma partição, tabela derivada ou o dataset publicado é regravado; usada como chave de cache
+    pasta = pasta_fonte(fonte)
+    if not os.path.isdir(pasta):
+        return ()
+    return tuple(sorted(
+        (nome, os.path.getmtime(os.path.join(pasta, nome)))
+        for nome in os.listdir(pasta) if nome.endswith(('.parquet', '.arrow'))
+    ))
+
+
+def compactar(df):
+    """Mesmos dados com tipos compactos: categorias, datetime64 e float32 onde a precisão permite."""
+    colunas = {}
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            categorias = sorted(df[coluna].dropna().unique(), key=ordem_servidor)
+            colunas[coluna] = pd.Categorical(df[coluna], categories=categorias)
+    if 'Data' in df and not pd.api.types.is_datetime64_any_dtype(df['Data']):
+        colunas['Data'] = pd.to_datetime(df['Data'])
+    for coluna, tolerancia in TOLERANCIA_FLOAT32.items():
+        if coluna in df and df[coluna].dtype == np.float64:
+            compacta = df[coluna].astype(np.float32)
+            # `not >` também aceita coluna vazia ou só com NaN
+            if not (compacta.astype(np.float64) - df[coluna]).abs().max() > tolerancia:
+                colunas[coluna] = compacta
+    return df.assign(**colunas) if colunas else df
+
+
+def recortar(df, mascara):
+    """Linhas de `df` onde `mascara` é verdadeira, com as categorias reduzidas às presentes no recorte.
+
+    Gráficos e agrupamentos por categoria passam a enxergar só as bases/servidores do recorte.
+    """
+    recorte = df.take(np.flatnonzero(mascara))
+    for coluna in recorte.columns.intersection(COLUNAS_CATEGORICAS):
+        if isinstance(recorte[coluna].dtype, pd.CategoricalDtype):
+            recorte[coluna] = recorte[coluna].cat.remove_unused_categories()
+    return recorte
+
+
+def carregar_servidor(fonte, servidor, colunas=None, desde=None, ate=None):
+    """Medições (Servidor, Base, Data, Tamanho (MB)) de um servidor; `desde`/`ate` recortam antes de expandir os trechos."""
+    caminho = caminho_particao(fonte, servidor)
+    if series.codificado(caminho):
+        df = series.ler(caminho, desde, ate)
+        df.insert(0, 'Servidor', str(servidor))
+    else:
+        df = pd.read_parquet(caminho)
+        if desde is not None:
+            df = df[df['Data'] >= pd.Timestamp(desde)]
+        if ate is not None:
+            df = df[df['Data'] <= pd.Timestamp(ate)]
+    return df[colunas] if colunas is not None else df
+
+
+def mapear_servidores(funcao, fonte, servidores=None, colunas=None, max_workers=None, desde=None, ate=None):
+    """Carrega cada partição e aplica `funcao` em paralelo, devolvendo {servidor: resultado}.
+
+    Usa threads: leitura de Parquet e operações do pandas/numpy liberam o GIL,
+    e assim evitamos serializar os DataFrames entre processos.
+    """
+    if servidores is None:
+        servidores = listar_servidores(fonte)
+    if not servidores:
+        return {}
+
+    def processar(servidor):
+        return funcao(carregar_servidor(fonte, servidor, colunas, desde, ate))
+
+    workers = max_workers or min(32, (os.cpu_count() or 1) + 4, len(servidores))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        resultados = executor.map(processar, servidores)
+        return dict(zip(servidores, resultados))
+
+
+def carregar(fonte, servidores=None, colunas=None, desde=None, ate=None):
+    partes = mapear_servidores(lambda df: df, fonte, servidores, colunas, desde=desde, ate=ate)
+    if not partes:
+        return pd.DataFrame(columns=colunas or ['Servidor', 'Base', 'Data', 'Tamanho (MB)'])
+    return pd.concat(partes.values(), ignore_index=True)
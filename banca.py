@@ -0,0 +1,144 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# Simulação de Monte Carlo da banca: sequências de apostas sorteadas entre as candidatas (probabilidade
+# do modelo e odd), com stake de Kelly fracionário ou fixo. Todos os caminhos andam juntos em arrays
+# NumPy; o sorteio (qual aposta e se ganhou) não depende da estratégia, então é feito uma vez e
+# reaproveitado para comparar frações de Kelly com os mesmos números aleatórios
+CAMINHOS = 100_000
+APOSTAS = 200
+# Caminhos processados por vez: limita a memória das matrizes caminhos x apostas
+BLOCO = 25_000
+# Ruína: a banca chega a esta fração da inicial (ou não cobre mais a aposta fixa)
+LIMITE_RUINA = 0.1
+QUANTIS = [0.05, 0.25, 0.5, 0.75, 0.95]
+# Caminhos usados para as faixas de evolução da banca no gráfico e para a curva de frações de Kelly
+CAMINHOS_FAIXAS = 10_000
+CAMINHOS_CURVA = 25_000
+KELLY, FIXA = 'Kelly fracionário', 'Aposta fixa'
+
+
+def sortear(probabilidades, caminhos=CAMINHOS, apostas=APOSTAS, semente=0):
+    """Para cada caminho e aposta: qual candidata foi apostada e se ganhou, codificado como 2 * candidata + ganhou."""
+    probabilidades = np.asarray(probabilidades, dtype='float64')
+    rng = np.random.default_rng(semente)
+    tipo = np.uint8 if 2 * len(probabilidades) <= np.iinfo(np.uint8).max else np.uint16
+    candidata = rng.integers(0, len(probabilidades), (caminhos, apostas), dtype=tipo)
+    ganhou = rng.random((caminhos, apostas), dtype='float32') < probabilidades[candidata]
+    return candidata * tipo(2) + ganhou
+
+
+def kelly(probabilidades, odds, fracao):
+    """Fração da banca apostada em cada candidata (zero sem valor esperado positivo)."""
+    probabilidades, odds = np.asarray(probabilidades, 'float64'), np.asarray(odds, 'float64')
+    return np.clip(fracao * (probabilidades * odds - 1) / (odds - 1), 0, 1)
+
+
+def _kelly(codigos, odds, fracoes, banca):
+    # Stake proporcional: a banca é multiplicativa, então tudo anda em log(banca / inicial) com uma
+    # soma acumulada em float32; exp só nos vetores por caminho, nunca na matriz inteira
+    crescimento = np.log1p(np.c_[-fracoes, fracoes * (odds - 1)]).ravel().astype('float32')
+    log_banca = np.cumsum(np.take(crescimento, codigos), axis=1)
+    pico = np.maximum(np.maximum.accumulate(log_banca, axis=1), 0)
+    final = banca * np.exp(log_banca[:, -1].astype('float64'))
+    minima = banca * np.exp(np.minimum(log_banca.min(axis=1), 0).astype('float64'))
+    queda = -np.expm1((log_banca - pico).min(axis=1).astype('float64'))
+    return final, minima, queda, log_banca
+
+
+def _fixa(codigos, odds, valor, apostar, banca):
+    # Stake fixo: a banca é aditiva; quem não cobre mais a aposta para ali (fica com o que sobrou)
+    resultado = np.c_[-valor * apostar, valor * (odds - 1) * apostar].ravel().astype('float32')
+    saldo = banca + np.cumsum(np.take(resultado, codigos), axis=1)
+    quebrou = saldo < valor
+    parou = quebrou.any(axis=1)
+    parada = np.where(parou, quebrou.argmax(axis=1), saldo.shape[1] - 1)
+    final = saldo[np.arange(len(saldo)), parada].astype('float64')
+    # Depois da parada a banca fica congelada: o que vem depois no cumsum não conta
+    depois = np.arange(saldo.shape[1])[None, :] > parada[:, None]
+    saldo[depois] = np.repeat(final.astype('float32'), saldo.shape[1] - 1 - parada)
+    pico = np.maximum(np.maximum.accumulate(saldo, axis=1), banca)
+    minima = np.minimum(saldo.min(axis=1), banca).astype('float64')
+    queda = (1 - saldo / pico).max(axis=1).astype('float64')
+    return final, minima, queda, np.log(np.maximum(saldo, 1e-6) / banca)
+
+
+def simular(codigos, probabilidades, odds, estrategia=KELLY, fracao=0.5, valor=None, banca=1000.0, com_faixas=True):
+    """Distribuição da banca final, do drawdown máximo, da ruína e do crescimento por aposta.
+
+    `codigos` vem de `sortear` (o mesmo sorteio serve para qualquer estratégia/fração).
+    Devolve (resumo, faixas): um dicionário de métricas e os quantis da banca a cada aposta
+    (None com com_faixas=False).
+    """
+    odds = np.asarray(odds, 'float64')
+    fracoes = kelly(probabilidades, odds, fracao)
+    finais, quedas, ruinas, faixas = [], [], [], None
+    for inicio in range(0, len(codigos), BLOCO):
+        bloco = codigos[inicio:inicio + BLOCO]
+        if estrategia == KELLY:
+            final, minima, queda, log_banca = _kelly(bloco, odds, fracoes, banca)
+            piso = LIMITE_RUINA * banca
+        else:
+            # Aposta fixa só nas candidatas com valor (as mesmas que o Kelly apostaria)
+            final, minima, queda, log_banca = _fixa(bloco, odds, valor, fracoes > 0, banca)
+            piso = max(LIMITE_RUINA * banca, valor)
+        finais.append(final)
+        quedas.append(queda)
+        ruinas.append(minima < piso)
+        if com_faixas and faixas is None:
+            # Quantis em log e depois exp: a ordem não muda, e só a amostra das faixas sai do espaço log
+            faixas = banca * np.exp(np.quantile(np.c_[np.zeros(min(len(bloco), CAMINHOS_FAIXAS), 'float32'),
+                                                      log_banca[:CAMINHOS_FAIXAS]], QUANTIS, axis=0))
+    finais, quedas, ruina = np.concatenate(finais), np.concatenate(quedas), np.concatenate(ruinas)
+    apostas = codigos.shape[1]
+    crescimento = np.log(np.maximum(finais, 1e-12) / banca) / apostas
+    resumo = {
+        'Caminhos': len(finais),
+        'Apostas': apostas,
+        'Risco de Ruína': float(ruina.mean()),
+        'Chance de Lucro': float((finais > banca).mean()),
+        'Crescimento Mediano por Aposta': float(np.expm1(np.median(crescimento))),
+        **{f'Banca Final P{int(q * 100)}': float(v) for q, v in zip(QUANTIS, np.quantile(finais, QUANTIS))},
+        **{f'Drawdown P{int(q * 100)}': float(v) for q, v in zip(QUANTIS, np.quantile(quedas, QUANTIS))},
+    }
+    if faixas is not None:
+        faixas = pd.DataFrame(faixas.T, columns=[f'P{int(q * 100)}' for q in QUANTIS]).rename_axis('Aposta').reset_index()
+    return resumo, faixas
+
+
+def curva_kelly(codigos, probabilidades, odds, fracoes, banca=1000.0):
+    """Resumo da simulação para várias frações de Kelly, todas com o mesmo sorteio (e menos caminhos)."""
+    codigos = codigos[:CAMINHOS_CURVA]
+    linhas = [
+        {'Fração': fracao, **simular(codigos, probabilidades, odds, KELLY, fracao, banca=banca, com_faixas=False)[0]}
+        for fracao in fracoes
+    ]
+    return pd.DataFrame(linhas)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simula a evolução da banca com apostas de Kelly ou fixas.')
+    parser.add_argument('--prob', type=float, nargs='+', required=True, help='Probabilidade de cada aposta candidata')
+    parser.add_argument('--odd', type=float, nargs='+', required=True, help='Odd de cada aposta candidata')
+    parser.add_argument('--fracao', type=float, default=0.5, help='Fração de Kelly')
+    parser.add_argument('--fixa', type=float, help='Valor fixo por aposta (em vez de Kelly)')
+    parser.add_argument('--banca', type=float, default=1000.0)
+    parser.add_argument('--caminhos', type=int, default=CAMINHOS)
+    parser.add_argument('--apostas', type=int, default=APOSTAS)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+    if len(args.prob) != len(args.odd):
+        parser.error('--prob e --odd precisam ter o mesmo número de valores')
+
+    inicio = time.perf_counter()
+    codigos = sortear(args.prob, args.caminhos, args.apostas, args.semente)
+    sorteio = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    estrategia = FIXA if args.fixa else KELLY
+    resumo, _ = simular(codigos, args.prob, args.odd, estrategia, args.fracao, args.fixa, args.banca)
+    for nome, valor in resumo.items():
+        print(f'{nome}: {valor:.4f}' if isinstance(valor, float) else f'{nome}: {valor}')
+    print(f'⏳ sorteio {sorteio:.2f}s, simulação ({estrategia}) {time.perf_counter() - inicio:.2f}s')
@@ -2,17 +2,18 @@ import streamlit as st
 import pandas as pd
 import requests
 from scipy.stats import poisson, skellam
-import matplotlib.pyplot as plt
-from bs4 import BeautifulSoup
 import warnings
-import re
 import numpy as np
-from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.linear_model import PoissonRegressor
 import datetime
 import json
 import os
 
+import ao_vivo
+import banca
+import elo
+import modelo
+import resultados
+
 warnings.filterwarnings('ignore')
 
 # Função para formatar número no formato de valor
@@ -88,92 +89,69 @@ def dixon_coles_probabilities(home_attack, away_attack, home_defense, away_defen
 # Cabeçalho da página
 st.set_page_config(page_title="Análise para Bets", layout="wide")
 
-# Criação de cache para fazer apenas uma consulta no site
-@st.cache_resource
-def tabelas_url(importar):
-    header = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
-    }
-    soup = requests.get(importar, headers=header)
-    pageSoup = BeautifulSoup(soup.content, 'html.parser')
-
-    listardata = []
-    listarhora = []
-    listarcasa = []
-    listarfora = []
-    listarresultado = []
-    listarrodada = []
-
-    # Variáveis para armazenar a última data e hora válidas
-    ultima_data = ""
-    ultima_hora = ""
-
-    blocos_rodada = pageSoup.find_all("div", class_="content-box-headline")
-    for bloco in blocos_rodada:
-        rodada_texto = bloco.get_text(strip=True)
-        rodada_numero = rodada_texto.split('.')[0]
-        tabela = bloco.find_next("table")
-        if not tabela:
-            continue
-        linhas = tabela.find_all("tr")
-        for linha in linhas:
-            colunas = linha.find_all("td")
-            if len(colunas) >= 7:
-                data = colunas[0].get_text(strip=True)
-                hora = colunas[1].get_text(strip=True)
-                casa = colunas[2].get_text(strip=True)
-                casa = re.sub(r"\(\d+\.\)", "", casa).strip()
-                resultado = colunas[4].get_text(strip=True)
-                fora = colunas[6].get_text(strip=True)
-                fora = re.sub(r"\(\d+\.\)", "", fora).strip()
-
-                # Atualiza última data/hora se houver
-                if data:
-                    ultima_data = data
-                else:
-                    data = ultima_data
-
-                if hora:
-                    ultima_hora = hora
-                else:
-                    hora = ultima_hora
-
-                listardata.append(data)
-                listarhora.append(hora)
-                listarcasa.append(casa)
-                listarfora.append(fora)
-                listarresultado.append(resultado)
-                listarrodada.append(rodada_numero)
-
-    df = pd.DataFrame({
-        'data': listardata,
-        'hora': listarhora,
-        'casa': listarcasa,
-        'fora': listarfora,
-        'resultado': listarresultado,
-        'rodada': listarrodada
-    })
-    return df
-
-# Páginas de dados para webscrapping
-premier = tabelas_url("https://www.transfermarkt.com.br/premier-league/gesamtspielplan/wettbewerb/GB1/saison_id/2025")
-bseriea = tabelas_url("https://www.transfermarkt.co.uk/campeonato-brasileiro-serie-a/gesamtspielplan/wettbewerb/BRA1?saison_id=2024&spieltagVon=1&spieltagBis=32")
-bserieb = tabelas_url("https://www.transfermarkt.com.br/campeonato-brasileiro-serie-b/gesamtspielplan/wettbewerb/BRA2/saison_id/2024")
-mls = tabelas_url("https://www.transfermarkt.co.uk/major-league-soccer/gesamtspielplan/wettbewerb/MLS1?saison_id=2024&spieltagVon=1&spieltagBis=36")
+# Resultados guardados localmente por liga/temporada (resultados.py); o site só é consultado
+# para as rodadas que faltam ou ainda não terminaram, no máximo uma vez por hora
+@st.cache_data(ttl=3600, show_spinner="Atualizando resultados...")
+def tabelas_liga(liga, temporada):
+    return resultados.atualizar(liga, temporada)
+
+# Modelo treinado fora do app (python modelo.py); aqui só é carregado, uma vez por versão
+@st.cache_resource(show_spinner=False)
+def modelo_liga(liga, versao):
+    return modelo.carregar(liga, versao)
+
+@st.cache_data(show_spinner=False)
+def previsoes_rodada(liga, temporada, rodada, versao, jogos_temporada):
+    # Temporadas anteriores guardadas dão o histórico de forma do começo da temporada
+    anteriores = [t for t in resultados.temporadas_guardadas(liga) if t < temporada]
+    jogos = pd.concat([resultados.carregar([liga], anteriores), jogos_temporada], ignore_index=True) \
+        if anteriores else jogos_temporada
+    return modelo.prever(modelo_liga(liga, versao), jogos, temporada, rodada)
+
+# Ratings Elo: só os jogos terminados desde a última atualização são processados (estado gravado por liga)
+@st.cache_data(show_spinner=False)
+def ratings_elo(liga, temporada, rodada, jogos_temporada):
+    elo.atualizar(liga, jogos_temporada)
+    return elo.ratings_em(liga, temporada, rodada)
+
+# Diagrama de confiabilidade gravado junto de cada versão do modelo (antes e depois da calibração)
+@st.cache_data(show_spinner=False)
+def confiabilidade_modelo(liga, versao):
+    return pd.read_parquet(modelo.caminho_confiabilidade(liga, versao))
+
+def grafico_confiabilidade(confiabilidade):
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=[0, 1], y=[0, 1], mode='lines', name='Perfeita', line=dict(dash='dot', color='gray')))
+    for (probabilidades, resultado), df in confiabilidade.groupby(['Probabilidades', 'Resultado'], sort=False):
+        fig.add_trace(go.Scatter(
+            x=df['Prevista'], y=df['Observada'], mode='lines+markers', name=f'{resultado} ({probabilidades})',
+            line=dict(dash='solid' if probabilidades == 'Calibrada' else 'dash'),
+            customdata=df['Jogos'], hovertemplate='Prevista %{x:.1%}<br>Observada %{y:.1%}<br>%{customdata} jogos',
+        ))
+    fig.update_layout(xaxis_title='Probabilidade prevista', yaxis_title='Frequência observada',
+                      xaxis_tickformat='.0%', yaxis_tickformat='.0%', height=450)
+    return fig
 
 # Seleção dos campeonatos
 st.header("Escolha o Campeonato")
-options = ["Brasileiro Serie - A", "Brasileiro Serie - B", "MLS", "Premier League"]
+options = list(resultados.LIGAS)
 selected_option = st.radio("Escolha a Opção", options)
 
-if selected_option == "Premier League":
-    tabelas_jogos_ajustada = premier
-elif selected_option == "Brasileiro Serie - A":
-    tabelas_jogos_ajustada = bseriea
-elif selected_option == "Brasileiro Serie - B":
-    tabelas_jogos_ajustada = bserieb
-elif selected_option == "MLS":
-    tabelas_jogos_ajustada = mls
+temporada_atual = resultados.LIGAS[selected_option]['temporada']
+temporadas = sorted(set(resultados.temporadas_guardadas(selected_option)) | {temporada_atual}, reverse=True)
+temporada = st.sidebar.selectbox("Temporada", temporadas)
+
+try:
+    jogos_temporada = tabelas_liga(selected_option, temporada)
+except requests.RequestException:
+    # Sem acesso ao site: segue com o que já está guardado
+    jogos_temporada = resultados.carregar_temporada(selected_option, temporada)
+    if jogos_temporada is None:
+        jogos_temporada = pd.DataFrame(columns=resultados.COLUNAS)
+    else:
+        st.warning("Site indisponível: exibindo os resultados guardados localmente.")
+tabelas_jogos_ajustada = resultados.formato_app(jogos_temporada)
 
 # Verifique se o DataFrame está vazio (erro de scraping)
 if tabelas_jogos_ajustada.empty:
@@ -222,6 +200,16 @@ rodada_selecionada = st.sidebar.selectbox("Selecione a rodada", rodadas_disponiv
 tabela_filtrada = tabelas_jogos_ajustada[tabelas_jogos_ajustada['rodada'] == rodada_selecionada]
 st.dataframe(tabela_filtrada)
 
+# Força dos times antes da rodada escolhida (checkpoint da rodada anterior)
+ratings_rodada = ratings_elo(selected_option, temporada, int(rodada_selecionada) - 1, jogos_temporada)
+elo_times = ratings_rodada.set_index('time')['elo'] if not ratings_rodada.empty else pd.Series(dtype=float)
+with st.expander(f"📈 Ratings Elo antes da rodada {rodada_selecionada}"):
+    if ratings_rodada.empty:
+        st.info("Ainda não há jogos processados para os ratings.")
+    else:
+        st.dataframe(ratings_rodada.assign(elo=ratings_rodada['elo'].round(0)).rename(columns={'time': 'Time', 'elo': 'Elo'}),
+                     hide_index=True, use_container_width=True)
+
 # Filtrar DataFrames pela rodada
 tabela_jogos_realizados_rodada = tabela_jogos_realizados[tabela_jogos_realizados['rodada'] == rodada_selecionada]
 tabela_jogos_faltantes_rodada = tabela_jogos_faltantes[tabela_jogos_faltantes['rodada'] == rodada_selecionada]
@@ -267,10 +255,33 @@ def calcula_probs(linha):
 
     return linha
 
+versao_modelo = modelo.versao_atual(selected_option)
+# Versões treinadas antes da calibração não têm diagrama
+if versao_modelo is not None and 'ece_modelo' in versao_modelo['metricas']:
+    metricas = versao_modelo['metricas']
+    with st.expander("📏 Calibração do modelo"):
+        m1, m2, m3 = st.columns(3)
+        m1.metric("ECE do modelo", f"{metricas['ece_modelo']*100:.2f} p.p.")
+        m2.metric("ECE calibrado", f"{metricas['ece_calibrado']*100:.2f} p.p.")
+        m3.metric("Jogos de validação", metricas['jogos_validacao'])
+        st.caption("Previsões fora da amostra; " + ", ".join(f"{k}: {v}" for k, v in metricas['calibracao'].items()))
+        confiabilidade = confiabilidade_modelo(selected_option, versao_modelo['versao'])
+        st.plotly_chart(grafico_confiabilidade(confiabilidade), use_container_width=True)
+
 # Aplicação das probabilidades na tabela faltante
 if not tabela_jogos_faltantes_rodada.empty:
     try:
-        tabela_jogos_faltantes_rodada = tabela_jogos_faltantes_rodada.apply(calcula_probs, axis=1)
+        if versao_modelo is not None:
+            # Rodada inteira prevista de uma vez pelo modelo treinado, já com as probabilidades calibradas
+            previsoes = previsoes_rodada(selected_option, temporada, rodada_selecionada,
+                                         versao_modelo['versao'], jogos_temporada)
+            tabela_jogos_faltantes_rodada = tabela_jogos_faltantes_rodada.merge(
+                previsoes[['casa', 'fora', 'Win', 'Draw', 'Loss']], on=['casa', 'fora'], how='left'
+            )
+            st.caption(f"Modelo treinado: versão {versao_modelo['versao']} "
+                       f"({versao_modelo['jogos']} jogos, temporadas {versao_modelo['temporadas']})")
+        else:
+            tabela_jogos_faltantes_rodada = tabela_jogos_faltantes_rodada.apply(calcula_probs, axis=1)
         
         # Filtrar apenas apostas com alta probabilidade (EV será calculado individualmente depois)
         min_confidence = 0.6  # Probabilidade mínima de 60%
@@ -305,6 +316,55 @@ if not tabela_jogos_faltantes_rodada.empty:
     except Exception as e:
         st.error(f"Erro ao calcular probabilidades: {e}")
 
+# Sorteio da simulação da banca (qual aposta e se ganhou), reaproveitado por qualquer fração/estratégia
+@st.cache_resource(show_spinner=False, max_entries=4)
+def sorteio_banca(probabilidades):
+    return banca.sortear(probabilidades)
+
+@st.cache_data(show_spinner="Simulando a banca...", max_entries=64)
+def risco_banca(probabilidades, odds, estrategia, fracao, valor, caixa):
+    return banca.simular(sorteio_banca(probabilidades), probabilidades, odds, estrategia, fracao, valor, caixa)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def curva_kelly(probabilidades, odds, caixa):
+    fracoes = np.round(np.arange(0.1, 1.01, 0.1), 1)
+    return banca.curva_kelly(sorteio_banca(probabilidades), probabilidades, odds, fracoes, caixa)
+
+# Modo ao vivo: minuto e placar dos jogos da rodada, com 1X2 e totais recalculados a cada edição
+if st.sidebar.checkbox("Modo ao vivo") and not tabela_jogos_faltantes_rodada.empty:
+    st.header("⚽ Ao Vivo")
+    if versao_modelo is not None:
+        jogos_ao_vivo = previsoes_rodada(selected_option, temporada, rodada_selecionada,
+                                         versao_modelo['versao'], jogos_temporada)
+        rho_ao_vivo = versao_modelo['rho']
+    else:
+        # Mesmos gols esperados de dixon_coles_probabilities: ataque de um lado x defesa do outro
+        stats = tabela_stats.set_index('time')
+        jogos_ao_vivo = tabela_jogos_faltantes_rodada[['casa', 'fora']].assign(
+            lambda_casa=lambda d: d['casa'].map(stats['gols_feitos_casa']) * d['fora'].map(stats['gols_sofridos_fora']),
+            lambda_fora=lambda d: d['fora'].map(stats['gols_feitos_fora']) * d['casa'].map(stats['gols_sofridos_casa']),
+        )
+        rho_ao_vivo = 0.13
+    placares = st.data_editor(
+        jogos_ao_vivo[['casa', 'fora']].assign(minuto=0, gols_casa=0, gols_fora=0),
+        disabled=['casa', 'fora'], hide_index=True, use_container_width=True,
+        key=f"ao_vivo_{selected_option}_{temporada}_{rodada_selecionada}",
+        column_config={
+            'minuto': st.column_config.NumberColumn("Minuto", min_value=0, max_value=ao_vivo.DURACAO, step=1),
+            'gols_casa': st.column_config.NumberColumn("Gols Casa", min_value=0, step=1),
+            'gols_fora': st.column_config.NumberColumn("Gols Fora", min_value=0, step=1),
+        },
+    )
+    atualizado = ao_vivo.atualizar(
+        placares.assign(lambda_casa=jogos_ao_vivo['lambda_casa'].to_numpy(),
+                        lambda_fora=jogos_ao_vivo['lambda_fora'].to_numpy()),
+        rho_ao_vivo,
+    )
+    colunas_prob = [c for c in atualizado.columns if c not in ('casa', 'fora', 'minuto', 'gols_casa', 'gols_fora')]
+    st.dataframe(atualizado.assign(**{c: (atualizado[c] * 100).round(1) for c in colunas_prob}),
+                 hide_index=True, use_container_width=True)
+    st.caption("Probabilidades em %, com os gols esperados reduzidos ao tempo que falta de jogo.")
+
 times = tabela_stats.time.tolist()
 
 # Formulário para preencher os dados da aposta
@@ -320,6 +380,8 @@ with st.form("Analise"):
     
     caixa = la.number_input("Qual o valor de caixa atual?", min_value=0.0, value=1000.0)
     kelly_fraction = lb.slider("Fração de Kelly", 0.1, 1.0, 0.5, 0.1)
+    aposta_fixa = la.number_input("Aposta fixa (R$) para comparar", min_value=1.0, value=20.0)
+    estrategia = lb.radio("Estratégia na simulação da banca", [banca.KELLY, banca.FIXA], horizontal=True)
     
     analisar = la.form_submit_button("Analisar")
 
@@ -332,17 +394,17 @@ if analisar:
         bet_history = load_bet_history()
         
         # Encontrar o jogo na tabela
-        resultados = tabela_jogos_faltantes_rodada[
+        jogo_escolhido = tabela_jogos_faltantes_rodada[
             (tabela_jogos_faltantes_rodada['casa'] == t_casa) & 
             (tabela_jogos_faltantes_rodada['fora'] == t_fora)
         ]
     
-    if len(resultados) == 0:
+    if len(jogo_escolhido) == 0:
         st.error("Nenhum resultado encontrado ou jogo já realizado.")
-    elif all(col in resultados.columns for col in ["Win", "Loss", "Draw"]):
-        vencer = resultados["Win"].iloc[0]
-        perder = resultados["Loss"].iloc[0]
-        empatar = resultados["Draw"].iloc[0]
+    elif all(col in jogo_escolhido.columns for col in ["Win", "Loss", "Draw"]):
+        vencer = jogo_escolhido["Win"].iloc[0]
+        perder = jogo_escolhido["Loss"].iloc[0]
+        empatar = jogo_escolhido["Draw"].iloc[0]
         
         # Calcular valores esperados
         ev_casa = calculate_expected_value(vencer, fator_casa)
@@ -380,11 +442,15 @@ if analisar:
         col2.markdown(f"Gols Feitos em Casa: **{format_number(gols_made_home)}**")
         col2.markdown(f"Gols Sofridos em Casa: **{format_number(gols_suffer_home)}**")
         col2.markdown(f"Forma Recente: **{tabela_stats.loc[tabela_stats.time == t_casa, 'forma_casa'].iloc[0]*100:.1f}%**")
+        if t_casa in elo_times:
+            col2.markdown(f"Elo: **{elo_times[t_casa]:.0f}**")
         
         col2.subheader("Time Visitante")
         col2.markdown(f"Gols Feitos Fora: **{format_number(gols_made_out)}**")
         col2.markdown(f"Gols Sofridos Fora: **{format_number(gols_suffer_out)}**")
         col2.markdown(f"Forma Recente: **{tabela_stats.loc[tabela_stats.time == t_fora, 'forma_fora'].iloc[0]*100:.1f}%**")
+        if t_fora in elo_times:
+            col2.markdown(f"Elo: **{elo_times[t_fora]:.0f}**")
         
         # Sugestão de valor
         col3.header("Sugestões de Aposta")
@@ -405,6 +471,36 @@ if analisar:
         else:
             col3.warning("Time Visitante: Sem valor suficiente")
         
+        # Simulação de risco: sequências de apostas como as deste jogo (só as com valor), com a fração escolhida
+        st.header("🎲 Risco da Banca")
+        candidatas = [(p, o) for p, o in [(vencer, fator_casa), (empatar, 3.0), (perder, fator_fora)]
+                      if banca.kelly(p, o, kelly_fraction) > 0]
+        if not candidatas or caixa <= 0:
+            st.info("Nenhuma aposta com valor esperado positivo neste jogo para simular.")
+        else:
+            probs_sim = tuple(round(float(p), 4) for p, _ in candidatas)
+            odds_sim = tuple(float(o) for _, o in candidatas)
+            resumo, faixas = risco_banca(probs_sim, odds_sim, estrategia, kelly_fraction, aposta_fixa, caixa)
+            st.caption(f"{resumo['Caminhos']:,} caminhos de {resumo['Apostas']} apostas ({estrategia}); "
+                       f"ruína = banca abaixo de {banca.LIMITE_RUINA:.0%} da inicial")
+            r1, r2, r3, r4 = st.columns(4)
+            r1.metric("Risco de Ruína", f"{resumo['Risco de Ruína']*100:.2f}%")
+            r2.metric("Chance de Lucro", f"{resumo['Chance de Lucro']*100:.1f}%")
+            r3.metric("Crescimento Mediano/Aposta", f"{resumo['Crescimento Mediano por Aposta']*100:.2f}%")
+            r4.metric("Drawdown Mediano (P95)", f"{resumo['Drawdown P50']*100:.1f}% ({resumo['Drawdown P95']*100:.1f}%)")
+            r1.metric("Banca Final P5", f"R$ {resumo['Banca Final P5']:.2f}")
+            r2.metric("Banca Final Mediana", f"R$ {resumo['Banca Final P50']:.2f}")
+            r3.metric("Banca Final P95", f"R$ {resumo['Banca Final P95']:.2f}")
+            st.line_chart(faixas.set_index('Aposta'))
+            curva = curva_kelly(probs_sim, odds_sim, caixa)
+            st.subheader("Frações de Kelly (mesmos sorteios)")
+            st.dataframe(curva[['Fração', 'Risco de Ruína', 'Chance de Lucro', 'Crescimento Mediano por Aposta',
+                                'Drawdown P50', 'Drawdown P95', 'Banca Final P50']].style.format({
+                'Fração': '{:.1f}', 'Risco de Ruína': '{:.2%}', 'Chance de Lucro': '{:.1%}',
+                'Crescimento Mediano por Aposta': '{:.2%}', 'Drawdown P50': '{:.1%}', 'Drawdown P95': '{:.1%}',
+                'Banca Final P50': 'R$ {:.2f}',
+            }), hide_index=True, use_container_width=True)
+
         # Botão para registrar aposta
         if st.button("Registrar Aposta", key="register_bet"):
             # Aqui você implementaria a lógica para registrar a aposta
@@ -423,6 +519,7 @@ if analisar:
             
             # Gráfico de evolução da banca
             if len(bet_history['bankroll_evolution']) > 0:
+                import matplotlib.pyplot as plt  # só carregado quando há histórico para desenhar
                 fig, ax = plt.subplots()
                 ax.plot(bet_history['bankroll_evolution'])
                 ax.set_title('Evolução da Banca')
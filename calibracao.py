@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# Calibração das probabilidades 1X2: para cada resultado, regressão isotônica ou de Platt (a que
+# errar menos em validação cruzada), ajustada nas previsões fora da amostra do modelo. O ajuste vira
+# uma tabela de NOS valores em uma grade uniforme de [0, 1]; aplicar é uma interpolação vetorizada
+NOS = 201
+DOBRAS = 5
+FAIXAS = 10
+ISOTONICA, PLATT = 'Isotônica', 'Platt'
+RESULTADOS = ['Win', 'Draw', 'Loss']
+EPS = 1e-6
+
+
+def _grade():
+    return np.linspace(0, 1, NOS)
+
+
+def _logito(p):
+    p = np.clip(p, EPS, 1 - EPS)
+    return np.log(p / (1 - p))
+
+
+def _isotonica(p, acertou):
+    from sklearn.isotonic import IsotonicRegression
+    regressao = IsotonicRegression(y_min=0, y_max=1, out_of_bounds='clip').fit(p, acertou)
+    return regressao.predict(_grade())
+
+
+def _platt(p, acertou):
+    from sklearn.linear_model import LogisticRegression
+    regressao = LogisticRegression(C=1e4).fit(_logito(p)[:, None], acertou)
+    return regressao.predict_proba(_logito(_grade())[:, None])[:, 1]
+
+
+AJUSTES = {ISOTONICA: _isotonica, PLATT: _platt}
+
+
+def _interpolar(valores, p):
+    # Grade uniforme: a posição na tabela sai direto da probabilidade, sem busca
+    posicao = np.clip(p, 0, 1) * (valores.shape[-1] - 1)
+    i = np.minimum(posicao.astype(np.int64), valores.shape[-1] - 2)
+    fracao = posicao - i
+    return valores[..., i] * (1 - fracao) + valores[..., i + 1] * fracao
+
+
+def _brier_validado(ajuste, p, acertou):
+    # Dobras contíguas (na ordem cronológica das previsões)
+    dobras = np.array_split(np.arange(len(p)), DOBRAS)
+    erros = []
+    for dobra in dobras:
+        treino = np.setdiff1d(np.arange(len(p)), dobra, assume_unique=True)
+        if acertou[treino].min() == acertou[treino].max():
+            return np.inf
+        erros.append(((_interpolar(ajuste(p[treino], acertou[treino]), p[dobra]) - acertou[dobra]) ** 2).sum())
+    return sum(erros) / len(p)
+
+
+def ajustar(probabilidades, resultado):
+    """Tabela de calibração a partir de previsões (jogos x 3) e dos resultados (0, 1, 2).
+
+    Devolve {'valores': float32 (3, NOS), 'metodos': [...]}, pronta para `aplicar`.
+    """
+    valores, metodos = [], []
+    for k in range(len(RESULTADOS)):
+        p, acertou = probabilidades[:, k], (resultado == k).astype('float64')
+        erros = {nome: _brier_validado(ajuste, p, acertou) for nome, ajuste in AJUSTES.items()}
+        metodo = min(erros, key=erros.get)
+        valores.append(AJUSTES[metodo](p, acertou))
+        metodos.append(metodo)
+    return {'valores': np.asarray(valores, dtype='float32'), 'metodos': metodos}
+
+
+def aplicar(tabela, probabilidades):
+    """Probabilidades calibradas (jogos x 3), renormalizadas para somar 1 em cada jogo."""
+    valores = tabela['valores']
+    calibradas = np.clip(np.stack(
+        [_interpolar(valores[k], probabilidades[:, k]) for k in range(valores.shape[0])], axis=1
+    ), EPS, None)
+    return calibradas / calibradas.sum(axis=1, keepdims=True)
+
+
+def confiabilidade(probabilidades, resultado, faixas=FAIXAS):
+    """Diagrama de confiabilidade: por resultado e faixa de probabilidade, a média prevista e a frequência observada."""
+    n = len(resultado)
+    faixa = np.minimum((probabilidades * faixas).astype(np.int64), faixas - 1)
+    df = pd.DataFrame({
+        'Resultado': np.repeat(RESULTADOS, n),
+        'Faixa': faixa.T.ravel(),
+        'Prevista': probabilidades.T.ravel(),
+        'Observada': (resultado[None, :] == np.arange(len(RESULTADOS))[:, None]).ravel().astype('float64'),
+    })
+    tabela = df.groupby(['Resultado', 'Faixa'], sort=False).agg(
+        Prevista=('Prevista', 'mean'), Observada=('Observada', 'mean'), Jogos=('Prevista', 'size'),
+    ).reset_index()
+    return tabela.sort_values(['Resultado', 'Faixa'], key=lambda c: c.map(RESULTADOS.index)
+                              if c.name == 'Resultado' else c, ignore_index=True)
+
+
+def erro_calibracao(tabela):
+    """ECE médio dos três resultados: |prevista - observada| ponderado pelos jogos de cada faixa."""
+    desvio = (tabela['Prevista'] - tabela['Observada']).abs() * tabela['Jogos']
+    por_resultado = desvio.groupby(tabela['Resultado']).sum() / tabela.groupby('Resultado')['Jogos'].sum()
+    return float(por_resultado.mean())
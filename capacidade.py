@@ -0,0 +1,137 @@
+import fnmatch
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import agregados
+import armazenamento
+
+# Capacidade configurada por fonte e servidor, com volumes opcionais definidos por padrões de base
+ARQUIVO_CAPACIDADE = os.environ.get('DASHBOARD_CAPACIDADE', 'capacidade_servidores.json')
+# Só o período mais recente entra no ajuste da tendência
+JANELA_DIAS = 180
+# Faixa de ~95% em torno da projeção
+Z_FAIXA = 1.96
+# Acima deste horizonte não mostramos data estimada
+HORIZONTE_MAXIMO_DIAS = 3650
+# Nome do "volume" que representa o servidor inteiro
+VOLUME_SERVIDOR = '(servidor)'
+
+CHAVES = ['Servidor', 'Volume']
+
+
+def caminho_capacidade(fonte):
+    return os.path.join(armazenamento.pasta_fonte(fonte), '_capacidade.parquet')
+
+
+def carregar_configuracao(fonte):
+    if not os.path.exists(ARQUIVO_CAPACIDADE):
+        return {}
+    with open(ARQUIVO_CAPACIDADE, 'r', encoding='utf-8') as f:
+        return json.load(f).get(fonte, {})
+
+
+def totais_por_volume(df, configuracao):
+    """Soma por (Servidor, Volume, Data) apenas dos servidores/volumes com capacidade configurada."""
+    partes = []
+    for servidor, config in configuracao.items():
+        df_servidor = df[df['Servidor'] == servidor]
+        if df_servidor.empty:
+            continue
+        volumes = {VOLUME_SERVIDOR: {'capacidade_mb': config.get('capacidade_mb'), 'bases': ['*']}}
+        volumes.update(config.get('volumes', {}))
+        for volume, config_volume in volumes.items():
+            if not config_volume.get('capacidade_mb'):
+                continue
+            padrao = '|'.join(fnmatch.translate(p) for p in config_volume.get('bases', ['*']))
+            df_volume = df_servidor[df_servidor['Base'].str.match(padrao)]
+            total = df_volume.groupby('Data', as_index=False)['Tamanho (MB)'].sum()
+            total['Servidor'] = servidor
+            total['Volume'] = volume
+            total['Capacidade (MB)'] = float(config_volume['capacidade_mb'])
+            partes.append(total)
+    if not partes:
+        return pd.DataFrame(columns=CHAVES + ['Data', 'Tamanho (MB)', 'Capacidade (MB)'])
+    return pd.concat(partes, ignore_index=True)
+
+
+def ajustar_tendencias(totais, janela_dias=JANELA_DIAS):
+    """Ajusta a tendência linear de todas as séries (Servidor, Volume) de uma vez."""
+    ultima = totais.groupby(CHAVES)['Data'].transform('max')
+    totais = totais[totais['Data'] > ultima - pd.Timedelta(days=janela_dias)].copy()
+    totais['x'] = (totais['Data'] - totais.groupby(CHAVES)['Data'].transform('min')).dt.days
+
+    ajuste = agregados.regressao_em_lote(totais, CHAVES, 'x', 'Tamanho (MB)')
+    info = totais.groupby(CHAVES).agg(data_ultima=('Data', 'max'), capacidade=('Capacidade (MB)', 'first'))
+
+    n, distancia = ajuste['n'], ajuste['x_max'] - ajuste['media_x']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        erro_inclinacao = np.sqrt(ajuste['variancia'] / ajuste['Sxx'])
+        erro_nivel = np.sqrt(ajuste['variancia'] * (1 / n + distancia ** 2 / ajuste['Sxx']))
+
+    return pd.DataFrame({
+        'Pontos': n,
+        'Última Data': info['data_ultima'],
+        'Capacidade (MB)': info['capacidade'],
+        'Uso Atual (MB)': ajuste['intercepto'] + ajuste['inclinacao'] * ajuste['x_max'],
+        'Crescimento (MB/dia)': ajuste['inclinacao'],
+        'Erro Crescimento': erro_inclinacao,
+        'Erro Nível': erro_nivel,
+    }, index=ajuste.index).reset_index()
+
+
+def _dias(restante, inclinacao):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dias = np.where(inclinacao > 0, restante / inclinacao, np.inf)
+    return np.clip(dias, 0, None)
+
+
+def dias_ate_cheio(ajustes, z=Z_FAIXA):
+    """Dias até esgotar a capacidade: estimativa central e faixa (mais cedo / mais tarde)."""
+    ajustes = ajustes.copy()
+    capacidade = ajustes['Capacidade (MB)']
+    nivel, inclinacao = ajustes['Uso Atual (MB)'], ajustes['Crescimento (MB/dia)']
+    erro_nivel = ajustes['Erro Nível'].fillna(0.0)
+    erro_inclinacao = ajustes['Erro Crescimento'].fillna(0.0)
+
+    ajustes['Uso (%)'] = nivel / capacidade * 100
+    ajustes['Dias até Cheio'] = _dias(capacidade - nivel, inclinacao)
+    ajustes['Dias (mais cedo)'] = _dias(capacidade - (nivel + z * erro_nivel), inclinacao + z * erro_inclinacao)
+    ajustes['Dias (mais tarde)'] = _dias(capacidade - (nivel - z * erro_nivel), inclinacao - z * erro_inclinacao)
+
+    dias = ajustes['Dias até Cheio'].where(ajustes['Dias até Cheio'] <= HORIZONTE_MAXIMO_DIAS)
+    ajustes['Data Estimada'] = ajustes['Última Data'] + pd.to_timedelta(dias.round(), unit='D')
+    return ajustes
+
+
+def projetar(df, configuracao):
+    totais = totais_por_volume(df, configuracao)
+    if totais.empty:
+        return pd.DataFrame(columns=CHAVES)
+    return dias_ate_cheio(ajustar_tendencias(totais))
+
+
+def recalcular(fonte, df, servidores=None):
+    """Recalcula a projeção (de todos ou só dos `servidores` informados) e grava o cache."""
+    configuracao = carregar_configuracao(fonte)
+    if servidores is not None:
+        configuracao = {s: c for s, c in configuracao.items() if s in servidores}
+    novos = projetar(df, configuracao)
+    if servidores is not None and os.path.exists(caminho_capacidade(fonte)):
+        anteriores = carregar(fonte)
+        novos = pd.concat([anteriores[~anteriores['Servidor'].isin(servidores)], novos], ignore_index=True)
+    armazenamento.gravar_atomico(novos, caminho_capacidade(fonte))
+
+
+def desatualizada(fonte):
+    # A configuração mudou depois do último cálculo
+    caminho = caminho_capacidade(fonte)
+    if not os.path.exists(caminho):
+        return True
+    return os.path.exists(ARQUIVO_CAPACIDADE) and os.path.getmtime(ARQUIVO_CAPACIDADE) > os.path.getmtime(caminho)
+
+
+def carregar(fonte):
+    return pd.read_parquet(caminho_capacidade(fonte))
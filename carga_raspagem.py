@@ -0,0 +1,151 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+import partida
+import resultados
+import transfermarkt_local
+
+# Teste de carga da raspagem contra o Transfermarkt local (transfermarkt_local.py): vazão de busca +
+# interpretação das páginas com várias requisições simultâneas, erros/variações de layout injetados,
+# e a partida a frio do betanalise2.1.py apontado para o servidor local (base vazia e já preenchida)
+PAGINAS = 200
+CONCORRENCIA = 4
+APP = 'betanalise2.1.py'
+# Tamanho dos intervalos de rodadas pedidos (como as atualizações incrementais fazem)
+RODADAS_POR_INTERVALO = 2
+
+
+def _tarefas(paginas, intervalos, semente=0):
+    # Metade temporada inteira (primeira busca), metade intervalos de rodadas, alternando as ligas
+    rng = np.random.default_rng(semente)
+    ligas = list(resultados.LIGAS)
+    tarefas = []
+    for i in range(paginas):
+        liga = ligas[i % len(ligas)]
+        temporada = resultados.LIGAS[liga]['temporada'] - int(rng.integers(0, 3))
+        if intervalos and i % 2:
+            de = int(rng.integers(1, 2 * (transfermarkt_local.N_TIMES - 1) - RODADAS_POR_INTERVALO + 2))
+            tarefas.append((liga, temporada, de, de + RODADAS_POR_INTERVALO - 1))
+        else:
+            tarefas.append((liga, temporada, None, None))
+    return tarefas
+
+
+def medir_raspagem(url_base, paginas=PAGINAS, concorrencia=CONCORRENCIA, novas_tentativas=True, intervalos=True):
+    """Busca e interpreta `paginas` páginas com `concorrencia` threads; uma linha por página.
+
+    Busca e interpretação são cronometradas separadamente, para separar rede/servidor do parser.
+    """
+    resultados.URL_BASE = url_base
+    locais = threading.local()
+
+    def executar(tarefa):
+        if not hasattr(locais, 'sessao'):
+            locais.sessao = resultados.nova_sessao() if novas_tentativas else requests.Session()
+        liga, temporada, de, ate = tarefa
+        linha = {'liga': liga, 'temporada': temporada, 'intervalo': de is not None,
+                 'status': 'ok', 'busca_s': np.nan, 'interpretacao_s': np.nan, 'jogos': 0}
+        inicio = time.perf_counter()
+        try:
+            resposta = locais.sessao.get(resultados.url_jogos(liga, temporada, de, ate),
+                                         headers=resultados.CABECALHO, timeout=resultados.TIMEOUT_S)
+            resposta.raise_for_status()
+        except requests.RequestException as erro:
+            resposta_erro = getattr(erro, 'response', None)
+            linha['status'] = str(resposta_erro.status_code) if resposta_erro is not None else type(erro).__name__
+            linha['busca_s'] = time.perf_counter() - inicio
+            return linha
+        meio = time.perf_counter()
+        jogos = resultados.interpretar_pagina(resposta.content)
+        linha.update(busca_s=meio - inicio, interpretacao_s=time.perf_counter() - meio, jogos=len(jogos))
+        # Página que chegou mas não tem nenhum jogo: o layout mudou e o parser não reconheceu
+        if jogos.empty:
+            linha['status'] = 'vazia'
+        return linha
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(concorrencia) as executor:
+        linhas = list(executor.map(executar, _tarefas(paginas, intervalos)))
+    return pd.DataFrame(linhas), time.perf_counter() - inicio
+
+
+def resumo(df, duracao):
+    ok = df[df['status'] == 'ok']
+    return {
+        'Páginas': len(df),
+        'Duração (s)': round(duracao, 2),
+        'Páginas/s': round(len(ok) / duracao, 1),
+        'Jogos/s': round(ok['jogos'].sum() / duracao, 0),
+        'Busca P50 (ms)': round(ok['busca_s'].median() * 1000, 1),
+        'Busca P95 (ms)': round(ok['busca_s'].quantile(0.95) * 1000, 1),
+        'Interpretação média (ms)': round(ok['interpretacao_s'].mean() * 1000, 1),
+        'Falhas': ' '.join(f'{s}={n}' for s, n in df.loc[df['status'] != 'ok', 'status'].value_counts().items()) or '-',
+    }
+
+
+def medir_partida(url_base):
+    """Partida a frio do app (primeira execução completa, AppTest) com a base de resultados vazia e depois preenchida."""
+    medicoes = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        anterior = {k: os.environ.get(k) for k in ('BETS_URL_BASE', 'BETS_PASTA_DADOS')}
+        os.environ.update(BETS_URL_BASE=url_base, BETS_PASTA_DADOS=pasta)
+        try:
+            medicoes['base vazia'] = partida.medir(APP, 'renderizacao')
+            medicoes['base preenchida'] = partida.medir(APP, 'renderizacao')
+        finally:
+            for chave, valor in anterior.items():
+                if valor is None:
+                    os.environ.pop(chave, None)
+                else:
+                    os.environ[chave] = valor
+    return medicoes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Vazão da raspagem e partida do app contra o Transfermarkt local.')
+    parser.add_argument('--url', help='Servidor já rodando (padrão: sobe um transfermarkt_local nesta execução)')
+    parser.add_argument('--paginas', type=int, default=PAGINAS)
+    parser.add_argument('--concorrencia', type=int, nargs='+', default=[1, CONCORRENCIA])
+    parser.add_argument('--latencia-ms', type=float, default=50.0)
+    parser.add_argument('--variacao-ms', type=float, default=20.0)
+    parser.add_argument('--erros', type=float, default=0.0, help='Fração de respostas 503 do servidor local')
+    parser.add_argument('--limite', type=float, default=0.0, help='Fração de respostas 429 do servidor local')
+    parser.add_argument('--layouts', default='padrao',
+                        help=f'Layouts sorteados pelo servidor local: {",".join(transfermarkt_local.LAYOUTS)}')
+    parser.add_argument('--sem-novas-tentativas', action='store_true', help='Sessão sem repetir 429/5xx')
+    parser.add_argument('--sem-app', action='store_true', help='Não mede a partida do betanalise2.1.py')
+    args = parser.parse_args()
+
+    servidor = None
+    if args.url:
+        url = args.url
+    else:
+        servidor = transfermarkt_local.iniciar(latencia_ms=args.latencia_ms, variacao_ms=args.variacao_ms,
+                                               erros=args.erros, limite=args.limite, layouts=args.layouts)
+        url = servidor.url
+        print(f'✅ Transfermarkt local em {url}')
+
+    linhas = []
+    for concorrencia in args.concorrencia:
+        df, duracao = medir_raspagem(url, args.paginas, concorrencia, not args.sem_novas_tentativas)
+        linhas.append({'Concorrência': concorrencia, **resumo(df, duracao)})
+    print(pd.DataFrame(linhas).to_string(index=False))
+    if servidor is not None:
+        print(f'📁 Respostas do servidor: {servidor.estatisticas()}')
+
+    if not args.sem_app:
+        # A partida mede o app, não a rede: sem latência nem erros injetados
+        if servidor is not None:
+            servidor.configurar(latencia_ms=0, variacao_ms=0, erros=0, limite=0, layouts='padrao')
+        for base, medicao in medir_partida(url).items():
+            print(f"⏳ {APP} ({base}): {medicao['Tempo (s)']:.2f}s, {medicao['RSS (MB)']:.1f} MB")
+    if servidor is not None:
+        servidor.shutdown()
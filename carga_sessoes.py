@@ -0,0 +1,263 @@
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import transfermarkt_local
+
+# Teste de carga com várias sessões simultâneas nos apps Streamlit: cada cenário (app, escala da frota
+# sintética, número de sessões) roda num processo novo, como uma instância do Streamlit. As sessões
+# são AppTests em threads, compartilhando os caches do processo; cada uma troca filtros, bases,
+# servidores ou rodadas e cronometra a reexecução. Diz quantos usuários uma instância aguenta
+APPS = ['dashboards.py', 'dashboards_Bruto.py', 'betanalise2.1.py']
+APPS_BETS = {'betanalise2.1.py'}
+FONTES_APP = {'dashboards.py': 'saida', 'dashboards_Bruto.py': 'saida_bancos'}
+ESCALAS = [1_000, 10_000]
+SESSOES = [1, 4, 8]
+PASSOS = 5
+DATAS = 65
+SERVIDORES = 4
+QUANTIS = [0.5, 0.95, 0.99]
+COLUNAS = ['App', 'Bases', 'Sessões', 'Reexecuções', 'Erros', 'Inicial P50 (s)',
+           *[f'P{int(q * 100)} (s)' for q in QUANTIS], 'Máx. (s)', 'MB/sessão', 'RSS pico (MB)']
+
+
+def _widget(app, tipo, rotulo):
+    return next((w for w in getattr(app, tipo) if w.label == rotulo), None)
+
+
+def _periodo(app, rng):
+    periodo = _widget(app, 'date_input', 'Escolha o intervalo de datas')
+    if periodo is None:
+        return None
+    inicio, fim = periodo.value
+    dias = (fim - inicio).days
+    novo_inicio = inicio + timedelta(days=int(rng.integers(0, max(dias - 7, 1))))
+    return periodo.set_value((novo_inicio, fim))
+
+
+def _opcao(app, tipo, rotulo, rng):
+    widget = _widget(app, tipo, rotulo)
+    if widget is None or not widget.options:
+        return None
+    return widget.set_value(widget.options[int(rng.integers(0, len(widget.options)))])
+
+
+def _bases(app, rng):
+    widget = _widget(app, 'multiselect', 'Selecione as Bases')
+    if widget is None:
+        return None
+    escolhidas = rng.choice(len(widget.options), size=int(rng.integers(1, 4)), replace=False)
+    return widget.set_value([widget.options[i] for i in escolhidas])
+
+
+def _top_n(app, rng):
+    widget = _widget(app, 'slider', 'Número de bases a exibir no gráfico:')
+    return None if widget is None else widget.set_value(int(rng.integers(5, 31)))
+
+
+# Ações de cada sessão: nome -> função que ajusta um widget (devolve None se o widget não está na tela)
+ACOES_DASHBOARD = {
+    'bases': _bases,
+    'periodo': _periodo,
+    'servidor': lambda app, rng: _opcao(app, 'selectbox', 'Selecione o servidor:', rng),
+    'top_n': _top_n,
+    'granularidade': lambda app, rng: _opcao(app, 'radio', 'Granularidade:', rng),
+}
+ACOES_BETS = {
+    'liga': lambda app, rng: _opcao(app, 'radio', 'Escolha a Opção', rng),
+    'temporada': lambda app, rng: _opcao(app, 'selectbox', 'Temporada', rng),
+    'rodada': lambda app, rng: _opcao(app, 'selectbox', 'Selecione a rodada', rng),
+}
+
+
+def _rss_mb():
+    # RSS atual (não o pico): páginas residentes de /proc/self/statm
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+def _runtime_compartilhado():
+    # Cada AppTest.run cria um runtime falso e o apaga no fim; com várias sessões em threads, uma
+    # apagaria o da outra no meio da execução. Todas passam a usar o mesmo, como num servidor real
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+def _selectbox_com_format_func():
+    # O AppTest procura str(valor) entre as opções já formatadas: com format_func (ex.: a base da
+    # conciliação, uma tupla) não acha e a reexecução quebra. Sem correspondência, o widget fica na opção padrão
+    from streamlit.testing.v1.element_tree import Selectbox
+    indice_original = Selectbox.index.fget
+
+    def indice(self):
+        try:
+            return indice_original(self)
+        except ValueError:
+            return None
+
+    Selectbox.index = property(indice)
+
+
+def _sessao(caminho, acoes, passos, semente, barreira, registros):
+    from streamlit.testing.v1 import AppTest
+    rng = np.random.default_rng(semente)
+    app = AppTest.from_file(caminho, default_timeout=600)
+
+    def cronometrar(acao, executar):
+        inicio = time.perf_counter()
+        executar()
+        registros.append({'sessao': semente, 'acao': acao, 'tempo_s': time.perf_counter() - inicio,
+                          'erro': bool(app.exception)})
+
+    barreira.wait()
+    cronometrar('inicial', app.run)
+    for _ in range(passos):
+        nome = list(acoes)[int(rng.integers(0, len(acoes)))]
+        alterado = acoes[nome](app, rng)
+        if alterado is not None:
+            cronometrar(nome, alterado.run)
+    return app
+
+
+def _executar_cenario(caminho, sessoes, passos):
+    """Processo filho: aquece os caches com uma sessão e depois roda `sessoes` sessões juntas."""
+    from streamlit.testing.v1 import AppTest
+    _runtime_compartilhado()
+    _selectbox_com_format_func()
+    # Primeira execução (ingestão, derivados, caches): é a partida do processo, não entra na carga
+    aquecimento = AppTest.from_file(caminho, default_timeout=600).run()
+    if aquecimento.exception:
+        raise RuntimeError(aquecimento.exception[0].value)
+    del aquecimento
+    gc.collect()
+    base_mb = _rss_mb()
+
+    acoes = ACOES_BETS if caminho in APPS_BETS else ACOES_DASHBOARD
+    registros, apps = [], [None] * sessoes
+    barreira = threading.Barrier(sessoes)
+
+    def rodar(i):
+        apps[i] = _sessao(caminho, acoes, passos, i, barreira, registros)
+
+    threads = [threading.Thread(target=rodar, args=(i,)) for i in range(sessoes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # As sessões ainda estão vivas (com seu session_state): o que cresceu desde o aquecimento é delas
+    return {
+        'registros': registros,
+        'mb_sessao': (_rss_mb() - base_mb) / sessoes,
+        'rss_pico_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def preparar_frota(pasta, bases, datas=DATAS, servidores=SERVIDORES):
+    """Partições sintéticas das duas fontes dos dashboards (sintetico.py) numa pasta de dados nova."""
+    for fonte in sorted(set(FONTES_APP.values())):
+        subprocess.run(
+            [sys.executable, 'sintetico.py', '--bases', str(bases), '--datas', str(datas),
+             '--servidores', str(servidores), '--fonte', fonte, '--pasta', pasta],
+            check=True, capture_output=True,
+        )
+
+
+def medir(caminho, sessoes, passos, ambiente):
+    """Roda o cenário num processo novo com as variáveis de `ambiente` (pastas de dados, URL das ligas)."""
+    ambiente = dict(os.environ, **ambiente,
+                    PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')])))
+    # O resultado volta por arquivo, não por pipe: os workers da fila (tarefas.py) herdam a saída do
+    # filho e manteriam o pipe aberto depois que ele termina
+    with tempfile.NamedTemporaryFile('r', suffix='.json') as saida:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--filho', caminho, str(sessoes), str(passos), saida.name],
+            stdout=subprocess.DEVNULL, env=ambiente, check=True,
+        )
+        return json.load(saida)
+
+
+def resumo(app, bases, sessoes, medicao):
+    df = pd.DataFrame(medicao['registros'])
+    inicial, reexecucoes = df[df['acao'] == 'inicial'], df[df['acao'] != 'inicial']
+    tempos = reexecucoes['tempo_s'] if not reexecucoes.empty else pd.Series([np.nan])
+    return {
+        'App': app, 'Bases': bases, 'Sessões': sessoes, 'Reexecuções': len(reexecucoes),
+        'Erros': int(df['erro'].sum()),
+        'Inicial P50 (s)': round(inicial['tempo_s'].median(), 2),
+        **{f'P{int(q * 100)} (s)': round(tempos.quantile(q), 2) for q in QUANTIS},
+        'Máx. (s)': round(tempos.max(), 2),
+        'MB/sessão': round(medicao['mb_sessao'], 1),
+        'RSS pico (MB)': round(medicao['rss_pico_mb'], 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Latência por reexecução e memória por sessão com várias sessões simultâneas.')
+    parser.add_argument('--apps', nargs='*', default=APPS, choices=APPS)
+    parser.add_argument('--escalas', nargs='*', type=int, default=ESCALAS, help='Bases da frota sintética')
+    parser.add_argument('--sessoes', nargs='*', type=int, default=SESSOES)
+    parser.add_argument('--passos', type=int, default=PASSOS, help='Interações de cada sessão depois da primeira execução')
+    parser.add_argument('--datas', type=int, default=DATAS)
+    parser.add_argument('--servidores', type=int, default=SERVIDORES)
+    parser.add_argument('--saida', help='CSV com o resumo de cada cenário')
+    parser.add_argument('--filho', nargs=4, metavar=('APP', 'SESSOES', 'PASSOS', 'SAIDA'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        caminho, sessoes, passos, saida = args.filho
+        medicao = _executar_cenario(caminho, int(sessoes), int(passos))
+        with open(saida, 'w', encoding='utf-8') as f:
+            json.dump(medicao, f)
+        sys.exit()
+
+    linhas = []
+    with tempfile.TemporaryDirectory() as pasta:
+        # O app de apostas busca as ligas no Transfermarkt local; a escala da frota não se aplica a ele
+        servidor = transfermarkt_local.iniciar() if APPS_BETS & set(args.apps) else None
+        cenarios = [(app, escala) for escala in args.escalas for app in args.apps if app not in APPS_BETS]
+        cenarios += [(app, None) for app in args.apps if app in APPS_BETS]
+        preparadas = set()
+        for app, escala in cenarios:
+            if escala is None:
+                ambiente = {'BETS_URL_BASE': servidor.url, 'BETS_PASTA_DADOS': os.path.join(pasta, 'bets')}
+            else:
+                pasta_frota = os.path.join(pasta, f'frota_{escala}')
+                if escala not in preparadas:
+                    preparar_frota(pasta_frota, escala, args.datas, args.servidores)
+                    preparadas.add(escala)
+                ambiente = {'DASHBOARD_PASTA_DADOS': pasta_frota}
+            for sessoes in args.sessoes:
+                linha = resumo(app, escala or '-', sessoes, medir(app, sessoes, args.passos, ambiente))
+                linhas.append(linha)
+                print(f"⏳ {app:20} bases={linha['Bases']!s:>6} sessões={sessoes:<3} "
+                      f"P50={linha['P50 (s)']:.2f}s P95={linha['P95 (s)']:.2f}s "
+                      f"{linha['MB/sessão']:.1f} MB/sessão, erros={linha['Erros']}")
+        if servidor is not None:
+            servidor.shutdown()
+
+    tabela = pd.DataFrame(linhas, columns=COLUNAS)
+    print(tabela.to_string(index=False))
+    if args.saida:
+        tabela.to_csv(args.saida, index=False)
+        print(f'📁 Resumo gravado em {args.saida}')
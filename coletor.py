@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import ingestao
+
+# Coleta direta do tamanho dos bancos (substitui o `\l+` copiado para texto e lido por regex).
+# Conexões por servidor, no formato do libpq: {"s5": {"host": ..., "port": 5432, "user": ..., "dbname": "postgres"}}
+# ou {"s5": "postgresql://usuario@host:5432/postgres"}; a senha vem do ~/.pgpass ou de PGPASSWORD
+ARQUIVO_SERVIDORES = os.environ.get('DASHBOARD_SERVIDORES_BANCOS', 'servidores_bancos.json')
+FONTE = 'saida_bancos'
+
+# Conexões abertas em cada servidor: os tamanhos de um servidor são calculados em paralelo por elas
+CONEXOES_POR_SERVIDOR = 4
+# pg_database_size percorre os arquivos do banco; consultas pequenas equilibram a carga entre as conexões
+BANCOS_POR_CONSULTA = 10
+TIMEOUT_CONEXAO_S = 10
+TIMEOUT_CONSULTA_MS = 300_000
+
+CONSULTA_BANCOS = (
+    'SELECT datname FROM pg_database WHERE datallowconn AND NOT datistemplate ORDER BY datname'
+)
+CONSULTA_TAMANHOS = (
+    'SELECT datname, pg_database_size(datname) FROM pg_database WHERE datname = ANY(%s)'
+)
+
+
+def carregar_servidores(caminho=ARQUIVO_SERVIDORES):
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f'{caminho} não existe: configure as conexões dos servidores')
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def abrir_pool(conexao, conexoes=CONEXOES_POR_SERVIDOR):
+    """Pool de conexões de um servidor; `conexao` é uma URI/DSN ou um dicionário de parâmetros do libpq."""
+    # Importado só aqui: dashboards e demais CLIs não dependem do driver
+    from psycopg2.pool import ThreadedConnectionPool
+    argumentos, parametros = ([conexao], {}) if isinstance(conexao, str) else ([], dict(conexao))
+    return ThreadedConnectionPool(
+        1, conexoes, *argumentos,
+        connect_timeout=TIMEOUT_CONEXAO_S,
+        options=f'-c statement_timeout={TIMEOUT_CONSULTA_MS}',
+        application_name='coletor_dashboards',
+        **parametros,
+    )
+
+
+def _consultar(pool, sql, parametros=None):
+    conexao = pool.getconn()
+    try:
+        # Só leituras: sem transação aberta prendendo o backend entre uma consulta e outra
+        conexao.autocommit = True
+        with conexao.cursor() as cursor:
+            cursor.execute(sql, parametros)
+            return cursor.fetchall()
+    finally:
+        pool.putconn(conexao)
+
+
+def _listar(servidor, conexao, conexoes):
+    pool = abrir_pool(conexao, conexoes)
+    try:
+        return pool, [nome for (nome,) in _consultar(pool, CONSULTA_BANCOS)]
+    except Exception:
+        pool.closeall()
+        raise
+
+
+def coletar(servidores, conexoes=CONEXOES_POR_SERVIDOR, bancos_por_consulta=BANCOS_POR_CONSULTA, data=None):
+    """Tamanho de todos os bancos de todos os servidores, consultados ao mesmo tempo.
+
+    Devolve o snapshot (Servidor, Base, Data, Tamanho (MB)) e um dicionário servidor -> erro.
+    Um servidor com qualquer consulta falha fica de fora inteiro, para não gravar metade dele.
+    """
+    data = pd.Timestamp(data if data is not None else pd.Timestamp.now()).normalize()
+    pools, tamanhos, falhas = {}, {servidor: [] for servidor in servidores}, {}
+    # Um executor por servidor, do tamanho do pool: o ThreadedConnectionPool não espera conexão livre
+    # (getconn acima de maxconn levanta PoolError), então um servidor nunca pode ter mais consultas
+    # simultâneas que conexões. Os servidores continuam sendo consultados ao mesmo tempo
+    executores = {servidor: ThreadPoolExecutor(max_workers=max(conexoes, 1)) for servidor in servidores}
+    try:
+        listagens = {
+            executores[servidor].submit(_listar, servidor, conexao, conexoes): servidor
+            for servidor, conexao in servidores.items()
+        }
+        consultas = {}
+        for futuro in as_completed(listagens):
+            servidor = listagens[futuro]
+            try:
+                pools[servidor], bancos = futuro.result()
+            except Exception as erro:
+                falhas[servidor] = str(erro).strip()
+                continue
+            for i in range(0, len(bancos), bancos_por_consulta):
+                lote = bancos[i:i + bancos_por_consulta]
+                futuro_lote = executores[servidor].submit(_consultar, pools[servidor], CONSULTA_TAMANHOS, (lote,))
+                consultas[futuro_lote] = servidor
+
+        for futuro in as_completed(consultas):
+            servidor = consultas[futuro]
+            try:
+                tamanhos[servidor] += futuro.result()
+            except Exception as erro:
+                falhas.setdefault(servidor, str(erro).strip())
+    finally:
+        for executor in executores.values():
+            executor.shutdown(cancel_futures=True)
+        for pool in pools.values():
+            pool.closeall()
+
+    linhas = [
+        (servidor, nome, tamanho)
+        for servidor, medidos in tamanhos.items() if servidor not in falhas
+        for nome, tamanho in medidos
+    ]
+    snapshot = pd.DataFrame(linhas, columns=['Servidor', 'Base', 'Tamanho (bytes)'])
+    snapshot = pd.DataFrame({
+        'Servidor': snapshot['Servidor'].astype(str),
+        'Base': snapshot['Base'].astype(str),
+        'Data': pd.Series(data, index=snapshot.index, dtype='datetime64[ns]'),
+        # Mesma unidade do `\l+` (pg_size_pretty usa potências de 1024)
+        'Tamanho (MB)': snapshot['Tamanho (bytes)'].astype('float64') / (1024 * 1024),
+    })
+    return snapshot.sort_values(['Servidor', 'Base'], ignore_index=True)[ingestao.COLUNAS_SNAPSHOT], falhas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Coleta pg_database_size de todos os bancos e grava o snapshot.')
+    parser.add_argument('--servidores', default=ARQUIVO_SERVIDORES, help='JSON com a conexão de cada servidor')
+    parser.add_argument('--servidor', action='append', default=[], metavar='NOME=DSN',
+                        help='Conexão avulsa (sobrepõe o JSON); pode repetir')
+    parser.add_argument('--conexoes', type=int, default=CONEXOES_POR_SERVIDOR, help='Conexões por servidor')
+    parser.add_argument('--data', help='Data do snapshot (padrão: hoje)')
+    parser.add_argument('--saida', help='Também salva o snapshot neste CSV')
+    parser.add_argument('--nao-ingerir', action='store_true', help='Só coleta, sem gravar no armazenamento')
+    args = parser.parse_args()
+
+    servidores = {} if args.servidor and not os.path.exists(args.servidores) else carregar_servidores(args.servidores)
+    servidores.update(dict(item.split('=', 1) for item in args.servidor))
+
+    inicio = time.perf_counter()
+    snapshot, falhas = coletar(servidores, args.conexoes, data=args.data)
+    print(f'✅ {len(snapshot)} banco(s) em {snapshot["Servidor"].nunique()} servidor(es) '
+          f'coletados em {time.perf_counter() - inicio:.1f}s')
+    for servidor, erro in falhas.items():
+        print(f'❌ {servidor}: {erro}')
+    if args.saida:
+        snapshot.to_csv(args.saida, index=False, encoding='utf-8')
+        print(f'📁 CSV salvo em: {args.saida}')
+    if not args.nao_ingerir and not snapshot.empty:
+        novas = ingestao.ingerir_snapshot(FONTE, snapshot)
+        print(f'✅ Ingerido em {FONTE}: {len(novas)} anomalia(s) nova(s)')
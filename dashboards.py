@@ -1,63 +1,114 @@
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import streamlit as st
 import numpy as np
 import plotly.express as px
 import io
 from datetime import timedelta
-from statsmodels.tsa.arima.model import ARIMA
-from statsmodels.tsa.stattools import adfuller
-from prophet import Prophet
+
+import agregados
+import anomalias
+import armazenamento
+import capacidade
+import graficos
+import ingestao
+import previsao
+import publicacao
+import reconciliacao
+import resumos
+import tarefas
+import tendencias
 
 # Atualização forçada para commit
 
 # === Carregar dados ===
-df = pd.read_excel('data_raw/saida.xlsx', sheet_name='Crescimento (%)')
-df['Data'] = pd.to_datetime(df['Data']).dt.date  # remove hora
-
-# Não precisa criar a coluna 'Tamanho MB', pois já existe 'Tamanho (MB)'
-
-# === Corrigir cálculo de crescimento percentual ===
-df = df.sort_values(['Base', 'Data'])
-def calcular_crescimento_percentual(grupo):
-    grupo = grupo.sort_values('Data').copy()
-    tamanhos = grupo['Tamanho (MB)'].values
-    crescimento = [0.0]
-    for i in range(1, len(tamanhos)):
-        anterior = tamanhos[i - 1]
-        atual = tamanhos[i]
-        variação = ((atual - anterior) / anterior) * 100 if anterior != 0 else 0
-        crescimento.append(variação)
-    grupo['Crescimento (%)'] = crescimento
-    return grupo
-
-df = df.groupby('Base', group_keys=False).apply(calcular_crescimento_percentual)
+FONTE = 'saida'
+
+# Cores e paletas atribuídas aos servidores na ordem em que são descobertos
+CORES_SERVIDORES = ['gold', 'deepskyblue', 'mediumseagreen', 'salmon', 'orchid', 'slategray']
+PALETAS_SERVIDORES = ['Purples', 'magma']
+
+@st.cache_resource(show_spinner=False, max_entries=len(armazenamento.FONTES))
+def abrir_dados(fonte, assinatura):
+    # Um único DataFrame somente leitura, mapeado do arquivo publicado e compartilhado por todas as sessões.
+    # `assinatura` muda a cada ingestão: a versão nova é aberta e a antiga sai do cache
+    return publicacao.abrir(fonte)
+
+@st.cache_resource(show_spinner=False)
+def iniciar_fila():
+    # Um processo de workers por servidor do Streamlit; ele sai quando o servidor termina
+    return tarefas.iniciar_workers()
+
+@st.cache_data(show_spinner=False)
+def carregar_previsoes(fonte, assinatura):
+    # Modelo vencedor do backtest e sua previsão, gravados pelo job `python previsao.py`
+    return previsao.carregar_modelos(fonte), previsao.carregar_previsoes(fonte)
+
+@st.cache_data(show_spinner=False)
+def carregar_resumo(fonte, nome, assinatura):
+    # Tabelas pequenas consolidadas na ingestão (totais, último tamanho e médias por base)
+    return resumos.carregar(fonte, nome)
+
+@st.cache_data(show_spinner=False)
+def carregar_feed_anomalias(fonte, assinatura):
+    return anomalias.carregar_feed(fonte)
+
+@st.cache_data(show_spinner=False)
+def carregar_capacidade(fonte, assinatura):
+    return capacidade.carregar(fonte)
+
+@st.cache_data(show_spinner=False)
+def carregar_tendencias(fonte, assinatura):
+    # Comportamento do crescimento de cada base, gravado pelo job `python tendencias.py`
+    return tendencias.carregar(fonte)
+
+@st.cache_data(show_spinner=False)
+def carregar_reconciliacao(assinaturas):
+    # Junta as duas fontes; só é recalculada quando as partições de alguma delas mudam
+    df_reconciliacao = reconciliacao.garantir()
+    return df_reconciliacao, reconciliacao.resumo_bases(df_reconciliacao)
+
+servidores = ingestao.garantir(FONTE)
+assinatura_dados = armazenamento.assinatura(FONTE)
+# Crescimento (%) já vem calculado no dataset publicado na ingestão.
+# Servidor/Base são categorias, Data é datetime64 e as medidas float32: as seções abaixo só leem `df`
+df = abrir_dados(FONTE, assinatura_dados)
 
 # === Sidebar ===
 st.sidebar.title("🔎 Filtros")
-bases_disponiveis = sorted(df['Base'].unique())
+bases_disponiveis = df['Base'].cat.categories.tolist()
+# A classificação roda na fila como as projeções; até ela terminar, o filtro usa a tabela anterior
+if tendencias.desatualizada(FONTE):
+    iniciar_fila()
+    tarefas.acompanhar('tendencias', FONTE, 'comportamento do crescimento', st.sidebar)
+df_tendencias = carregar_tendencias(FONTE, assinatura_dados)
+if df_tendencias is not None:
+    comportamentos = st.sidebar.multiselect("Comportamento do crescimento", tendencias.COMPORTAMENTOS)
+    if comportamentos:
+        com_comportamento = set(df_tendencias.loc[df_tendencias['Comportamento'].isin(comportamentos), 'Base'])
+        bases_disponiveis = [b for b in bases_disponiveis if b in com_comportamento]
 base_padrao = bases_disponiveis[:1]
 bases_selecionadas = st.sidebar.multiselect(
     "Selecione as Bases", bases_disponiveis, default=base_padrao
 )
-data_max = df['Data'].max()
-data_min_padrao = data_max.replace(year=data_max.year - 1)
+data_max = df['Data'].max().date()
+# Último ano por padrão, ou o histórico inteiro quando ele é mais curto (ex.: coleta recém-iniciada)
+data_min_padrao = max((data_max - pd.DateOffset(years=1)).date(), df['Data'].min().date())
 periodo = st.sidebar.date_input(
     "Escolha o intervalo de datas",
     value=(data_min_padrao, data_max),
-    min_value=df['Data'].min(),
+    min_value=df['Data'].min().date(),
     max_value=data_max
 )
 inicio = pd.to_datetime(periodo[0])
 fim = pd.to_datetime(periodo[1])
 
 # === Filtrar dados ===
-df_filtrado = df[
+df_filtrado = armazenamento.recortar(
+    df,
     df['Base'].isin(bases_selecionadas) &
-    (pd.to_datetime(df['Data']) >= inicio) &
-    (pd.to_datetime(df['Data']) <= fim)
-]
+    (df['Data'] >= inicio) &
+    (df['Data'] <= fim)
+)
 
 # === Título ===
 st.title("📊 Dashboard de Crescimento das Bases de Dados")
@@ -67,125 +118,184 @@ st.write("Acompanhe a evolução, projeções e variações das bases selecionad
 if any(df_filtrado['Crescimento (%)'] > 50):
     st.warning("🚨 Algumas bases tiveram crescimento acima de 50%!")
 
+# === Feed de anomalias (toda a frota, pontuado na ingestão) ===
+st.subheader("🚨 Anomalias de Crescimento")
+
+col_dias, col_limite = st.columns(2)
+dias_anomalias = col_dias.slider("Anomalias dos últimos (dias):", min_value=7, max_value=365, value=90)
+limite_anomalias = col_limite.slider("Quantidade no ranking:", min_value=10, max_value=200, value=50)
+
+df_anomalias = anomalias.ranking(
+    carregar_feed_anomalias(FONTE, assinatura_dados),
+    desde=pd.Timestamp(data_max) - pd.Timedelta(days=dias_anomalias),
+    limite=limite_anomalias
+)
+if df_anomalias.empty:
+    st.info("✅ Nenhuma anomalia detectada no período.")
+else:
+    st.dataframe(df_anomalias[[
+        'Servidor', 'Base', 'Data', 'Tipo', 'Tamanho (MB)', 'Delta (MB)', 'Z Robusto', 'Pontuação'
+    ]].style.format({
+        'Tamanho (MB)': '{:.2f}',
+        'Delta (MB)': '{:.2f}',
+        'Z Robusto': '{:.1f}',
+        'Pontuação': '{:.1f}'
+    }), hide_index=True)
+
 # === Gráfico com suavização e tendência polinomial ===
 st.subheader("📈 Evolução do Tamanho com Suavização e Tendência (Interativo)")
 
-df_suave = df_filtrado.copy()
-df_suave['Tamanho MB Suave'] = df_suave.groupby('Base')['Tamanho (MB)'].transform(lambda x: x.rolling(window=3, min_periods=1).mean())
-
-fig1_plotly = px.line(
-    df_suave,
-    x='Data',
-    y='Tamanho MB Suave',
-    color='Base',
-    markers=True,
-    title="Tamanho com Média Móvel",
-    labels={'Data': 'Data', 'Tamanho MB Suave': 'Tamanho (MB)', 'Base': 'Base'}
-)
-fig1_plotly.update_layout(
-    legend_title_text='Base',
-    xaxis=dict(showgrid=True, gridcolor='lightgray'),
-    yaxis=dict(showgrid=True, gridcolor='lightgray'),
-    height=400
-)
-st.plotly_chart(fig1_plotly, use_container_width=True)
-
-# === Projeção ARIMA ===
-st.subheader("🔮 Projeção Prophet para os Próximos 90 Dias")
-
-for base in bases_selecionadas:
-    df_base = df_filtrado[df_filtrado['Base'] == base].copy()
-    df_base = df_base.sort_values('Data')
-    # Prophet exige colunas 'ds' (data) e 'y' (valor)
-    df_prophet = df_base.rename(columns={'Data': 'ds', 'Tamanho (MB)': 'y'})[['ds', 'y']]
-    df_prophet['ds'] = pd.to_datetime(df_prophet['ds'])
-
-    try:
-        modelo = Prophet()
-        modelo.fit(df_prophet)
-        # Gerar datas futuras
-        datas_futuras = modelo.make_future_dataframe(periods=90)
-        previsoes = modelo.predict(datas_futuras)
-        # Montar DataFrame para gráfico
-        df_proj = pd.DataFrame({
-            'Data': list(df_prophet['ds']) + list(previsoes['ds'][-90:]),
-            'Tamanho (MB)': list(df_prophet['y']) + list(previsoes['yhat'][-90:]),
-            'Tipo': ['Histórico'] * len(df_prophet) + ['Projeção'] * 90,
-            'Base': [base] * (len(df_prophet) + 90)
-        })
-        fig_prophet = px.line(
-            df_proj,
-            x='Data',
-            y='Tamanho (MB)',
-            color='Tipo',
-            line_dash='Tipo',
-            title=f"Projeção Prophet nos Próximos 90 Dias - {base}",
-            labels={'Data': 'Data', 'Tamanho (MB)': 'Tamanho projetado (MB)', 'Tipo': 'Tipo'}
-        )
-        fig_prophet.update_layout(
-            legend_title_text='Tipo',
-            xaxis=dict(showgrid=True, gridcolor='lightgray'),
-            yaxis=dict(showgrid=True, gridcolor='lightgray'),
-            height=400
-        )
-        st.plotly_chart(fig_prophet, use_container_width=True)
-    except Exception as e:
-        st.warning(f"Não foi possível gerar Prophet para a base {base}: {e}")
+# As figuras Plotly ficam no cache de gráficos (JSON) pelo hash dos dados que elas leem:
+# numa nova execução com os mesmos filtros nada é remontado
+def grafico_suavizacao():
+    # Só a média móvel é uma série nova; o gráfico lê o resto direto de df_filtrado, sem copiá-lo
+    tamanho_suave = df_filtrado.groupby('Base', observed=True)['Tamanho (MB)'].transform(
+        lambda x: x.rolling(window=3, min_periods=1).mean()
+    ).rename('Tamanho MB Suave')
+
+    fig1_plotly = px.line(
+        df_filtrado,
+        x='Data',
+        y=tamanho_suave,
+        color='Base',
+        markers=True,
+        title="Tamanho com Média Móvel",
+        labels={'Data': 'Data', 'Tamanho MB Suave': 'Tamanho (MB)', 'Base': 'Base'}
+    )
+    fig1_plotly.update_layout(
+        legend_title_text='Base',
+        xaxis=dict(showgrid=True, gridcolor='lightgray'),
+        yaxis=dict(showgrid=True, gridcolor='lightgray'),
+        height=400
+    )
+    return fig1_plotly
 
-# === Crescimento percentual ===
-st.subheader("📉 Crescimento Percentual (%) (Interativo)")
+st.plotly_chart(graficos.plotly(
+    graficos.chave('suavizacao', df_filtrado[['Data', 'Base', 'Tamanho (MB)']]), grafico_suavizacao
+), use_container_width=True)
 
-fig3_plotly = px.line(
-    df_filtrado,
-    x='Data',
-    y='Crescimento (%)',
-    color='Base',
-    markers=True,
-    title="Variação Percentual por Base",
-    labels={'Data': 'Data', 'Crescimento (%)': 'Crescimento (%)', 'Base': 'Base'}
-)
-fig3_plotly.update_layout(
-    legend_title_text='Base',
-    xaxis=dict(showgrid=True, gridcolor='lightgray'),
-    yaxis=dict(showgrid=True, gridcolor='lightgray'),
-    height=400
-)
-st.plotly_chart(fig3_plotly, use_container_width=True)
+# === Projeção com o melhor modelo validado em backtest (ajustado fora do dashboard) ===
+st.subheader("🔮 Projeção para os Próximos 90 Dias (melhor modelo por base)")
 
-# === Ranking de crescimento ===
-def ranking_crescimento(df):
-    st.subheader("🚀 Ranking de Crescimento (%) (Interativo)")
+# Com dados novos, o backtest vai para a fila e roda fora da página; as projeções anteriores
+# continuam visíveis e as novas aparecem numa execução seguinte
+if previsao.desatualizada(FONTE):
+    iniciar_fila()
+    tarefas.acompanhar('previsao', FONTE, 'projeções', st)
+
+df_modelos, df_previsoes = carregar_previsoes(FONTE, assinatura_dados)
+if df_modelos is None:
+    st.info("ℹ️ As projeções ainda estão sendo calculadas.")
+else:
+    for (servidor, base), df_base in df_filtrado.groupby(['Servidor', 'Base'], observed=True):
+        modelo = df_modelos[(df_modelos['Servidor'] == servidor) & (df_modelos['Base'] == base)]
+        if modelo.empty:
+            st.info(f"ℹ️ A base {base} ({servidor}) ainda não tem projeção calculada.")
+            continue
+        modelo = modelo.iloc[0]
+        df_futuro = df_previsoes[(df_previsoes['Servidor'] == servidor) & (df_previsoes['Base'] == base)]
+        df_proj = pd.concat([
+            pd.DataFrame({'Data': df_base['Data'], 'Tamanho (MB)': df_base['Tamanho (MB)'], 'Tipo': 'Histórico'}),
+            pd.DataFrame({'Data': df_futuro['Data'], 'Tamanho (MB)': df_futuro['Tamanho (MB)'], 'Tipo': 'Projeção'}),
+        ], ignore_index=True)
+        erro = '' if pd.isna(modelo['Erro (%)']) else f", erro no backtest {modelo['Erro (%)']:.2f}%"
+        titulo = f"Projeção {modelo['Modelo']} nos Próximos 90 Dias - {base} ({servidor}{erro})"
+
+        def grafico_previsao():
+            fig_previsao = px.line(
+                df_proj,
+                x='Data',
+                y='Tamanho (MB)',
+                color='Tipo',
+                line_dash='Tipo',
+                title=titulo,
+                labels={'Data': 'Data', 'Tamanho (MB)': 'Tamanho projetado (MB)', 'Tipo': 'Tipo'}
+            )
+            fig_previsao.update_layout(
+                legend_title_text='Tipo',
+                xaxis=dict(showgrid=True, gridcolor='lightgray'),
+                yaxis=dict(showgrid=True, gridcolor='lightgray'),
+                height=400
+            )
+            return fig_previsao
+
+        st.plotly_chart(graficos.plotly(
+            graficos.chave('previsao', df_proj, titulo=titulo), grafico_previsao
+        ), use_container_width=True)
+        if modelo['Última Data'] < df_base['Data'].max():
+            st.caption(f"Modelo ajustado com dados até {modelo['Última Data']:%d/%m/%Y}.")
+
+# === Crescimento percentual ===
+st.subheader("📉 Crescimento Percentual (%) (Interativo)")
 
-    df_agg = df_filtrado.groupby('Base').agg({
-        'Crescimento (%)': 'mean',
-        'Tamanho (MB)': lambda x: x.diff().mean()
-    }).sort_values('Crescimento (%)', ascending=False).reset_index()
-    df_agg = df_agg.rename(columns={
-        'Crescimento (%)': 'Crescimento Médio (%)',
-        'Tamanho (MB)': 'Crescimento Médio (MB)'
-    })
-
-    fig4_plotly = px.bar(
-        df_agg.head(10),
-        x='Crescimento Médio (%)',
-        y='Base',
-        orientation='h',
-        title="Ranking de Crescimento (%)",
-        labels={'Crescimento Médio (%)': 'Crescimento Médio (%)', 'Base': 'Base'}
+def grafico_crescimento_percentual():
+    fig3_plotly = px.line(
+        df_filtrado,
+        x='Data',
+        y='Crescimento (%)',
+        color='Base',
+        markers=True,
+        title="Variação Percentual por Base",
+        labels={'Data': 'Data', 'Crescimento (%)': 'Crescimento (%)', 'Base': 'Base'}
     )
-    fig4_plotly.update_layout(
+    fig3_plotly.update_layout(
+        legend_title_text='Base',
         xaxis=dict(showgrid=True, gridcolor='lightgray'),
         yaxis=dict(showgrid=True, gridcolor='lightgray'),
         height=400
     )
-    st.plotly_chart(fig4_plotly, use_container_width=True)
+    return fig3_plotly
+
+st.plotly_chart(graficos.plotly(
+    graficos.chave('crescimento_percentual', df_filtrado[['Data', 'Base', 'Crescimento (%)']]),
+    grafico_crescimento_percentual
+), use_container_width=True)
+
+# === Ranking de crescimento ===
+def ranking_crescimento(df):
+    st.subheader("🚀 Ranking de Crescimento (%) (Interativo)")
+
+    if inicio <= df['Data'].min() and fim >= df['Data'].max():
+        # Histórico inteiro: médias já consolidadas na ingestão
+        df_agg = resumos.ranking_crescimento(
+            carregar_resumo(FONTE, 'crescimento_base', assinatura_dados), bases_selecionadas
+        )
+    else:
+        df_agg = df_filtrado.groupby('Base', observed=True).agg({
+            'Crescimento (%)': 'mean',
+            'Tamanho (MB)': lambda x: x.diff().mean()
+        }).sort_values('Crescimento (%)', ascending=False).reset_index()
+        df_agg = df_agg.rename(columns={
+            'Crescimento (%)': 'Crescimento Médio (%)',
+            'Tamanho (MB)': 'Crescimento Médio (MB)'
+        })
+
+    def grafico_ranking():
+        fig4_plotly = px.bar(
+            df_agg.head(10),
+            x='Crescimento Médio (%)',
+            y='Base',
+            orientation='h',
+            title="Ranking de Crescimento (%)",
+            labels={'Crescimento Médio (%)': 'Crescimento Médio (%)', 'Base': 'Base'}
+        )
+        fig4_plotly.update_layout(
+            xaxis=dict(showgrid=True, gridcolor='lightgray'),
+            yaxis=dict(showgrid=True, gridcolor='lightgray'),
+            height=400
+        )
+        return fig4_plotly
+
+    st.plotly_chart(graficos.plotly(
+        graficos.chave('ranking', df_agg.head(10)), grafico_ranking
+    ), use_container_width=True)
 
 # Chamada da função (fora da definição)
 ranking_crescimento(df_filtrado)
 
 # === Tabela e download ===
 st.subheader("📋 Tabela de Dados Filtrados")
-st.dataframe(df_filtrado)
+st.dataframe(df_filtrado, column_config={'Data': st.column_config.DateColumn('Data', format='DD/MM/YYYY')})
 
 buffer = io.BytesIO()
 with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
@@ -199,87 +309,218 @@ st.download_button(
 )
 
 # === Definir último mês e ano com base na data mais recente ===
-ultima_data = pd.to_datetime(df['Data']).max()
+ultima_data = df['Data'].max()
 ultimo_mes = ultima_data.month
 ultimo_ano = ultima_data.year
 
-# === Filtrar último registro por base no último mês ===
-df_ultimo_mes = df[
-    (pd.to_datetime(df['Data']).dt.month == ultimo_mes) &
-    (pd.to_datetime(df['Data']).dt.year == ultimo_ano)
-].copy()
-
-df_ultimo_mes_atual = (
-    df_ultimo_mes.sort_values('Data')
-    .groupby(['Servidor', 'Base'], as_index=False)
-    .last()
-)
-
 # === Função para gráfico Top 10 por servidor ===
-def plot_top10(df_servidor, servidor_nome, cor):
-    top10 = df_servidor.nlargest(10, 'Tamanho (MB)')
+def plot_top10(top10, servidor_nome, cor):
     st.subheader(f"🏆 Top 10 Bases - Servidor {servidor_nome} ({ultimo_mes:02d}/{ultimo_ano})")
-    fig, ax = plt.subplots(figsize=(10, 4))
-    sns.barplot(data=top10, x='Base', y='Tamanho (MB)', color=cor, ax=ax)
-    ax.set_title(f"Top 10 Bases - Servidor {servidor_nome} ({ultimo_mes:02d}/{ultimo_ano})")
-    ax.set_xlabel("Base")
-    ax.set_ylabel("Tamanho (MB)")
-    ax.tick_params(axis='x', rotation=45)
-    ax.grid(True, axis='y', linestyle='--', linewidth=0.5)
-    ax.grid(True, axis='x', linestyle='--', linewidth=0.5)
-    st.pyplot(fig)
-
-# === Gráficos Top 10 por servidor ===
-df_s5 = df_ultimo_mes_atual[df_ultimo_mes_atual['Servidor'] == 's5']
-df_s6 = df_ultimo_mes_atual[df_ultimo_mes_atual['Servidor'] == 's6']
-
-if not df_s5.empty:
-    plot_top10(df_s5, '5', 'gold')
-else:
-    st.info("ℹ️ Nenhum dado disponível para o Servidor 5 no último mês.")
 
-if not df_s6.empty:
-    plot_top10(df_s6, '6', 'deepskyblue')
-else:
-    st.info("ℹ️ Nenhum dado disponível para o Servidor 6 no último mês.")
+    def desenhar():
+        # seaborn/matplotlib custam ~1s de partida; só são importados quando o gráfico é desenhado
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        fig, ax = plt.subplots(figsize=(10, 4))
+        sns.barplot(data=top10, x='Base', y='Tamanho (MB)', color=cor, ax=ax)
+        ax.set_title(f"Top 10 Bases - Servidor {servidor_nome} ({ultimo_mes:02d}/{ultimo_ano})")
+        ax.set_xlabel("Base")
+        ax.set_ylabel("Tamanho (MB)")
+        ax.tick_params(axis='x', rotation=45)
+        ax.grid(True, axis='y', linestyle='--', linewidth=0.5)
+        ax.grid(True, axis='x', linestyle='--', linewidth=0.5)
+        return fig
+
+    # A imagem renderizada vem do cache enquanto o Top 10 não mudar; a figura é fechada após salvar
+    chave = graficos.chave('top10', top10[['Base', 'Tamanho (MB)']], servidor=servidor_nome, cor=cor,
+                           mes=(ultimo_mes, ultimo_ano))
+    st.image(graficos.imagem(chave, desenhar), use_column_width=True)
 
-# Agrupa por servidor e data, somando o tamanho total das bases
-df_total_evolucao = (
-    df.groupby(['Servidor', 'Data'], as_index=False)['Tamanho (MB)'].sum()
-    .sort_values(['Servidor', 'Data'])
+# === Gráficos Top 10 por servidor ===
+# O Top 10 sai do último tamanho de cada base, consolidado na ingestão; só desenhamos os servidores escolhidos
+servidores_top10 = st.multiselect(
+    "Servidores para o Top 10:", servidores, default=servidores[:2]
 )
+df_ultimos = carregar_resumo(FONTE, 'ultimo_por_base', assinatura_dados)
+
+for servidor in servidores_top10:
+    nome_servidor = servidor.removeprefix('s')
+    ultima_data_servidor, top10 = resumos.top_ultimo_mes(df_ultimos, servidor)
+    no_ultimo_mes = (
+        ultima_data_servidor is not None
+        and (ultima_data_servidor.month, ultima_data_servidor.year) == (ultimo_mes, ultimo_ano)
+    )
+    if no_ultimo_mes and not top10.empty:
+        plot_top10(top10, nome_servidor, CORES_SERVIDORES[servidores.index(servidor) % len(CORES_SERVIDORES)])
+    else:
+        st.info(f"ℹ️ Nenhum dado disponível para o Servidor {nome_servidor} no último mês.")
+
+# Evolução do total por servidor e data, consolidada na ingestão
+df_total_evolucao = carregar_resumo(FONTE, 'totais_diarios', assinatura_dados)
 
 # Gráfico de linha interativo: evolução do total por servidor ao longo do tempo
 st.subheader("📈 Evolução do Total de Dados por Servidor")
 
-fig_evolucao_total = px.line(
-    df_total_evolucao,
-    x='Data',
-    y='Tamanho (MB)',
-    color='Servidor',
-    markers=True,
-    title="Evolução do Total de Dados por Servidor",
-    labels={'Data': 'Data', 'Tamanho (MB)': 'Tamanho Total (MB)', 'Servidor': 'Servidor'}
-)
-fig_evolucao_total.update_layout(
-    legend_title_text='Servidor',
-    xaxis=dict(showgrid=True, gridcolor='lightgray'),
-    yaxis=dict(showgrid=True, gridcolor='lightgray'),
-    height=400
+granularidade = st.radio("Granularidade:", ["Diária", "Mensal"], horizontal=True)
+df_grafico_total = (
+    df_total_evolucao if granularidade == "Diária"
+    else carregar_resumo(FONTE, 'totais_mensais', assinatura_dados)
 )
-st.plotly_chart(fig_evolucao_total, use_container_width=True)
 
-# === Crescimento por base com seleção de servidor e filtro por data ===
-st.subheader("📊 Crescimento por Base por Servidor e Período")
+def grafico_evolucao_total():
+    fig_evolucao_total = px.line(
+        df_grafico_total,
+        x='Data',
+        y='Tamanho (MB)',
+        color='Servidor',
+        markers=True,
+        title="Evolução do Total de Dados por Servidor",
+        labels={'Data': 'Data', 'Tamanho (MB)': 'Tamanho Total (MB)', 'Servidor': 'Servidor'}
+    )
+    fig_evolucao_total.update_layout(
+        legend_title_text='Servidor',
+        xaxis=dict(showgrid=True, gridcolor='lightgray'),
+        yaxis=dict(showgrid=True, gridcolor='lightgray'),
+        height=400
+    )
+    return fig_evolucao_total
+
+st.plotly_chart(graficos.plotly(
+    graficos.chave('evolucao_total', df_grafico_total[['Data', 'Servidor', 'Tamanho (MB)']]), grafico_evolucao_total
+), use_container_width=True)
 
-# Garantir que a coluna 'Diferença (MB)' esteja em formato numérico
-df['Diferença (MB)'] = pd.to_numeric(df['Diferença (MB)'], errors='coerce')
+# === Capacidade: dias até esgotar o disco (projeção feita na ingestão) ===
+st.subheader("🧮 Capacidade: Dias até Esgotar o Disco por Servidor")
 
-# Garantir que a coluna de data esteja em formato datetime
-df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
+df_capacidade = carregar_capacidade(FONTE, assinatura_dados)
+if df_capacidade.empty:
+    st.info(f"ℹ️ Nenhuma capacidade configurada para esta fonte em {capacidade.ARQUIVO_CAPACIDADE}.")
+else:
+    df_capacidade = df_capacidade.assign(
+        Alvo=df_capacidade['Servidor'] + ' ' + df_capacidade['Volume']
+    ).sort_values('Dias até Cheio')
+    # Só entram no gráfico os servidores que de fato vão encher no horizonte projetado
+    df_grafico_capacidade = df_capacidade[df_capacidade['Dias até Cheio'] <= capacidade.HORIZONTE_MAXIMO_DIAS]
+    if not df_grafico_capacidade.empty:
+        def grafico_capacidade():
+            fig_capacidade = px.bar(
+                df_grafico_capacidade,
+                x='Dias até Cheio',
+                y='Alvo',
+                orientation='h',
+                error_x=(df_grafico_capacidade['Dias (mais tarde)'] - df_grafico_capacidade['Dias até Cheio']).clip(upper=capacidade.HORIZONTE_MAXIMO_DIAS),
+                error_x_minus=df_grafico_capacidade['Dias até Cheio'] - df_grafico_capacidade['Dias (mais cedo)'],
+                title="Dias até Esgotar a Capacidade (faixa de ~95%)",
+                labels={'Dias até Cheio': 'Dias até cheio', 'Alvo': 'Servidor / Volume'}
+            )
+            fig_capacidade.update_layout(
+                xaxis=dict(showgrid=True, gridcolor='lightgray'),
+                yaxis=dict(showgrid=True, gridcolor='lightgray'),
+                height=400
+            )
+            return fig_capacidade
+
+        colunas_capacidade = ['Alvo', 'Dias (mais cedo)', 'Dias até Cheio', 'Dias (mais tarde)']
+        st.plotly_chart(graficos.plotly(
+            graficos.chave('capacidade', df_grafico_capacidade[colunas_capacidade]), grafico_capacidade
+        ), use_container_width=True)
+
+    st.dataframe(df_capacidade[[
+        'Servidor', 'Volume', 'Capacidade (MB)', 'Uso Atual (MB)', 'Uso (%)', 'Crescimento (MB/dia)',
+        'Dias (mais cedo)', 'Dias até Cheio', 'Dias (mais tarde)', 'Data Estimada'
+    ]].style.format({
+        'Capacidade (MB)': '{:.0f}',
+        'Uso Atual (MB)': '{:.0f}',
+        'Uso (%)': '{:.1f}%',
+        'Crescimento (MB/dia)': '{:.2f}',
+        'Dias (mais cedo)': '{:.0f}',
+        'Dias até Cheio': '{:.0f}',
+        'Dias (mais tarde)': '{:.0f}'
+    }), hide_index=True)
+
+# === Conciliação: listagens de arquivos (saida) × tamanhos do psql \l+ (saida_bancos) ===
+st.subheader("🔗 Conciliação Arquivos × Bancos")
+
+try:
+    df_reconciliacao, df_resumo_conciliacao = carregar_reconciliacao(tuple(
+        armazenamento.assinatura(fonte) for fonte in (reconciliacao.FONTE_ARQUIVOS, reconciliacao.FONTE_BANCOS)
+    ))
+except FileNotFoundError as erro:
+    df_reconciliacao = None
+    st.info(f"ℹ️ Conciliação indisponível: {erro}")
+
+if df_reconciliacao is not None:
+    contagem_situacoes = df_resumo_conciliacao['Situação'].value_counts()
+    for coluna, situacao in zip(st.columns(len(reconciliacao.SITUACOES)), reconciliacao.SITUACOES):
+        coluna.metric(f"Bases: {situacao}", int(contagem_situacoes.get(situacao, 0)))
+
+    situacoes_exibidas = st.multiselect(
+        "Situações exibidas:", reconciliacao.SITUACOES,
+        default=[reconciliacao.DIVERGENTE, reconciliacao.SO_ARQUIVOS, reconciliacao.SO_BANCOS]
+    )
+    st.dataframe(df_resumo_conciliacao[df_resumo_conciliacao['Situação'].isin(situacoes_exibidas)].style.format({
+        'Razão Típica': '{:.1f}',
+        'Maior Desvio (%)': '{:.1f}%'
+    }), hide_index=True)
+
+    # Visão combinada de uma base presente nas duas fontes
+    df_ambas = df_resumo_conciliacao[df_resumo_conciliacao['Presença'] == 'Ambas']
+    if not df_ambas.empty:
+        opcoes_conciliacao = list(zip(df_ambas['Servidor'], df_ambas['Base']))
+        servidor_conciliacao, base_conciliacao = st.selectbox(
+            "Base para comparar as duas fontes:", opcoes_conciliacao, format_func=lambda o: f"{o[1]} ({o[0]})"
+        )
+        df_serie_conciliacao = df_reconciliacao[
+            (df_reconciliacao['Servidor'] == servidor_conciliacao) & (df_reconciliacao['Base'] == base_conciliacao)
+        ]
+
+        def grafico_conciliacao():
+            # O dump é bem menor que o banco: a listagem aparece multiplicada pela razão típica da base
+            razao_tipica = df_serie_conciliacao['Razão'].median()
+            df_linhas = pd.concat([
+                pd.DataFrame({
+                    'Data': df_serie_conciliacao['Data Bancos'],
+                    'Tamanho (MB)': df_serie_conciliacao['Tamanho Bancos (MB)'],
+                    'Fonte': 'Banco (\\l+)',
+                }),
+                pd.DataFrame({
+                    'Data': df_serie_conciliacao['Data'],
+                    'Tamanho (MB)': df_serie_conciliacao['Tamanho Arquivos (MB)'] * razao_tipica,
+                    'Fonte': f'Arquivos × {razao_tipica:.1f}',
+                }),
+            ], ignore_index=True).dropna().sort_values('Data')
+            fig_conciliacao = px.line(
+                df_linhas,
+                x='Data',
+                y='Tamanho (MB)',
+                color='Fonte',
+                markers=True,
+                title=f"Arquivos × Banco - {base_conciliacao} ({servidor_conciliacao})",
+                labels={'Data': 'Data', 'Tamanho (MB)': 'Tamanho (MB)', 'Fonte': 'Fonte'}
+            )
+            divergentes = df_serie_conciliacao[df_serie_conciliacao['Situação'] == reconciliacao.DIVERGENTE]
+            fig_conciliacao.add_scatter(
+                x=divergentes['Data Bancos'], y=divergentes['Tamanho Bancos (MB)'], mode='markers',
+                marker=dict(color='red', size=12, symbol='x'), name='Divergente'
+            )
+            fig_conciliacao.update_layout(
+                legend_title_text='Fonte',
+                xaxis=dict(showgrid=True, gridcolor='lightgray'),
+                yaxis=dict(showgrid=True, gridcolor='lightgray'),
+                height=400
+            )
+            return fig_conciliacao
+
+        st.plotly_chart(graficos.plotly(
+            graficos.chave('conciliacao', df_serie_conciliacao), grafico_conciliacao
+        ), use_container_width=True)
+
+# === Crescimento por base com seleção de servidor e filtro por data ===
+st.subheader("📊 Crescimento por Base por Servidor e Período")
 
 # Selectbox para escolha do servidor
-servidor_selecionado = st.selectbox("Selecione o servidor:", options=['s5', 's6'])
+servidor_selecionado = st.selectbox("Selecione o servidor:", options=servidores)
 
 # Filtro de data
 data_min = df['Data'].min()
@@ -290,29 +531,16 @@ data_inicio, data_fim = st.date_input("Selecione o intervalo de datas:",
                                       max_value=data_max)
 
 # Filtrar dados conforme seleção
-df_filtrado = df[
+df_filtrado = armazenamento.recortar(
+    df,
     (df['Servidor'] == servidor_selecionado) &
     (df['Data'] >= pd.to_datetime(data_inicio)) &
     (df['Data'] <= pd.to_datetime(data_fim))
-].copy()
-
-# Agrupar por base e calcular crescimento real (final - inicial)
-crescimento_por_base = []
-for base in df_filtrado['Base'].unique():
-    df_base = df_filtrado[df_filtrado['Base'] == base].sort_values('Data')
-    if len(df_base) < 2:
-        continue
-    tamanho_inicial = df_base['Tamanho (MB)'].iloc[0]
-    tamanho_final = df_base['Tamanho (MB)'].iloc[-1]
-    crescimento_mb = tamanho_final - tamanho_inicial
-    crescimento_por_base.append({
-        'Base': base,
-        'Tamanho Inicial (MB)': tamanho_inicial,
-        'Tamanho Final (MB)': tamanho_final,
-        'Crescimento (MB)': crescimento_mb
-    })
-
-crescimento_por_base_df = pd.DataFrame(crescimento_por_base).sort_values('Crescimento (MB)', ascending=False)
+)
+
+# Crescimento real (final - inicial) de todas as bases de uma vez
+crescimento_por_base_df = agregados.crescimento_no_periodo(df_filtrado).drop(columns='Crescimento (%)')
+crescimento_por_base_df = crescimento_por_base_df.sort_values('Crescimento (MB)', ascending=False)
 
 # Mostrar tabela
 st.dataframe(crescimento_por_base_df)
@@ -321,19 +549,30 @@ st.dataframe(crescimento_por_base_df)
 top_n = st.slider("Número de bases a exibir no gráfico:", min_value=5, max_value=30, value=15)
 dados_grafico = crescimento_por_base_df.head(top_n)
 
-# Gráfico horizontal para melhor legibilidade
-fig, ax = plt.subplots(figsize=(10, len(dados_grafico) * 0.4))
-palette = sns.color_palette("Purples", len(dados_grafico)) if servidor_selecionado == 's5' else sns.color_palette("magma", len(dados_grafico))
-sns.barplot(data=dados_grafico, y='Base', x='Crescimento (MB)', palette=palette, ax=ax)
+paleta = PALETAS_SERVIDORES[servidores.index(servidor_selecionado) % len(PALETAS_SERVIDORES)]
 
-# Títulos e rótulos
-ax.set_title(f"Crescimento por Base - Servidor {servidor_selecionado} ({data_inicio} a {data_fim})")
-ax.set_xlabel("Crescimento (MB)")
-ax.set_ylabel("Base")
-ax.grid(True, axis='x', linestyle='--', linewidth=0.5)
+# Gráfico horizontal para melhor legibilidade
+def desenhar_crescimento_por_base():
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=(10, len(dados_grafico) * 0.4))
+    palette = sns.color_palette(paleta, len(dados_grafico))
+    sns.barplot(data=dados_grafico, y='Base', x='Crescimento (MB)', palette=palette, ax=ax)
+
+    # Títulos e rótulos
+    ax.set_title(f"Crescimento por Base - Servidor {servidor_selecionado} ({data_inicio} a {data_fim})")
+    ax.set_xlabel("Crescimento (MB)")
+    ax.set_ylabel("Base")
+    ax.grid(True, axis='x', linestyle='--', linewidth=0.5)
+    return fig
 
-# Exibir gráfico
-st.pyplot(fig)
+# Exibir gráfico (renderizado só quando os dados ou os parâmetros mudam)
+chave_crescimento = graficos.chave(
+    'crescimento_por_base', dados_grafico[['Base', 'Crescimento (MB)']], servidor=servidor_selecionado,
+    paleta=paleta, periodo=(data_inicio, data_fim)
+)
+st.image(graficos.imagem(chave_crescimento, desenhar_crescimento_por_base), use_column_width=True)
 
 # Mostrar crescimento total
 crescimento_total = crescimento_por_base_df['Crescimento (MB)'].sum()
@@ -346,28 +585,8 @@ st.subheader("📈 Evolução do Tamanho por Base no Período Selecionado")
 limite_alerta_mb = st.slider("Defina o limite de alerta para crescimento (MB):", min_value=1.0, max_value=100.0, value=20.0)
 
 # Calcular crescimento absoluto e percentual por base
-df_evolucao = df_filtrado.sort_values(['Base', 'Data']).copy()
-bases = df_evolucao['Base'].unique()
-
-dados_crescimento = []
-for base in bases:
-    df_base = df_evolucao[df_evolucao['Base'] == base]
-    if len(df_base) < 2:
-        continue
-    tamanho_inicial = df_base['Tamanho (MB)'].iloc[0]
-    tamanho_final = df_base['Tamanho (MB)'].iloc[-1]
-    crescimento_mb = tamanho_final - tamanho_inicial
-    crescimento_pct = ((tamanho_final - tamanho_inicial) / tamanho_inicial) * 100 if tamanho_inicial != 0 else 0
-    dados_crescimento.append({
-        'Base': base,
-        'Tamanho Inicial (MB)': tamanho_inicial,
-        'Tamanho Final (MB)': tamanho_final,
-        'Crescimento (MB)': crescimento_mb,
-        'Crescimento (%)': crescimento_pct
-    })
-
-df_crescimento = pd.DataFrame(dados_crescimento)
-df_crescimento = df_crescimento.sort_values('Crescimento (MB)', ascending=False)
+df_evolucao = df_filtrado.sort_values(['Base', 'Data'])
+df_crescimento = agregados.crescimento_no_periodo(df_evolucao).sort_values('Crescimento (MB)', ascending=False)
 
 # Destacar bases com crescimento acima do limite
 bases_alerta = df_crescimento[df_crescimento['Crescimento (MB)'] > limite_alerta_mb]
@@ -399,24 +618,31 @@ percentual_minimo = st.slider(
 
 # Filtrar as bases que atingiram o percentual mínimo
 bases_filtradas = df_crescimento[df_crescimento['Crescimento (%)'] >= percentual_minimo]['Base'].tolist()
-df_evolucao_filtrada = df_evolucao[df_evolucao['Base'].isin(bases_filtradas)]
+df_evolucao_filtrada = armazenamento.recortar(df_evolucao, df_evolucao['Base'].isin(bases_filtradas))
 
 # Gráfico de linha por base (apenas bases filtradas)
 st.markdown("### 📈 Evolução Interativa do Tamanho por Base (Filtrado pelo crescimento mínimo)")
 
-fig_plotly = px.line(
-    df_evolucao_filtrada,
-    x='Data',
-    y='Tamanho (MB)',
-    color='Base',
-    markers=True,
-    title=f"Evolução do Tamanho por Base - Servidor {servidor_selecionado} (Crescimento ≥ {percentual_minimo:.1f}%)",
-    labels={'Data': 'Data', 'Tamanho (MB)': 'Tamanho (MB)', 'Base': 'Base'}
-)
-fig_plotly.update_layout(
-    legend_title_text='Base',
-    xaxis=dict(showgrid=True, gridcolor='lightgray'),
-    yaxis=dict(showgrid=True, gridcolor='lightgray'),
-    height=600
-)
-st.plotly_chart(fig_plotly, use_container_width=True)
+def grafico_evolucao_por_base():
+    fig_plotly = px.line(
+        df_evolucao_filtrada,
+        x='Data',
+        y='Tamanho (MB)',
+        color='Base',
+        markers=True,
+        title=f"Evolução do Tamanho por Base - Servidor {servidor_selecionado} (Crescimento ≥ {percentual_minimo:.1f}%)",
+        labels={'Data': 'Data', 'Tamanho (MB)': 'Tamanho (MB)', 'Base': 'Base'}
+    )
+    fig_plotly.update_layout(
+        legend_title_text='Base',
+        xaxis=dict(showgrid=True, gridcolor='lightgray'),
+        yaxis=dict(showgrid=True, gridcolor='lightgray'),
+        height=600
+    )
+    return fig_plotly
+
+st.plotly_chart(graficos.plotly(
+    graficos.chave('evolucao_por_base', df_evolucao_filtrada[['Data', 'Base', 'Tamanho (MB)']],
+                   servidor=servidor_selecionado, percentual_minimo=percentual_minimo),
+    grafico_evolucao_por_base
+), use_container_width=True)
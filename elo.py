@@ -0,0 +1,193 @@
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import modelo
+import resultados
+
+# Ratings Elo por liga com vantagem de mando, atualizados só com os jogos que terminaram desde a
+# última vez. O estado guarda, por temporada, a última rodada processada e os jogos dessas rodadas
+# que ainda estavam sem resultado (adiados); só eles e as rodadas seguintes são olhados de novo.
+# Depois de cada rodada processada o rating de todos os times é gravado como checkpoint, para
+# consultar a força dos times em qualquer rodada
+PASTA_ELO = os.path.join(os.environ.get('BETS_PASTA_DADOS', 'data_bets'), 'elo')
+INICIAL = 1500.0
+K = 20.0
+VANTAGEM_CASA = 60.0
+# Na virada de temporada cada time perde esta parte da distância até a média da liga
+REGRESSAO = 1 / 3
+# Identifica um jogo: o mesmo confronto com o mesmo mandante pode se repetir na temporada (ex.: MLS)
+CHAVE_JOGO = ['temporada', 'rodada', 'casa', 'fora']
+
+
+def pasta_liga(liga):
+    return os.path.join(PASTA_ELO, f'liga={resultados.nome_liga(liga)}')
+
+
+def caminho_estado(liga):
+    return os.path.join(pasta_liga(liga), 'estado.json')
+
+
+def caminho_checkpoint(liga, temporada, rodada):
+    return os.path.join(pasta_liga(liga), 'checkpoints', f'temporada={temporada}', f'rodada={rodada}.parquet')
+
+
+def _chaves(jogos):
+    return (jogos['temporada'].astype(int).astype(str) + '|' + jogos['rodada'].astype(int).astype(str)
+            + '|' + jogos['casa'].astype(str) + '|' + jogos['fora'].astype(str))
+
+
+def _marcas(jogos, ultima_rodada):
+    # Última rodada processada da temporada de cada jogo (0 para temporada nunca processada)
+    return jogos['temporada'].astype(int).astype(str).map(ultima_rodada).fillna(0).to_numpy()
+
+
+def carregar_estado(liga):
+    caminho = caminho_estado(liga)
+    vazio = {'ratings': {}, 'temporadas': {}, 'ultima_rodada': {}, 'pendentes': []}
+    if not os.path.exists(caminho):
+        return vazio
+    with open(caminho, 'r', encoding='utf-8') as f:
+        estado = json.load(f)
+    # Estado do formato antigo (lista de todos os jogos já processados): a liga é reprocessada do zero
+    return estado if 'pendentes' in estado else vazio
+
+
+def _gravar_estado(estado, liga):
+    caminho = caminho_estado(liga)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def _gravar_checkpoint(ratings, liga, temporada, rodada):
+    caminho = caminho_checkpoint(liga, temporada, rodada)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    pd.DataFrame({'time': list(ratings), 'elo': list(ratings.values())}).to_parquet(caminho + '.tmp', index=False)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def esperado(elo_casa, elo_fora, vantagem=VANTAGEM_CASA):
+    """Pontuação esperada do mandante (vitória = 1, empate = 0,5)."""
+    return 1 / (1 + 10 ** ((np.asarray(elo_fora) - np.asarray(elo_casa) - vantagem) / 400))
+
+
+def _multiplicador(saldo):
+    # Vitórias largas mexem mais no rating (como no World Football Elo)
+    return np.select([saldo <= 1, saldo == 2], [1.0, 1.5], (11 + saldo) / 8)
+
+
+def _virada(ratings, temporadas, times, temporada):
+    media = np.mean(list(ratings.values())) if ratings else INICIAL
+    for time_ in times:
+        if time_ not in ratings:
+            ratings[time_] = INICIAL
+        elif temporadas.get(time_, temporada) < temporada:
+            ratings[time_] = media + (ratings[time_] - media) * (1 - REGRESSAO)
+        temporadas[time_] = temporada
+
+
+def atualizar(liga, jogos=None):
+    """Aplica aos ratings só os jogos com resultado ainda não processados; devolve quantos foram.
+
+    `jogos` (formato de resultados.py) pode trazer só a temporada atual; sem estado gravado, todas
+    as temporadas guardadas da liga são processadas primeiro.
+    """
+    estado = carregar_estado(liga)
+    if jogos is None or not estado['ultima_rodada']:
+        jogos = resultados.carregar([liga]) if jogos is None else pd.concat(
+            [resultados.carregar([liga]), jogos], ignore_index=True
+        ).drop_duplicates(CHAVE_JOGO, keep='last')
+    jogos = jogos[jogos['rodada'].notna()]
+    ratings, temporadas, ultima_rodada = estado['ratings'], estado['temporadas'], estado['ultima_rodada']
+    jogados = jogos[jogos['gols_casa'].notna() & jogos['gols_fora'].notna()]
+    # Novos: rodadas depois da última processada da temporada, ou jogos que estavam pendentes nela
+    pendentes = set(estado['pendentes'])
+    novos = jogados[(jogados['rodada'].to_numpy() > _marcas(jogados, ultima_rodada)) | _chaves(jogados).isin(pendentes)]
+    if novos.empty:
+        return 0
+
+    temporadas_novas = {int(t) for t in novos['temporada'].unique()} - {int(t) for t in ultima_rodada}
+    if ultima_rodada and min(temporadas_novas, default=np.inf) < max(int(t) for t in ultima_rodada):
+        # Temporada anterior às já processadas chegou depois (backfill): o Elo depende da ordem dos
+        # jogos, então a liga é reprocessada do zero com tudo o que está guardado
+        shutil.rmtree(pasta_liga(liga), ignore_errors=True)
+        return atualizar(liga, jogos)
+
+    novos = modelo.ordenar(novos)
+    # Um time joga uma vez por rodada: os jogos da rodada são atualizados juntos, com os ratings de antes dela
+    for (temporada, rodada), jogos_rodada in novos.groupby(['temporada', 'rodada'], sort=False):
+        temporada, rodada = int(temporada), int(rodada)
+        casa, fora = jogos_rodada['casa'].tolist(), jogos_rodada['fora'].tolist()
+        _virada(ratings, temporadas, casa + fora, temporada)
+        gols_casa = jogos_rodada['gols_casa'].to_numpy(dtype='float64')
+        gols_fora = jogos_rodada['gols_fora'].to_numpy(dtype='float64')
+        pontuacao = np.select([gols_casa > gols_fora, gols_casa == gols_fora], [1.0, 0.5], 0.0)
+        elo_casa = np.array([ratings[t] for t in casa])
+        elo_fora = np.array([ratings[t] for t in fora])
+        delta = K * _multiplicador(np.abs(gols_casa - gols_fora)) * (pontuacao - esperado(elo_casa, elo_fora))
+        for time_casa, time_fora, d in zip(casa, fora, delta):
+            ratings[time_casa] += d
+            ratings[time_fora] -= d
+        # Jogo adiado de uma rodada antiga entra no checkpoint mais recente da temporada, não reescreve o antigo
+        chave = str(temporada)
+        rodada = max(rodada, ultima_rodada.get(chave, 0))
+        ultima_rodada[chave] = rodada
+        _gravar_checkpoint(ratings, liga, temporada, rodada)
+
+    # Jogos sem resultado em rodadas já processadas ficam pendentes até terem placar
+    sem_resultado = jogos[jogos['gols_casa'].isna() | jogos['gols_fora'].isna()]
+    atrasados = sem_resultado[sem_resultado['rodada'].to_numpy() <= _marcas(sem_resultado, ultima_rodada)]
+    estado['pendentes'] = sorted((pendentes - set(_chaves(novos))) | set(_chaves(atrasados)))
+    _gravar_estado(estado, liga)
+    return len(novos)
+
+
+def _checkpoints(liga):
+    padrao = os.path.join(pasta_liga(liga), 'checkpoints', 'temporada=*', 'rodada=*.parquet')
+    encontrados = []
+    for caminho in glob.glob(padrao):
+        m = re.search(r'temporada=(\d+)[\\/]rodada=(\d+)\.parquet$', caminho)
+        if m:
+            encontrados.append((int(m.group(1)), int(m.group(2)), caminho))
+    return sorted(encontrados)
+
+
+def ratings_em(liga, temporada, rodada):
+    """Ratings depois da rodada `rodada` de `temporada` (o checkpoint mais recente até ela), do maior ao menor.
+
+    Antes da primeira rodada gravada da temporada vale o último checkpoint da temporada anterior.
+    """
+    anteriores = [c for c in _checkpoints(liga) if (c[0], c[1]) <= (temporada, rodada)]
+    if not anteriores:
+        return pd.DataFrame(columns=['time', 'elo'])
+    df = pd.read_parquet(anteriores[-1][2])
+    return df.sort_values('elo', ascending=False, ignore_index=True)
+
+
+def reconstruir(liga):
+    shutil.rmtree(pasta_liga(liga), ignore_errors=True)
+    return atualizar(liga)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Atualiza os ratings Elo com os jogos novos de cada liga.')
+    parser.add_argument('--ligas', nargs='*', default=list(resultados.LIGAS), choices=list(resultados.LIGAS))
+    parser.add_argument('--reconstruir', action='store_true', help='Descarta o estado e reprocessa todos os jogos')
+    args = parser.parse_args()
+
+    for liga in args.ligas:
+        inicio = time.perf_counter()
+        novos = reconstruir(liga) if args.reconstruir else atualizar(liga)
+        ratings = pd.Series(carregar_estado(liga)['ratings']).sort_values(ascending=False)
+        print(f'✅ {liga}: {novos} jogo(s) novo(s) em {time.perf_counter() - inicio:.2f}s; '
+              f'{len(ratings)} times, melhor: {ratings.index[0] if len(ratings) else "-"}'
+              + (f' ({ratings.iloc[0]:.0f})' if len(ratings) else ''))
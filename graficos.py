@@ -0,0 +1,95 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Cache de gráficos já renderizados, compartilhado por todas as sessões do processo do Streamlit:
+# imagens (PNG/SVG) dos gráficos matplotlib/seaborn e o JSON das figuras Plotly, indexados pelo
+# hash dos dados de entrada e dos parâmetros do gráfico. Os mais antigos saem quando passa do limite
+LIMITE_MB = float(os.environ.get('DASHBOARD_CACHE_GRAFICOS_MB', 64))
+# Mesma resolução e recorte que o st.pyplot usa
+DPI = 200
+
+_entradas = OrderedDict()
+_trava = threading.Lock()
+_situacao = {'Bytes': 0, 'Acertos': 0, 'Renderizações': 0, 'Descartes': 0}
+
+
+def chave(nome, *dados, **parametros):
+    """Identificador do gráfico: nome, conteúdo dos DataFrames/Séries e parâmetros."""
+    h = hashlib.blake2b(repr(nome).encode(), digest_size=16)
+    for parte in dados:
+        if isinstance(parte, (pd.DataFrame, pd.Series)):
+            colunas = list(parte.columns) if isinstance(parte, pd.DataFrame) else [parte.name]
+            h.update(repr(colunas).encode())
+            h.update(pd.util.hash_pandas_object(parte, index=False).to_numpy().tobytes())
+        else:
+            h.update(repr(parte).encode())
+    h.update(repr(sorted(parametros.items())).encode())
+    return h.hexdigest()
+
+
+def _obter(chave):
+    with _trava:
+        valor = _entradas.get(chave)
+        if valor is not None:
+            _entradas.move_to_end(chave)
+            _situacao['Acertos'] += 1
+        return valor
+
+
+def _guardar(chave, valor):
+    limite = LIMITE_MB * 2 ** 20
+    with _trava:
+        _situacao['Renderizações'] += 1
+        if chave in _entradas or len(valor) > limite:
+            return
+        _entradas[chave] = valor
+        _situacao['Bytes'] += len(valor)
+        while _situacao['Bytes'] > limite:
+            _, descartado = _entradas.popitem(last=False)
+            _situacao['Bytes'] -= len(descartado)
+            _situacao['Descartes'] += 1
+
+
+def imagem(chave, desenhar, formato='png'):
+    """Bytes da figura matplotlib devolvida por `desenhar()`, que só é chamada se faltar no cache.
+
+    A figura é fechada logo depois de salva: nada fica preso no estado global do pyplot.
+    """
+    conteudo = _obter(chave)
+    if conteudo is None:
+        import matplotlib.pyplot as plt
+        fig = desenhar()
+        try:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format=formato, dpi=DPI, bbox_inches='tight')
+        finally:
+            plt.close(fig)
+        conteudo = buffer.getvalue()
+        _guardar(chave, conteudo)
+    return conteudo
+
+
+def plotly(chave, montar):
+    """Figura Plotly de `montar()`, guardada como JSON; num acerto só é desserializada."""
+    import plotly.io as pio
+    conteudo = _obter(chave)
+    if conteudo is None:
+        conteudo = montar().to_json().encode('utf-8')
+        _guardar(chave, conteudo)
+    return pio.from_json(conteudo.decode('utf-8'))
+
+
+def situacao():
+    with _trava:
+        return dict(_situacao, Entradas=len(_entradas))
+
+
+def limpar():
+    with _trava:
+        _entradas.clear()
+        _situacao['Bytes'] = 0
@@ -0,0 +1,82 @@
+import argparse
+import os
+
+import pandas as pd
+
+import anomalias
+import armazenamento
+import capacidade
+import publicacao
+import resumos
+
+COLUNAS_SNAPSHOT = ['Servidor', 'Base', 'Data', 'Tamanho (MB)']
+
+
+def derivados_existem(fonte):
+    return os.path.exists(anomalias.caminho_estado(fonte))
+
+
+def reconstruir(fonte):
+    """Mescla o Excel (quando houver) nas partições e recalcula tudo o que deriva delas."""
+    # As partições são a origem (inclusive os snapshots ingeridos); o Excel só acrescenta ou corrige linhas
+    if os.path.exists(armazenamento.caminho_excel(fonte)):
+        armazenamento.particionar_excel(fonte)
+    elif not armazenamento.listar_servidores(fonte):
+        raise FileNotFoundError(f'{armazenamento.caminho_excel(fonte)} não existe e não há partições gravadas')
+    df = armazenamento.carregar(fonte, colunas=COLUNAS_SNAPSHOT)
+    anomalias.recalcular(fonte, df)
+    capacidade.recalcular(fonte, df)
+    resumos.recalcular(fonte, df)
+    publicacao.publicar(fonte)
+
+
+def garantir(fonte):
+    """Garante partições e tabelas derivadas atualizadas; devolve os servidores descobertos."""
+    if armazenamento.particoes_desatualizadas(fonte) or not derivados_existem(fonte):
+        reconstruir(fonte)
+    elif capacidade.desatualizada(fonte) or not resumos.existem(fonte):
+        df = armazenamento.carregar(fonte, colunas=COLUNAS_SNAPSHOT)
+        if capacidade.desatualizada(fonte):
+            capacidade.recalcular(fonte, df)
+        if not resumos.existem(fonte):
+            resumos.recalcular(fonte, df)
+    if publicacao.desatualizada(fonte):
+        publicacao.publicar(fonte)
+    return armazenamento.listar_servidores(fonte)
+
+
+def ingerir_snapshot(fonte, snapshot):
+    """Ingestão incremental de um snapshot (uma medição por Servidor/Base/Data)."""
+    snapshot = snapshot[COLUNAS_SNAPSHOT].copy()
+    snapshot['Data'] = pd.to_datetime(snapshot['Data'])
+    if not armazenamento.listar_servidores(fonte) and not os.path.exists(armazenamento.caminho_excel(fonte)):
+        # Fonte sem histórico (ex.: primeira coleta direta): o próprio snapshot inicia as partições
+        armazenamento.particionar(snapshot, fonte)
+        reconstruir(fonte)
+        return anomalias.carregar_feed(fonte)
+    garantir(fonte)
+    armazenamento.acrescentar(snapshot, fonte)
+    novas = anomalias.atualizar(fonte, snapshot)
+
+    # Só os servidores que receberam dados têm a projeção de capacidade e os resumos refeitos
+    servidores = sorted(snapshot['Servidor'].unique(), key=armazenamento.ordem_servidor)
+    df = armazenamento.carregar(fonte, servidores, colunas=COLUNAS_SNAPSHOT)
+    capacidade.recalcular(fonte, df, servidores)
+    resumos.atualizar(fonte, snapshot, df)
+    publicacao.publicar(fonte)
+    return novas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ingere um snapshot diário de tamanhos.')
+    parser.add_argument('arquivo', nargs='?', help="CSV com as colunas Servidor, Base, Data e 'Tamanho (MB)'")
+    parser.add_argument('--fonte', default='saida', choices=sorted(armazenamento.FONTES))
+    parser.add_argument('--reconstruir', action='store_true', help='Mescla o Excel nas partições e recalcula os derivados')
+    args = parser.parse_args()
+
+    if args.reconstruir:
+        reconstruir(args.fonte)
+        print(f'✅ {args.fonte}: partições e tabelas derivadas reconstruídas')
+    if args.arquivo:
+        novas = ingerir_snapshot(args.fonte, pd.read_csv(args.arquivo))
+        print(f'✅ Snapshot ingerido em {args.fonte}: {len(novas)} anomalia(s) nova(s)')
@@ -0,0 +1,147 @@
+import argparse
+import glob
+import os
+import re
+from datetime import date
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import ingestao
+
+# Linha de `ls -l` de um dump: tamanho, data (mês, dia e hora ou ano) e nome do arquivo
+LINHA_LISTAGEM = re.compile(
+    r'^-\S+\s+\d+\s+\S+\s+\S+\s+(?P<tamanho>\d+)\s+'
+    r'(?P<mes>[A-Za-zç]{3})\S*\s+(?P<dia>\d{1,2})\s+(?:(?P<hora>\d{1,2}:\d{2})|(?P<ano>\d{4}))\s+'
+    r'(?P<arquivo>(?P<servidor>s\d+)_lwdump(?P<arq>_arq)?_(?P<base>[a-z0-9]+)_\d+[-\d]*\.7z\.\d+)\s*$',
+    re.IGNORECASE
+)
+# listaAAAAMMDD.txt: data em que a listagem foi tirada
+NOME_LISTAGEM = re.compile(r'lista(\d{8})\.txt$')
+
+# Bases permitidas (mesmo filtro dos notebooks)
+PREFIXOS_VALIDOS = ('x2', 'x1', 'midas2', 'turiion')
+
+# `ls` em inglês ou português
+MESES = {
+    'jan': 1, 'feb': 2, 'fev': 2, 'mar': 3, 'apr': 4, 'abr': 4, 'may': 5, 'mai': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'ago': 8, 'sep': 9, 'set': 9, 'oct': 10, 'out': 10, 'nov': 11, 'dec': 12, 'dez': 12,
+}
+
+LINHAS_POR_BLOCO = 200_000
+CHAVES_ARQUIVO = ['Servidor', 'Arquivo', 'Data', 'Tamanho (bytes)']
+
+
+def data_da_listagem(caminho):
+    """Data da listagem pelo nome do arquivo ou, na falta dele, pela data de modificação."""
+    m = NOME_LISTAGEM.search(os.path.basename(caminho))
+    if m:
+        return pd.Timestamp(m.group(1)).date()
+    return date.fromtimestamp(os.path.getmtime(caminho))
+
+
+def interpretar_linhas(linhas, data_listagem, prefixos=PREFIXOS_VALIDOS):
+    """Extrai servidor, base, data e tamanho de um bloco de linhas de uma vez."""
+    serie = pd.Series(linhas, dtype=object)
+    # Descarta cedo o que não é arquivo comum (diretórios, "total", linhas vazias)
+    serie = serie[serie.str.startswith('-', na=False)]
+    campos = serie.str.extract(LINHA_LISTAGEM).dropna(subset=['arquivo'])
+    campos = campos[campos['base'].str.lower().str.startswith(prefixos)]
+    # Mês que não está em MESES (ex.: `ls` em outro idioma) descarta só a linha, não o bloco
+    mes = campos['mes'].str[:3].str.lower().map(MESES)
+    campos = campos[mes.notna()]
+    if campos.empty:
+        return pd.DataFrame(columns=CHAVES_ARQUIVO + ['Base', 'Tipo'])
+
+    mes = mes[mes.notna()].astype(int).to_numpy()
+    dia = campos['dia'].astype(int).to_numpy()
+    # `ls` mostra hora (sem ano) para arquivos dos últimos ~6 meses: o ano é o da listagem,
+    # ou o anterior quando o dia/mês é posterior à listagem (virada de ano)
+    virou_ano = (mes * 100 + dia) > (data_listagem.month * 100 + data_listagem.day)
+    ano = np.where(
+        campos['ano'].notna(),
+        pd.to_numeric(campos['ano']).fillna(0).astype(int),
+        data_listagem.year - virou_ano.astype(int),
+    )
+    # Monta as datas direto em datetime64 (ano/mês + dias), sem converter linha a linha
+    meses_desde_1970 = ((ano - 1970) * 12 + (mes - 1)).astype('datetime64[M]')
+    dias_no_mes = ((meses_desde_1970 + 1).astype('datetime64[D]') - meses_desde_1970.astype('datetime64[D]')).astype(int)
+    # Dia que não existe no mês (ex.: 31 de fevereiro) descarta a linha em vez de cair no mês seguinte
+    valida = (dia >= 1) & (dia <= dias_no_mes)
+    datas = meses_desde_1970[valida].astype('datetime64[D]') + (dia[valida] - 1).astype('timedelta64[D]')
+    campos = campos[valida]
+
+    return pd.DataFrame({
+        'Servidor': campos['servidor'].str.lower().to_numpy(),
+        'Arquivo': campos['arquivo'].to_numpy(),
+        'Data': datas.astype('datetime64[ns]'),
+        'Tamanho (bytes)': campos['tamanho'].astype('int64').to_numpy(),
+        'Base': campos['base'].to_numpy(),
+        'Tipo': np.where(campos['arq'].notna(), 'arq', 'normal'),
+    })
+
+
+def ler_listagem(caminho, linhas_por_bloco=LINHAS_POR_BLOCO, prefixos=PREFIXOS_VALIDOS):
+    """Lê uma listagem em blocos de linhas (memória limitada) e devolve os registros de cada bloco."""
+    data_listagem = data_da_listagem(caminho)
+    with open(caminho, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            linhas = list(islice(f, linhas_por_bloco))
+            if not linhas:
+                break
+            yield interpretar_linhas(linhas, data_listagem, prefixos)
+
+
+def processar_listagens(caminhos, linhas_por_bloco=LINHAS_POR_BLOCO, prefixos=PREFIXOS_VALIDOS):
+    """Registros únicos por arquivo de dump de todas as listagens.
+
+    O mesmo dump aparece em várias listagens seguidas; a deduplicação é feita a cada
+    bloco, então a memória cresce com o número de dumps distintos e não com o de linhas.
+    """
+    blocos, compactados = [], 0
+    for caminho in caminhos:
+        for bloco in ler_listagem(caminho, linhas_por_bloco, prefixos):
+            blocos.append(bloco.drop_duplicates(CHAVES_ARQUIVO))
+            # Compacta quando o acumulado dobra: custo amortizado linear no número de linhas
+            if sum(len(b) for b in blocos) > 2 * compactados + linhas_por_bloco:
+                blocos = [pd.concat(blocos, ignore_index=True).drop_duplicates(CHAVES_ARQUIVO)]
+                compactados = len(blocos[0])
+    if not blocos:
+        return pd.DataFrame(columns=CHAVES_ARQUIVO + ['Base', 'Tipo'])
+    return pd.concat(blocos, ignore_index=True).drop_duplicates(CHAVES_ARQUIVO, ignore_index=True)
+
+
+def agregar(registros):
+    """Tamanho (MB) por Servidor, Base, Data e Tipo, como nas abas do saida.xlsx."""
+    df = registros.groupby(['Servidor', 'Base', 'Data', 'Tipo'], as_index=False)['Tamanho (bytes)'].sum()
+    df['Tamanho (MB)'] = df['Tamanho (bytes)'] / (1024 * 1024)
+    return df.drop(columns='Tamanho (bytes)')
+
+
+def snapshot_normal(agregado):
+    # Os dashboards acompanham apenas os dumps normais
+    return agregado[agregado['Tipo'] == 'normal'][ingestao.COLUNAS_SNAPSHOT]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Processa listagens `ls -l` dos dumps.')
+    parser.add_argument('caminhos', nargs='+', help='Arquivos .txt ou pastas com listagens')
+    parser.add_argument('--saida', help='CSV com o agregado por Servidor/Base/Data/Tipo')
+    parser.add_argument('--ingerir', action='store_true', help='Ingere os dumps normais no armazenamento')
+    parser.add_argument('--fonte', default='saida', choices=sorted(armazenamento.FONTES))
+    args = parser.parse_args()
+
+    arquivos = []
+    for caminho in args.caminhos:
+        arquivos += sorted(glob.glob(os.path.join(caminho, '*.txt'))) if os.path.isdir(caminho) else [caminho]
+
+    agregado = agregar(processar_listagens(arquivos))
+    print(f'✅ {len(arquivos)} listagem(ns), {len(agregado)} registro(s) agregados')
+    if args.saida:
+        agregado.to_csv(args.saida, index=False, encoding='utf-8')
+        print(f'📁 CSV salvo em: {args.saida}')
+    if args.ingerir:
+        novas = ingestao.ingerir_snapshot(args.fonte, snapshot_normal(agregado))
+        print(f'✅ Ingerido em {args.fonte}: {len(novas)} anomalia(s) nova(s)')
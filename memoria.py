@@ -0,0 +1,86 @@
+import argparse
+import tracemalloc
+
+import pandas as pd
+
+import agregados
+import armazenamento
+import ingestao
+import sintetico
+
+MB = 1024 * 1024
+
+
+def tamanho_mb(df):
+    return df.memory_usage(deep=True).sum() / MB
+
+
+def como_antes(df):
+    """Representação que os dashboards mantinham: chaves como texto, datas `date` e medidas float64."""
+    df = df.astype({c: object for c in armazenamento.COLUNAS_CATEGORICAS})
+    df['Data'] = df['Data'].dt.date
+    return df
+
+
+def secao_servidor_antes(df, servidor):
+    # Filtro por servidor como era feito: conversão de datas, recorte copiado e ordenação copiada
+    datas = pd.to_datetime(df['Data'])
+    filtrado = df[(df['Servidor'] == servidor) & (datas >= datas.min())].copy()
+    return filtrado.sort_values(['Base', 'Data']).copy()
+
+
+def secao_servidor_depois(df, servidor):
+    filtrado = armazenamento.recortar(df, (df['Servidor'] == servidor) & (df['Data'] >= df['Data'].min()))
+    return filtrado.sort_values(['Base', 'Data'])
+
+
+def pico_mb(funcao, *args):
+    """Pico de memória alocada (numpy/pandas registram no tracemalloc) durante a chamada."""
+    tracemalloc.start()
+    try:
+        funcao(*args)
+        return tracemalloc.get_traced_memory()[1] / MB
+    finally:
+        tracemalloc.stop()
+
+
+def medir(nome, df):
+    """Memória antes/depois da compactação e pico da seção por servidor, por conjunto de dados."""
+    antes = como_antes(df)
+    depois = armazenamento.compactar(df)
+    servidor = df['Servidor'].value_counts().idxmax()
+    linha = {
+        'Conjunto': nome,
+        'Linhas': len(df),
+        'Bases': df['Base'].nunique(),
+        'Antes (MB)': tamanho_mb(antes),
+        'Depois (MB)': tamanho_mb(depois),
+        'Seção servidor antes (MB)': pico_mb(secao_servidor_antes, antes.assign(Data=df['Data']), servidor),
+        'Seção servidor depois (MB)': pico_mb(secao_servidor_depois, depois, servidor),
+    }
+    linha['Redução (%)'] = (1 - linha['Depois (MB)'] / linha['Antes (MB)']) * 100
+    # Maior erro introduzido pelo float32 em cada medida convertida
+    for coluna in armazenamento.TOLERANCIA_FLOAT32:
+        if coluna in df and depois[coluna].dtype != df[coluna].dtype:
+            linha[f'Erro máx. {coluna}'] = (depois[coluna].astype(float) - df[coluna]).abs().max()
+    return linha
+
+
+def dados_fonte(fonte):
+    ingestao.garantir(fonte)
+    frota = agregados.agregados_frota(fonte)
+    return pd.concat([agg['dados'] for agg in frota.values()], ignore_index=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mede a memória da representação compacta dos dados.')
+    parser.add_argument('--fontes', nargs='*', default=sorted(armazenamento.FONTES))
+    parser.add_argument('--bases-sinteticas', type=int, default=sintetico.BASES_PADRAO)
+    args = parser.parse_args()
+
+    linhas = [medir(fonte, dados_fonte(fonte)) for fonte in args.fontes]
+    if args.bases_sinteticas:
+        linhas.append(medir(f'sintético ({args.bases_sinteticas} bases)', sintetico.gerar(args.bases_sinteticas)))
+
+    with pd.option_context('display.max_columns', None, 'display.width', 200, 'display.float_format', '{:.6g}'.format):
+        print(pd.DataFrame(linhas).set_index('Conjunto').T)
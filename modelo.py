@@ -0,0 +1,376 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import calibracao
+import resultados
+
+# Modelo treinado fora do app (python modelo.py): regressão de Poisson para os gols de cada lado e
+# gradient boosting para o 1X2, com características calculadas só com os jogos anteriores a cada
+# partida. Cada treino vira um artefato versionado; o app só carrega a versão atual e prevê a rodada
+# inteira de uma vez, sem nunca treinar
+PASTA_MODELOS = os.path.join(os.environ.get('BETS_PASTA_DADOS', 'data_bets'), 'modelos')
+# Mudou o cálculo das características: obriga um novo treino mesmo sem jogos novos
+VERSAO_CARACTERISTICAS = 1
+
+JANELA = 10
+# Dias de descanso acima disto (pausas, virada de temporada) contam como descanso completo
+DESCANSO_MAXIMO = 15
+MINIMO_JOGOS = 100
+# Previsões fora da amostra para a segunda metade dos jogos, em blocos cronológicos, cada um previsto
+# por modelos treinados só com os jogos anteriores: escolhem a mistura Poisson/GBM e ajustam a calibração
+INICIO_VALIDACAO = 0.5
+BLOCOS_VALIDACAO = 4
+MAX_GOLS = 10
+GRADE_RHO = np.linspace(-0.2, 0.2, 41)
+PESOS_GBM = np.linspace(0, 1, 5)
+ALPHA_POISSON = 1e-3
+PARAMETROS_GBM = {'n_estimators': 150, 'max_depth': 2, 'learning_rate': 0.05, 'subsample': 0.8, 'random_state': 0}
+
+CARACTERISTICAS_TIME = ['ataque', 'defesa', 'forma', 'ataque_mando', 'defesa_mando', 'descanso']
+CARACTERISTICAS = [f'{lado}_{c}' for lado in ('casa', 'fora') for c in CARACTERISTICAS_TIME]
+COLUNAS_JOGO = ['temporada', 'rodada', 'data', 'casa', 'fora', 'gols_casa', 'gols_fora']
+
+
+def pasta_liga(liga):
+    return os.path.join(PASTA_MODELOS, f'liga={resultados.nome_liga(liga)}')
+
+
+def caminho_artefato(liga, versao):
+    return os.path.join(pasta_liga(liga), f'{versao}.joblib')
+
+
+def caminho_confiabilidade(liga, versao):
+    return os.path.join(pasta_liga(liga), f'{versao}.confiabilidade.parquet')
+
+
+def caminho_atual(liga):
+    return os.path.join(pasta_liga(liga), 'atual.json')
+
+
+def _datas(jogos):
+    # Transfermarkt: 'sáb., 13/04/24' no .com.br, 'Sat 13/04/24' no .co.uk
+    partes = jogos['data'].astype(str).str.extract(r'(\d{1,2})/(\d{1,2})/(\d{2,4})').astype('float64')
+    ano = partes[2].where(partes[2] >= 100, partes[2] + 2000)
+    return pd.to_datetime(pd.DataFrame({'year': ano, 'month': partes[1], 'day': partes[0]}), errors='coerce')
+
+
+def ordenar(jogos):
+    """Jogos em ordem cronológica (temporada, data, rodada), com a data convertida em `data_jogo`."""
+    jogos = jogos.assign(data_jogo=_datas(jogos))
+    return jogos.sort_values(['temporada', 'data_jogo', 'rodada'], kind='stable', na_position='last',
+                             ignore_index=True)
+
+
+def _gols(jogos):
+    return (jogos['gols_casa'].to_numpy(dtype='float64', na_value=np.nan),
+            jogos['gols_fora'].to_numpy(dtype='float64', na_value=np.nan))
+
+
+def _longo(jogos):
+    """Duas linhas por jogo, uma por time, agrupadas por time e na ordem dos jogos."""
+    n = len(jogos)
+    gols_casa, gols_fora = _gols(jogos)
+    datas = jogos['data_jogo'].to_numpy()
+    longo = pd.DataFrame({
+        'jogo': np.tile(np.arange(n), 2),
+        'time': np.r_[jogos['casa'].to_numpy(dtype=object), jogos['fora'].to_numpy(dtype=object)],
+        'mando': np.repeat([1, 0], n),
+        'feitos': np.r_[gols_casa, gols_fora],
+        'sofridos': np.r_[gols_fora, gols_casa],
+        'data': np.r_[datas, datas],
+    })
+    longo['pontos'] = np.select(
+        [longo['feitos'] > longo['sofridos'], longo['feitos'] == longo['sofridos']], [3.0, 1.0], 0.0
+    )
+    longo.loc[longo['feitos'].isna(), 'pontos'] = np.nan
+    return longo.sort_values(['time', 'jogo'], kind='stable', ignore_index=True)
+
+
+def _antes_do_jogo(valores, grupos):
+    # Estado depois de cada jogo jogado -> estado antes de cada linha do grupo (jogada ou não)
+    return valores.groupby(grupos).shift(1).groupby(grupos).ffill()
+
+
+def _media_movel(longo, chaves, colunas, n=JANELA):
+    """Média das últimas `n` partidas jogadas antes de cada linha, por grupo, sem olhar o próprio jogo."""
+    jogadas = longo[longo['feitos'].notna()]
+    grupos = [jogadas[c] for c in chaves]
+    # Soma móvel pela diferença de somas acumuladas: tudo vetorizado, sem rolling por grupo
+    soma = jogadas[colunas].groupby(grupos).cumsum()
+    contagem = jogadas.groupby(grupos).cumcount() + 1
+    soma_antes = soma.groupby(grupos).shift(n).fillna(0)
+    contagem_antes = contagem.groupby(grupos).shift(n).fillna(0)
+    media = (soma - soma_antes).div(contagem - contagem_antes, axis=0)
+    return _antes_do_jogo(media.reindex(longo.index), [longo[c] for c in chaves])
+
+
+def caracteristicas(jogos):
+    """Características de cada jogo de `jogos` (já ordenados), só com as partidas anteriores a ele.
+
+    Índice igual à posição do jogo; colunas casa_* e fora_* de CARACTERISTICAS (nulas sem histórico).
+    """
+    longo = _longo(jogos)
+    geral = _media_movel(longo, ['time'], ['feitos', 'sofridos', 'pontos'])
+    mando = _media_movel(longo, ['time', 'mando'], ['feitos', 'sofridos'])
+    ultimo = _antes_do_jogo(longo['data'].where(longo['feitos'].notna()), longo['time'])
+    por_time = pd.DataFrame({
+        'jogo': longo['jogo'],
+        'mando': longo['mando'],
+        'ataque': geral['feitos'],
+        'defesa': geral['sofridos'],
+        'forma': geral['pontos'] / 3,
+        'ataque_mando': mando['feitos'],
+        'defesa_mando': mando['sofridos'],
+        'descanso': (longo['data'] - ultimo).dt.days.clip(upper=DESCANSO_MAXIMO),
+    })
+    casa = por_time[por_time['mando'] == 1].set_index('jogo')[CARACTERISTICAS_TIME].add_prefix('casa_')
+    fora = por_time[por_time['mando'] == 0].set_index('jogo')[CARACTERISTICAS_TIME].add_prefix('fora_')
+    return casa.join(fora).sort_index().astype('float64')
+
+
+def _matriz_poisson(X):
+    """Uma linha por (jogo, lado): características do time, do adversário e o mando."""
+    casa = X[[f'casa_{c}' for c in CARACTERISTICAS_TIME]].to_numpy()
+    fora = X[[f'fora_{c}' for c in CARACTERISTICAS_TIME]].to_numpy()
+    um, zero = np.ones((len(X), 1)), np.zeros((len(X), 1))
+    return np.r_[np.c_[casa, fora, um], np.c_[fora, casa, zero]]
+
+
+def _resultado(gols_casa, gols_fora):
+    # 0 = vitória da casa, 1 = empate, 2 = vitória do visitante (ordem de Win, Draw, Loss)
+    return np.select([gols_casa > gols_fora, gols_casa == gols_fora], [0, 1], 2)
+
+
+def matriz_placares(lambda_casa, lambda_fora, rho=0.0, max_gols=MAX_GOLS):
+    """P(placar casa x fora) de cada jogo, shape (jogos, max_gols, max_gols), com a correção de Dixon-Coles."""
+    from scipy.stats import poisson
+    gols = np.arange(max_gols)
+    lc = np.asarray(lambda_casa, dtype='float64')
+    lf = np.asarray(lambda_fora, dtype='float64')
+    matriz = poisson.pmf(gols, lc[:, None])[:, :, None] * poisson.pmf(gols, lf[:, None])[:, None, :]
+    matriz[:, 0, 0] *= 1 - lc * lf * rho
+    matriz[:, 0, 1] *= 1 + lc * rho
+    matriz[:, 1, 0] *= 1 + lf * rho
+    matriz[:, 1, 1] *= 1 - rho
+    return matriz / matriz.sum(axis=(1, 2), keepdims=True)
+
+
+def probabilidades_1x2(matriz):
+    """Vitória da casa, empate e vitória do visitante a partir da matriz de placares."""
+    return np.c_[
+        np.tril(matriz, -1).sum(axis=(1, 2)),
+        np.trace(matriz, axis1=1, axis2=2),
+        np.triu(matriz, 1).sum(axis=(1, 2)),
+    ]
+
+
+def _ajustar_rho(lambda_casa, lambda_fora, gols_casa, gols_fora):
+    # Só os placares até 1x1 dependem de rho: log-verossimilhança da correção em toda a grade de uma vez
+    rho = GRADE_RHO[:, None]
+    tau = np.select(
+        [(gols_casa == 0) & (gols_fora == 0), (gols_casa == 0) & (gols_fora == 1),
+         (gols_casa == 1) & (gols_fora == 0), (gols_casa == 1) & (gols_fora == 1)],
+        [1 - lambda_casa * lambda_fora * rho, 1 + lambda_casa * rho, 1 + lambda_fora * rho,
+         np.broadcast_to(1 - rho, (len(GRADE_RHO), len(gols_casa)))],
+        1.0,
+    )
+    return float(GRADE_RHO[np.argmax(np.log(np.clip(tau, 1e-12, None)).sum(axis=1))])
+
+
+def _ajustar(X, gols_casa, gols_fora):
+    # Importados só no treino: o app carrega os modelos prontos
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.linear_model import PoissonRegressor
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    poisson = make_pipeline(StandardScaler(), PoissonRegressor(alpha=ALPHA_POISSON, max_iter=500))
+    poisson.fit(_matriz_poisson(X), np.r_[gols_casa, gols_fora])
+    gbm = GradientBoostingClassifier(**PARAMETROS_GBM).fit(X, _resultado(gols_casa, gols_fora))
+    modelos = {'poisson': poisson, 'gbm': gbm, 'rho': 0.0}
+    lambda_casa, lambda_fora = _lambdas(modelos, X)
+    modelos['rho'] = _ajustar_rho(lambda_casa, lambda_fora, gols_casa, gols_fora)
+    return modelos
+
+
+def _lambdas(modelos, X):
+    gols = modelos['poisson'].predict(_matriz_poisson(X))
+    return gols[:len(X)], gols[len(X):]
+
+
+def _componentes(modelos, X):
+    """Gols esperados e as probabilidades 1X2 de cada modelo, para todos os jogos de X de uma vez."""
+    lambda_casa, lambda_fora = _lambdas(modelos, X)
+    p_poisson = probabilidades_1x2(matriz_placares(lambda_casa, lambda_fora, modelos['rho']))
+    # Uma classe ausente no treino (amostra pequena) fica com probabilidade zero
+    p_gbm = np.zeros((len(X), 3))
+    p_gbm[:, modelos['gbm'].classes_] = modelos['gbm'].predict_proba(X)
+    return lambda_casa, lambda_fora, p_poisson, p_gbm
+
+
+def _fora_da_amostra(X, gols_casa, gols_fora):
+    inicio = int(len(X) * INICIO_VALIDACAO)
+    poisson, gbm = [], []
+    for bloco in np.array_split(np.arange(inicio, len(X)), BLOCOS_VALIDACAO):
+        modelos = _ajustar(X.iloc[:bloco[0]], gols_casa[:bloco[0]], gols_fora[:bloco[0]])
+        _, _, p_poisson, p_gbm = _componentes(modelos, X.iloc[bloco])
+        poisson.append(p_poisson)
+        gbm.append(p_gbm)
+    return inicio, np.concatenate(poisson), np.concatenate(gbm)
+
+
+def _log_loss(probabilidades, resultado):
+    return float(-np.log(np.clip(probabilidades[np.arange(len(resultado)), resultado], 1e-15, None)).mean())
+
+
+def _assinatura(jogos):
+    h = hashlib.blake2b(str(VERSAO_CARACTERISTICAS).encode(), digest_size=16)
+    h.update(pd.util.hash_pandas_object(jogos[COLUNAS_JOGO], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def versao_atual(liga):
+    """Metadados da versão em uso (versão, assinatura dos jogos, métricas) ou None se nunca treinou."""
+    caminho = caminho_atual(liga)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def carregar(liga, versao=None):
+    import joblib
+    versao = versao or versao_atual(liga)['versao']
+    return joblib.load(caminho_artefato(liga, versao))
+
+
+def _gravar_json(dados, caminho):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def treinar(liga, forcar=False):
+    """Treina com todas as temporadas guardadas da liga e grava uma nova versão do artefato.
+
+    Sem jogos novos desde o último treino (mesma assinatura), mantém a versão atual e devolve None.
+    """
+    import joblib
+    jogos = ordenar(resultados.carregar([liga]))
+    X = caracteristicas(jogos)
+    jogados = (jogos['gols_casa'].notna() & jogos['gols_fora'].notna()).to_numpy()
+    jogos, X = jogos[jogados], X[jogados]
+    if len(jogos) < MINIMO_JOGOS:
+        raise ValueError(f'{liga}: só {len(jogos)} jogos com resultado guardados (mínimo {MINIMO_JOGOS})')
+
+    assinatura = _assinatura(jogos)
+    atual = versao_atual(liga)
+    if not forcar and atual and atual['assinatura'] == assinatura:
+        return None
+
+    medias = X.mean()
+    X = X.fillna(medias)
+    gols_casa, gols_fora = _gols(jogos)
+    resultado = _resultado(gols_casa, gols_fora)
+
+    inicio, p_poisson, p_gbm = _fora_da_amostra(X, gols_casa, gols_fora)
+    validacao = resultado[inicio:]
+    perdas = [_log_loss(peso * p_gbm + (1 - peso) * p_poisson, validacao) for peso in PESOS_GBM]
+    peso_gbm = float(PESOS_GBM[int(np.argmin(perdas))])
+    previstas = peso_gbm * p_gbm + (1 - peso_gbm) * p_poisson
+    tabela_calibracao = calibracao.ajustar(previstas, validacao)
+    # Calibradas nas mesmas previsões em que a calibração foi ajustada: o ECE delas é otimista
+    calibradas = calibracao.aplicar(tabela_calibracao, previstas)
+    confiabilidade = pd.concat([
+        calibracao.confiabilidade(previstas, validacao).assign(Probabilidades='Modelo'),
+        calibracao.confiabilidade(calibradas, validacao).assign(Probabilidades='Calibrada'),
+    ], ignore_index=True)
+    frequencias = np.bincount(resultado[:inicio], minlength=3) / inicio
+    metricas = {
+        'jogos_validacao': int(len(validacao)),
+        'log_loss_poisson': perdas[0],
+        'log_loss_gbm': perdas[-1],
+        'log_loss_combinado': min(perdas),
+        'log_loss_calibrado': _log_loss(calibradas, validacao),
+        'log_loss_frequencias': _log_loss(np.tile(frequencias, (len(validacao), 1)), validacao),
+        'ece_modelo': calibracao.erro_calibracao(confiabilidade[confiabilidade['Probabilidades'] == 'Modelo']),
+        'ece_calibrado': calibracao.erro_calibracao(confiabilidade[confiabilidade['Probabilidades'] == 'Calibrada']),
+        'calibracao': dict(zip(calibracao.RESULTADOS, tabela_calibracao['metodos'])),
+    }
+
+    artefato = _ajustar(X, gols_casa, gols_fora)
+    artefato.update({
+        'medias': medias, 'peso_gbm': peso_gbm, 'calibracao': tabela_calibracao, 'caracteristicas': CARACTERISTICAS,
+    })
+    versao = f"{time.strftime('%Y%m%d-%H%M%S')}-{assinatura[:8]}"
+    metadados = {
+        'liga': liga, 'versao': versao, 'assinatura': assinatura,
+        'versao_caracteristicas': VERSAO_CARACTERISTICAS, 'treinado_em': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'jogos': int(len(jogos)), 'temporadas': sorted(int(t) for t in jogos['temporada'].unique()),
+        'peso_gbm': peso_gbm, 'rho': artefato['rho'], 'metricas': metricas,
+    }
+    artefato['metadados'] = metadados
+
+    os.makedirs(pasta_liga(liga), exist_ok=True)
+    caminho = caminho_artefato(liga, versao)
+    joblib.dump(artefato, caminho + '.tmp')
+    os.replace(caminho + '.tmp', caminho)
+    confiabilidade.to_parquet(caminho_confiabilidade(liga, versao) + '.tmp', index=False)
+    os.replace(caminho_confiabilidade(liga, versao) + '.tmp', caminho_confiabilidade(liga, versao))
+    # Versões antigas ficam gravadas; a atual só troca depois que o artefato novo está completo
+    _gravar_json(metadados, caminho_atual(liga))
+    return metadados
+
+
+def prever(artefato, jogos, temporada, rodada):
+    """Gols esperados e probabilidades 1X2 de todos os jogos de uma rodada, num único lote.
+
+    `jogos` é o histórico da liga no formato de resultados.py, incluindo a rodada a prever.
+    """
+    jogos = ordenar(jogos)
+    alvo = ((jogos['temporada'] == temporada) & (jogos['rodada'] == rodada)).to_numpy()
+    X = caracteristicas(jogos)[artefato['caracteristicas']][alvo].fillna(artefato['medias'])
+    lambda_casa, lambda_fora, p_poisson, p_gbm = _componentes(artefato, X)
+    probabilidades = artefato['peso_gbm'] * p_gbm + (1 - artefato['peso_gbm']) * p_poisson
+    if artefato.get('calibracao') is not None:
+        probabilidades = calibracao.aplicar(artefato['calibracao'], probabilidades)
+    return pd.DataFrame({
+        'casa': jogos.loc[alvo, 'casa'].to_numpy(),
+        'fora': jogos.loc[alvo, 'fora'].to_numpy(),
+        'rodada': jogos.loc[alvo, 'rodada'].to_numpy(dtype=int),
+        'lambda_casa': lambda_casa,
+        'lambda_fora': lambda_fora,
+        'Win': probabilidades[:, 0],
+        'Draw': probabilidades[:, 1],
+        'Loss': probabilidades[:, 2],
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Treina os modelos de gols/1X2 com os resultados guardados.')
+    parser.add_argument('--ligas', nargs='*', default=list(resultados.LIGAS), choices=list(resultados.LIGAS))
+    parser.add_argument('--forcar', action='store_true', help='Treina mesmo sem jogos novos')
+    args = parser.parse_args()
+
+    for liga in args.ligas:
+        inicio = time.perf_counter()
+        try:
+            metadados = treinar(liga, args.forcar)
+        except ValueError as erro:
+            print(f'❌ {erro}')
+            continue
+        if metadados is None:
+            print(f'✅ {liga}: sem jogos novos, mantida a versão {versao_atual(liga)["versao"]}')
+            continue
+        m = metadados['metricas']
+        print(f"✅ {liga}: versão {metadados['versao']} ({metadados['jogos']} jogos, "
+              f"{time.perf_counter() - inicio:.1f}s) - log loss Poisson {m['log_loss_poisson']:.3f}, "
+              f"GBM {m['log_loss_gbm']:.3f}, combinado {m['log_loss_combinado']:.3f} "
+              f"(frequências {m['log_loss_frequencias']:.3f}; peso GBM {metadados['peso_gbm']:.2f}) - "
+              f"ECE {m['ece_modelo']:.3f} -> {m['ece_calibrado']:.3f} calibrado")
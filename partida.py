@@ -0,0 +1,107 @@
+import argparse
+import ast
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+# Pontos de entrada medidos: apps Streamlit e CLIs
+ENTRADAS = [
+    'dashboards.py', 'dashboards_Bruto.py', 'betanalise2.1.py',
+    'ingestao.py', 'relatorio.py', 'listagens.py', 'previsao.py', 'tarefas.py',
+]
+APPS = {'dashboards.py', 'dashboards_Bruto.py'}
+# Bibliotecas cujo carregamento pesa na partida
+PESADAS = ['prophet', 'statsmodels', 'sklearn', 'scipy', 'seaborn', 'matplotlib', 'plotly', 'pyarrow', 'xlsxwriter']
+HISTORICO = 'partida_historico.csv'
+COLUNAS = ['Quando', 'Commit', 'Entrada', 'Modo', 'Tempo (s)', 'RSS (MB)', 'Pesadas carregadas']
+
+
+def _importacoes(caminho):
+    """Só o bloco de `import` do topo do arquivo: o custo de partida sem executar o resto.
+
+    Imports feitos mais abaixo, dentro das seções que os usam, ficam de fora de propósito.
+    """
+    with open(caminho, 'r', encoding='utf-8') as f:
+        arvore = ast.parse(f.read(), caminho)
+    corpo = []
+    for no in arvore.body:
+        if isinstance(no, (ast.Import, ast.ImportFrom)):
+            corpo.append(no)
+        elif not (isinstance(no, ast.Expr) and isinstance(no.value, ast.Constant)):
+            break
+    return compile(ast.Module(body=corpo, type_ignores=[]), caminho, 'exec')
+
+
+def _medir_neste_processo(caminho, modo):
+    inicio = time.perf_counter()
+    if modo == 'importacao':
+        exec(_importacoes(caminho), {'__name__': '__partida__'})
+    else:
+        from streamlit.testing.v1 import AppTest
+        app = AppTest.from_file(caminho, default_timeout=600)
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+    return {
+        'Tempo (s)': round(time.perf_counter() - inicio, 2),
+        # ru_maxrss vem em KB no Linux
+        'RSS (MB)': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'Pesadas carregadas': ' '.join(m for m in PESADAS if m in sys.modules),
+    }
+
+
+def medir(caminho, modo='importacao'):
+    """Mede em um processo novo (partida a frio) o tempo e a memória residente de pico."""
+    ambiente = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')])))
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--filho', caminho, modo],
+        capture_output=True, text=True, env=ambiente, check=True,
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def registrar(linhas, caminho=HISTORICO):
+    novo = not os.path.exists(caminho)
+    with open(caminho, 'a', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUNAS)
+        if novo:
+            escritor.writeheader()
+        escritor.writerows(linhas)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mede a partida a frio (tempo e RSS) de cada ponto de entrada.')
+    parser.add_argument('entradas', nargs='*', default=ENTRADAS)
+    parser.add_argument('--renderizar', action='store_true',
+                        help='Também mede a primeira execução completa dos dashboards (AppTest)')
+    parser.add_argument('--historico', default=HISTORICO, help='CSV onde as medições são acumuladas')
+    parser.add_argument('--nao-registrar', action='store_true')
+    parser.add_argument('--filho', nargs=2, metavar=('ENTRADA', 'MODO'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(_medir_neste_processo(*args.filho)))
+        sys.exit()
+
+    quando, commit = time.strftime('%Y-%m-%d %H:%M:%S'), _commit()
+    linhas = []
+    for entrada in args.entradas:
+        modos = ['importacao'] + (['renderizacao'] if args.renderizar and entrada in APPS else [])
+        for modo in modos:
+            linha = {'Quando': quando, 'Commit': commit, 'Entrada': entrada, 'Modo': modo, **medir(entrada, modo)}
+            linhas.append(linha)
+            print(f"{entrada:22} {modo:12} {linha['Tempo (s)']:7.2f}s {linha['RSS (MB)']:8.1f} MB  {linha['Pesadas carregadas']}")
+    if not args.nao_registrar:
+        registrar(linhas, args.historico)
+        print(f'📁 Medições acrescentadas em {args.historico}')
@@ -0,0 +1,188 @@
+import argparse
+import logging
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import ingestao
+
+# Backtest com origem móvel: cada origem prevê as próximas HORIZONTE_PONTOS medições
+ORIGENS = 3
+HORIZONTE_PONTOS = 4
+MINIMO_TREINO = 8
+ORDEM_ARIMA = (1, 1, 1)
+# Prophet (caro) só é testado onde o melhor modelo barato erra mais que LIMIAR_PROPHET (%),
+# e só é escolhido se errar pelo menos MARGEM_PROPHET a menos que ele
+LIMIAR_PROPHET = 1.0
+MARGEM_PROPHET = 0.1
+DIAS_PREVISAO = 90
+BASES_POR_TAREFA = 20
+ESCALA_MINIMA_MB = 1e-6
+
+CHAVES = ['Servidor', 'Base']
+BARATOS = ('Linear', 'ARIMA')
+
+
+def caminho_modelos(fonte):
+    return os.path.join(armazenamento.pasta_fonte(fonte), '_modelos.parquet')
+
+
+def caminho_previsoes(fonte):
+    return os.path.join(armazenamento.pasta_fonte(fonte), '_previsoes.parquet')
+
+
+def _prever_linear(datas, y, datas_futuras):
+    x = (datas - datas[0]) / np.timedelta64(1, 'D')
+    inclinacao, intercepto = np.polyfit(x, y, 1)
+    return intercepto + inclinacao * (datas_futuras - datas[0]) / np.timedelta64(1, 'D')
+
+
+def _prever_arima(datas, y, datas_futuras):
+    # Importado só no worker que de fato ajusta ARIMA
+    from statsmodels.tsa.arima.model import ARIMA
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return ARIMA(y, order=ORDEM_ARIMA, trend='t').fit().forecast(len(datas_futuras))
+
+
+def _prever_prophet(datas, y, datas_futuras):
+    from prophet import Prophet
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    modelo = Prophet()
+    modelo.fit(pd.DataFrame({'ds': datas, 'y': y}))
+    return modelo.predict(pd.DataFrame({'ds': datas_futuras}))['yhat'].to_numpy()
+
+
+PREVISORES = {'Linear': _prever_linear, 'ARIMA': _prever_arima, 'Prophet': _prever_prophet}
+
+
+def _erro(real, previsto):
+    # Erro absoluto médio relativo ao nível da série (%): comparável entre bases de tamanhos diferentes
+    return np.mean(np.abs(real - previsto)) / max(np.mean(np.abs(real)), ESCALA_MINIMA_MB) * 100
+
+
+def backtest(modelo, datas, y, origens=ORIGENS, horizonte=HORIZONTE_PONTOS):
+    """Erro médio (%) do modelo nas últimas `origens` janelas de `horizonte` medições (NaN se não der)."""
+    erros = []
+    for k in range(origens, 0, -1):
+        corte = len(y) - k * horizonte
+        if corte < MINIMO_TREINO:
+            continue
+        try:
+            previsto = PREVISORES[modelo](datas[:corte], y[:corte], datas[corte:corte + horizonte])
+        except Exception:
+            return np.nan
+        erros.append(_erro(y[corte:corte + horizonte], previsto))
+    return float(np.mean(erros)) if erros else np.nan
+
+
+def _datas_futuras(datas, dias=DIAS_PREVISAO):
+    # Mantém a cadência típica da série (semanal nos dumps) até o horizonte
+    passo = max(int(np.median(np.diff(datas)) / np.timedelta64(1, 'D')), 1) if len(datas) > 1 else 7
+    return datas[-1] + np.arange(passo, dias + 1, passo) * np.timedelta64(1, 'D')
+
+
+def avaliar_serie(datas, y):
+    """Backtest em cascata e previsão final só com o modelo vencedor."""
+    erros = {modelo: backtest(modelo, datas, y) for modelo in BARATOS}
+    barato = min(BARATOS, key=lambda m: np.inf if np.isnan(erros[m]) else erros[m])
+    erros['Prophet'] = np.nan
+    if erros[barato] > LIMIAR_PROPHET:
+        erros['Prophet'] = backtest('Prophet', datas, y)
+    vencedor = 'Prophet' if erros['Prophet'] < erros[barato] * (1 - MARGEM_PROPHET) else barato
+
+    datas_futuras = _datas_futuras(datas)
+    try:
+        if len(y) < 2:
+            raise ValueError('série curta demais')
+        previsto = PREVISORES[vencedor](datas, y, datas_futuras)
+    except Exception:
+        # Sem ajuste possível, a previsão repete o último tamanho
+        vencedor, previsto = 'Último valor', np.full(len(datas_futuras), y[-1])
+    return erros, vencedor, datas_futuras, previsto
+
+
+def _avaliar_lote(series):
+    modelos, previsoes = [], []
+    for servidor, base, datas, y in series:
+        erros, vencedor, datas_futuras, previsto = avaliar_serie(datas, y)
+        modelos.append({
+            'Servidor': servidor, 'Base': base, 'Pontos': len(y), 'Última Data': datas[-1],
+            'Erro Linear (%)': erros['Linear'], 'Erro ARIMA (%)': erros['ARIMA'],
+            'Erro Prophet (%)': erros['Prophet'], 'Modelo': vencedor, 'Erro (%)': erros.get(vencedor, np.nan),
+        })
+        previsoes.append(pd.DataFrame({
+            'Servidor': servidor, 'Base': base, 'Data': datas_futuras, 'Tamanho (MB)': previsto, 'Modelo': vencedor,
+        }))
+    return modelos, previsoes
+
+
+def selecionar_modelos(fonte, servidores=None, max_workers=None, progresso=None):
+    """Avalia todas as bases em paralelo (processos) e grava o modelo vencedor e sua previsão.
+
+    `progresso(feitas, total)` é chamado a cada lote de bases concluído.
+    """
+    df = armazenamento.carregar(fonte, servidores, colunas=ingestao.COLUNAS_SNAPSHOT)
+    df = df.dropna(subset=['Tamanho (MB)']).sort_values(CHAVES + ['Data'])
+    series = [
+        (servidor, base, grupo['Data'].to_numpy(), grupo['Tamanho (MB)'].to_numpy(dtype=float))
+        for (servidor, base), grupo in df.groupby(CHAVES, sort=False)
+    ]
+    lotes = [series[i:i + BASES_POR_TAREFA] for i in range(0, len(series), BASES_POR_TAREFA)]
+
+    modelos, previsoes, feitas = [], [], 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(_avaliar_lote, lote): len(lote) for lote in lotes}
+        for futuro in as_completed(futuros):
+            m, p = futuro.result()
+            modelos += m
+            previsoes += p
+            feitas += futuros[futuro]
+            if progresso:
+                progresso(feitas, len(series))
+
+    modelos = pd.DataFrame(modelos).sort_values(CHAVES, ignore_index=True)
+    modelos['Ajustado em'] = pd.Timestamp.now().floor('s')
+    armazenamento.gravar_atomico(modelos, caminho_modelos(fonte))
+    armazenamento.gravar_atomico(pd.concat(previsoes, ignore_index=True), caminho_previsoes(fonte))
+    return modelos
+
+
+def desatualizada(fonte):
+    # Sem modelos ou com partições gravadas depois da última seleção
+    caminho = caminho_modelos(fonte)
+    if not os.path.exists(caminho):
+        return True
+    particoes = [armazenamento.caminho_particao(fonte, s) for s in armazenamento.listar_servidores(fonte)]
+    return max((os.path.getmtime(p) for p in particoes), default=0) > os.path.getmtime(caminho)
+
+
+def carregar_modelos(fonte):
+    return pd.read_parquet(caminho_modelos(fonte)) if os.path.exists(caminho_modelos(fonte)) else None
+
+
+def carregar_previsoes(fonte):
+    return pd.read_parquet(caminho_previsoes(fonte)) if os.path.exists(caminho_previsoes(fonte)) else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Seleciona, por backtest, o melhor modelo de previsão de cada base.')
+    parser.add_argument('--fonte', default='saida', choices=sorted(armazenamento.FONTES))
+    parser.add_argument('--servidores', nargs='*', help='Padrão: todos os servidores descobertos')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    ingestao.garantir(args.fonte)
+    modelos = selecionar_modelos(
+        args.fonte, args.servidores, args.workers,
+        progresso=lambda feitas, total: print(f'⏳ {feitas}/{total} bases', end='\r')
+    )
+    print()
+    print(modelos['Modelo'].value_counts().to_string())
+    print(f'✅ {len(modelos)} bases avaliadas em {time.perf_counter() - inicio:.1f}s')
@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+import agregados
+import armazenamento
+
+# Dataset processado publicado uma vez por fonte em Arrow IPC (Feather v2) sem compressão,
+# para ser mapeado em memória: sessões e processos leem as mesmas páginas, sem cópia
+
+
+def caminho_publicado(fonte):
+    return os.path.join(armazenamento.pasta_fonte(fonte), '_dados.arrow')
+
+
+def montar(fonte):
+    """Dados de todos os servidores com Crescimento (%) calculado, em tipos compactos."""
+    partes = armazenamento.mapear_servidores(agregados.calcular_crescimento_percentual, fonte)
+    return armazenamento.compactar(pd.concat(partes.values(), ignore_index=True))
+
+
+def _tabela(df):
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    # NaN continua NaN (e não nulo): colunas sem nulos são lidas sem cópia
+    for i, coluna in enumerate(df.columns):
+        if pd.api.types.is_float_dtype(df[coluna]):
+            tabela = tabela.set_column(i, coluna, pa.array(df[coluna].to_numpy()))
+    return tabela
+
+
+def publicar(fonte, df=None):
+    """Grava o dataset processado e troca o arquivo de uma vez.
+
+    Quem já mapeou a versão anterior continua lendo-a até reabrir; os novos leitores
+    passam a ver a nova versão inteira, nunca um arquivo pela metade.
+    """
+    if df is None:
+        df = montar(fonte)
+    tabela = _tabela(df)
+    caminho = caminho_publicado(fonte)
+    temporario = caminho + '.tmp'
+    with pa.OSFile(temporario, 'wb') as arquivo:
+        with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+
+
+def desatualizada(fonte):
+    caminho = caminho_publicado(fonte)
+    servidores = armazenamento.listar_servidores(fonte)
+    if not os.path.exists(caminho):
+        return bool(servidores)
+    mais_recente = max((os.path.getmtime(armazenamento.caminho_particao(fonte, s)) for s in servidores), default=0)
+    return mais_recente > os.path.getmtime(caminho)
+
+
+def abrir(fonte):
+    """DataFrame somente leitura apoiado no arquivo mapeado em memória (colunas numéricas sem cópia)."""
+    tabela = pa.ipc.open_file(pa.memory_map(caminho_publicado(fonte))).read_all()
+    return tabela.to_pandas(split_blocks=True)
@@ -0,0 +1,191 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import ingestao
+import publicacao
+
+# Conciliação das duas visões das mesmas bases: tamanho do dump nas listagens de arquivos (saida)
+# e tamanho do banco no `\l+` do psql (saida_bancos)
+FONTE_ARQUIVOS = 'saida'
+FONTE_BANCOS = 'saida_bancos'
+# As coletas não caem nos mesmos dias: cada medição de banco casa com a listagem mais próxima até esta distância
+TOLERANCIA_DIAS = 4
+# Dump e banco não têm o mesmo tamanho (compressão, índices); diverge a medição cuja razão
+# banco/arquivo se afasta mais que isto da razão típica da base
+LIMITE_DIVERGENCIA = 0.25
+# Bits reservados ao dia na chave ordenada (série, dia): folga para ~2800 anos de medições
+BITS_DIA = 20
+
+CHAVES = ['Servidor', 'Base']
+CONCILIADA, DIVERGENTE, SO_ARQUIVOS, SO_BANCOS = 'Conciliada', 'Divergente', 'Só arquivos', 'Só bancos'
+SITUACOES = [CONCILIADA, DIVERGENTE, SO_ARQUIVOS, SO_BANCOS]
+
+
+def caminho_reconciliacao():
+    return os.path.join(armazenamento.PASTA_PARTICOES, '_reconciliacao.parquet')
+
+
+def _categorias(coluna, *dfs):
+    valores = [df[coluna].cat.categories if isinstance(df[coluna].dtype, pd.CategoricalDtype) else df[coluna].unique()
+               for df in dfs]
+    categorias = pd.Index(valores[0]).union(pd.Index(valores[1]))
+    return sorted(categorias, key=armazenamento.ordem_servidor) if coluna == 'Servidor' else categorias
+
+
+def _codificar(arquivos, bancos):
+    """Servidor/Base das duas fontes nos mesmos códigos e uma chave inteira por série (Servidor, Base)."""
+    codigos = {}
+    for coluna in CHAVES:
+        categorias = _categorias(coluna, arquivos, bancos)
+        codigos[coluna] = [pd.Categorical(df[coluna], categories=categorias) for df in (arquivos, bancos)]
+    n_bases = len(codigos['Base'][0].categories)
+    series = [codigos['Servidor'][i].codes.astype(np.int64) * n_bases + codigos['Base'][i].codes for i in (0, 1)]
+    return codigos, series
+
+
+def _dias(datas):
+    return datas.to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def _juntar(codigos, coluna, sobras):
+    arquivos, bancos = codigos[coluna]
+    return pd.Categorical.from_codes(np.r_[arquivos.codes, bancos.codes[sobras]], arquivos.categories)
+
+
+def reconciliar(arquivos, bancos, tolerancia_dias=TOLERANCIA_DIAS, limite=LIMITE_DIVERGENCIA):
+    """Casa, um para um, cada medição de banco com a listagem de arquivos mais próxima da mesma base.
+
+    Merge ordenado: a fonte de bancos é ordenada por uma chave inteira (série, dia) e cada listagem
+    acha seus vizinhos com searchsorted; O(n log n), sem comparar strings. Devolve todas as medições
+    das duas fontes, com a situação de cada uma.
+    """
+    arquivos = arquivos.dropna(subset=['Tamanho (MB)'])
+    bancos = bancos.dropna(subset=['Tamanho (MB)'])
+    codigos, (serie_a, serie_b) = _codificar(arquivos, bancos)
+    # Série nos bits altos e dia nos baixos: entre séries a distância é sempre maior que a tolerância.
+    # Os dias contam a partir da data mais antiga das duas fontes, para caberem nos BITS_DIA
+    dias_a, dias_b = _dias(arquivos['Data']), _dias(bancos['Data'])
+    todos = np.r_[dias_a, dias_b]
+    origem = todos.min() if len(todos) else 0
+    chave_a = (serie_a << BITS_DIA) + dias_a - origem
+    chave_b = (serie_b << BITS_DIA) + dias_b - origem
+
+    ordem_b = np.argsort(chave_b, kind='stable')
+    ordenada = chave_b[ordem_b]
+    # Sentinelas nas pontas: toda listagem tem um vizinho à esquerda e um à direita
+    vizinhos = np.r_[-2 ** 62, ordenada, 2 ** 62]
+    posicao = np.searchsorted(ordenada, chave_a)
+    antes, depois = chave_a - vizinhos[posicao], vizinhos[posicao + 1] - chave_a
+    distancia = np.minimum(antes, depois)
+    indice = np.r_[ordem_b, -1][np.clip(np.where(antes <= depois, posicao - 1, posicao), 0, len(ordem_b))]
+    banco = np.where(distancia <= tolerancia_dias, indice, -1)
+
+    # Uma medição de banco pode ser a mais próxima de várias listagens: fica só com a listagem mais próxima
+    casadas = np.flatnonzero(banco >= 0)
+    casadas = casadas[np.lexsort((distancia[casadas], banco[casadas]))]
+    banco[casadas[1:][banco[casadas][1:] == banco[casadas][:-1]]] = -1
+    casou = banco >= 0
+    sobras = np.setdiff1d(np.arange(len(bancos)), banco[casou], assume_unique=True)
+
+    tamanho_b = bancos['Tamanho (MB)'].to_numpy(dtype=float)
+    datas_b = bancos['Data'].to_numpy(dtype='datetime64[ns]')
+    tamanho_a = np.r_[arquivos['Tamanho (MB)'].to_numpy(dtype=float), np.full(len(sobras), np.nan)]
+    tamanho_banco = np.r_[np.where(casou, tamanho_b[banco], np.nan), tamanho_b[sobras]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        razao = tamanho_banco / np.where(tamanho_a > 0, tamanho_a, np.nan)
+    serie = np.r_[serie_a, serie_b[sobras]]
+    tipica = pd.Series(razao).groupby(serie).transform('median').to_numpy()
+    desvio = (razao / tipica - 1) * 100
+
+    combinado = pd.DataFrame({
+        'Servidor': _juntar(codigos, 'Servidor', sobras),
+        'Base': _juntar(codigos, 'Base', sobras),
+        'Data': np.r_[arquivos['Data'].to_numpy(dtype='datetime64[ns]'), datas_b[sobras]],
+        'Tamanho Arquivos (MB)': tamanho_a,
+        'Data Bancos': np.r_[np.where(casou, datas_b[banco], np.datetime64('NaT')), datas_b[sobras]],
+        'Tamanho Bancos (MB)': tamanho_banco,
+        'Razão': razao,
+        'Desvio (%)': desvio,
+        'Situação': pd.Categorical.from_codes(np.select(
+            [np.isnan(tamanho_banco), np.isnan(tamanho_a), np.abs(desvio) > limite * 100],
+            [SITUACOES.index(SO_ARQUIVOS), SITUACOES.index(SO_BANCOS), SITUACOES.index(DIVERGENTE)],
+            SITUACOES.index(CONCILIADA),
+        ), SITUACOES),
+    })
+    return combinado.iloc[np.lexsort((combinado['Data'].to_numpy(), serie))].reset_index(drop=True)
+
+
+def resumo_bases(reconciliado):
+    """Uma linha por (Servidor, Base): em quais fontes aparece e quantas medições divergem."""
+    contagem = pd.crosstab(
+        [reconciliado['Servidor'], reconciliado['Base']], reconciliado['Situação']
+    ).reindex(columns=SITUACOES, fill_value=0)
+    agregado = reconciliado.groupby(CHAVES, observed=True).agg(**{
+        'Razão Típica': ('Razão', 'median'),
+        'Maior Desvio (%)': ('Desvio (%)', lambda d: d.abs().max()),
+        'Última Data': ('Data', 'max'),
+    })
+    resumo = contagem.join(agregado).reset_index()
+    casadas = resumo[CONCILIADA] + resumo[DIVERGENTE]
+    em_arquivos = casadas + resumo[SO_ARQUIVOS] > 0
+    em_bancos = casadas + resumo[SO_BANCOS] > 0
+    resumo['Presença'] = np.select([em_arquivos & em_bancos, em_arquivos], ['Ambas', SO_ARQUIVOS], SO_BANCOS)
+    resumo['Situação'] = np.select(
+        [resumo['Presença'] != 'Ambas', resumo[DIVERGENTE] > 0],
+        [resumo['Presença'], DIVERGENTE],
+        CONCILIADA,
+    )
+    # Problemas primeiro: divergentes, depois as que faltam em uma das fontes
+    prioridade = resumo['Situação'].map({DIVERGENTE: 0, SO_ARQUIVOS: 1, SO_BANCOS: 2, CONCILIADA: 3})
+    ordem = np.lexsort((-resumo['Maior Desvio (%)'].fillna(0).to_numpy(), -resumo[DIVERGENTE].to_numpy(),
+                        prioridade.to_numpy()))
+    return resumo.iloc[ordem].reset_index(drop=True)
+
+
+def recalcular():
+    # Os datasets publicados já trazem Servidor/Base como categorias: a codificação não compara strings
+    reconciliado = reconciliar(publicacao.abrir(FONTE_ARQUIVOS), publicacao.abrir(FONTE_BANCOS))
+    armazenamento.gravar_atomico(reconciliado, caminho_reconciliacao())
+    return reconciliado
+
+
+def desatualizada():
+    caminho = caminho_reconciliacao()
+    if not os.path.exists(caminho):
+        return True
+    particoes = [
+        armazenamento.caminho_particao(fonte, s)
+        for fonte in (FONTE_ARQUIVOS, FONTE_BANCOS) for s in armazenamento.listar_servidores(fonte)
+    ]
+    return max((os.path.getmtime(p) for p in particoes), default=0) > os.path.getmtime(caminho)
+
+
+def garantir():
+    """Conciliação atualizada com as partições das duas fontes (recalculada só se alguma mudou)."""
+    ingestao.garantir(FONTE_ARQUIVOS)
+    ingestao.garantir(FONTE_BANCOS)
+    return recalcular() if desatualizada() else carregar()
+
+
+def carregar():
+    return pd.read_parquet(caminho_reconciliacao())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concilia os tamanhos das listagens de arquivos e do psql \\l+.')
+    parser.add_argument('--forcar', action='store_true', help='Recalcula mesmo sem partições novas')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    ingestao.garantir(FONTE_ARQUIVOS)
+    ingestao.garantir(FONTE_BANCOS)
+    reconciliado = recalcular() if args.forcar or desatualizada() else carregar()
+    resumo = resumo_bases(reconciliado)
+    print(reconciliado['Situação'].value_counts().to_string())
+    print(resumo['Situação'].value_counts().to_string())
+    print(f'✅ {len(reconciliado)} medições e {len(resumo)} bases conciliadas em {time.perf_counter() - inicio:.1f}s')
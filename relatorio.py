@@ -0,0 +1,172 @@
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+import agregados
+import armazenamento
+import ingestao
+
+# Projeção dos próximos 6 meses, a cada 7 dias (mesmo horizonte dos notebooks)
+DIAS_PROJECAO = 180
+PASSO_PROJECAO = 7
+PASTA_RELATORIOS = 'relatorios'
+
+# Data de referência das datas seriais do Excel
+EPOCA_EXCEL = np.datetime64('1899-12-30')
+
+
+def _serial_excel(datas):
+    return (datas.to_numpy(dtype='datetime64[ns]') - EPOCA_EXCEL) / np.timedelta64(1, 'D')
+
+
+def projetar_bases(df, dias=DIAS_PROJECAO, passo=PASSO_PROJECAO):
+    """Regressão linear de todas as bases de uma vez e pontos projetados de cada uma."""
+    df = df[['Base', 'Data', 'Tamanho (MB)']].sort_values(['Base', 'Data'], ignore_index=True)
+    df['Tamanho (GB)'] = df['Tamanho (MB)'] / 1024
+    df['dias'] = (df['Data'] - df.groupby('Base')['Data'].transform('min')).dt.days
+
+    ajuste = agregados.regressao_em_lote(df, ['Base'], 'dias', 'Tamanho (GB)')
+    ajuste['Data Final'] = df.groupby('Base')['Data'].max()
+    ajuste['Último Tamanho (GB)'] = df.groupby('Base')['Tamanho (GB)'].last()
+
+    # Produto (bases x passos futuros) calculado de uma vez; o último passo é sempre o horizonte,
+    # mesmo quando `dias` não é múltiplo de `passo` (180 dias de 7 em 7)
+    passos = np.union1d(np.arange(passo, dias, passo), [dias])
+    bases = np.repeat(ajuste.index.to_numpy(), len(passos))
+    deslocamento = np.tile(passos, len(ajuste))
+    x = np.repeat(ajuste['x_max'].to_numpy(), len(passos)) + deslocamento
+    projecao = pd.DataFrame({
+        'Base': bases,
+        'Data': np.repeat(ajuste['Data Final'].to_numpy(), len(passos)) + pd.to_timedelta(deslocamento, unit='D'),
+        'Projetado (GB)': np.repeat(ajuste['intercepto'].to_numpy(), len(passos))
+        + np.repeat(ajuste['inclinacao'].to_numpy(), len(passos)) * x,
+    })
+    ajuste['Projetado Final (GB)'] = projecao.groupby('Base')['Projetado (GB)'].last()
+    return df, projecao, ajuste
+
+
+def _nome_aba(base, usados):
+    # Excel limita a 31 caracteres e proíbe alguns símbolos; garante nomes únicos
+    nome = re.sub(r'[\[\]:*?/\\]', '_', str(base))[:31]
+    candidato, i = nome, 1
+    while candidato.lower() in usados:
+        sufixo = f'~{i}'
+        candidato, i = nome[:31 - len(sufixo)] + sufixo, i + 1
+    usados.add(candidato.lower())
+    return candidato
+
+
+def _limites(valores):
+    # Posições de início/fim de cada bloco contíguo de valores iguais (entrada já ordenada)
+    _, inicios = np.unique(valores, return_index=True)
+    return zip(inicios, np.append(inicios[1:], len(valores)))
+
+
+def gerar_relatorio_servidor(fonte, servidor, pasta_saida=PASTA_RELATORIOS,
+                             dias=DIAS_PROJECAO, passo=PASSO_PROJECAO, tmpdir=None):
+    """Gera a planilha de um servidor: uma aba de resumo e uma aba com gráfico por base."""
+    df, projecao, ajuste = projetar_bases(armazenamento.carregar_servidor(fonte, servidor), dias, passo)
+
+    os.makedirs(pasta_saida, exist_ok=True)
+    caminho = os.path.join(pasta_saida, f'crescimento_{fonte}_{servidor}.xlsx')
+    # constant_memory grava cada linha direto no disco: as linhas precisam sair em ordem.
+    # Cria um temporário por aba, então `tmpdir` num disco rápido (ex.: /dev/shm) ajuda
+    workbook = xlsxwriter.Workbook(caminho, {'constant_memory': True, 'tmpdir': tmpdir})
+    formato_data = workbook.add_format({'num_format': 'dd/mm/yyyy'})
+    formato_numero = workbook.add_format({'num_format': '0.0000'})
+    formato_cabecalho = workbook.add_format({'bold': True})
+
+    usados = {'resumo'}
+    abas = [_nome_aba(base, usados) for base in ajuste.index]
+
+    resumo = workbook.add_worksheet('Resumo')
+    resumo.write_row(0, 0, ['Base', 'Aba', 'Último Tamanho (GB)', 'Crescimento (GB/dia)',
+                            f'Projetado em {dias} dias (GB)'], formato_cabecalho)
+    resumo.set_column(0, 1, 32)
+    resumo.set_column(2, 4, 22, formato_numero)
+    for linha, (base, aba, ultimo, inclinacao, final) in enumerate(zip(
+        ajuste.index, abas, ajuste['Último Tamanho (GB)'], ajuste['inclinacao'], ajuste['Projetado Final (GB)']
+    ), start=1):
+        resumo.write_row(linha, 0, [base, aba, ultimo, inclinacao, final])
+
+    datas_reais, tamanhos = _serial_excel(df['Data']), df['Tamanho (GB)'].to_numpy()
+    datas_proj, projetados = _serial_excel(projecao['Data']), projecao['Projetado (GB)'].to_numpy()
+    blocos_proj = list(_limites(projecao['Base'].to_numpy()))
+
+    for aba, (ini, fim), (ini_p, fim_p) in zip(abas, _limites(df['Base'].to_numpy()), blocos_proj):
+        ws = workbook.add_worksheet(aba)
+        ws.write_row(0, 0, ['Data', 'Tamanho (GB)', 'Projetado (GB)'], formato_cabecalho)
+        ws.set_column(0, 0, 12, formato_data)
+        ws.set_column(1, 2, 15, formato_numero)
+        linha = 1
+        for data, tamanho in zip(datas_reais[ini:fim], tamanhos[ini:fim]):
+            ws.write_number(linha, 0, data)
+            ws.write_number(linha, 1, tamanho)
+            linha += 1
+        for data, projetado in zip(datas_proj[ini_p:fim_p], projetados[ini_p:fim_p]):
+            ws.write_number(linha, 0, data)
+            ws.write_number(linha, 2, projetado)
+            linha += 1
+
+        # O gráfico é montado junto com a aba, sem reabrir a planilha depois
+        ultima_linha = linha - 1
+        chart = workbook.add_chart({'type': 'line'})
+        chart.add_series({
+            'name': 'Real',
+            'categories': [aba, 1, 0, ultima_linha, 0],
+            'values': [aba, 1, 1, ultima_linha, 1],
+            'line': {'color': '#1F497D'},
+        })
+        chart.add_series({
+            'name': 'Projetado',
+            'categories': [aba, 1, 0, ultima_linha, 0],
+            'values': [aba, 1, 2, ultima_linha, 2],
+            'line': {'color': '#C0504D', 'dash_type': 'round_dot'},
+        })
+        chart.set_title({'name': f'Crescimento real vs projetado - {aba}'})
+        chart.set_x_axis({'name': 'Data', 'date_axis': True, 'num_format': 'dd/mm/yyyy'})
+        chart.set_y_axis({'name': 'Tamanho (GB)'})
+        chart.show_blanks_as('span')
+        chart.set_size({'width': 720, 'height': 360})
+        ws.insert_chart('E2', chart)
+
+    workbook.close()
+    return caminho
+
+
+def gerar_relatorios(fonte, servidores=None, pasta_saida=PASTA_RELATORIOS,
+                     dias=DIAS_PROJECAO, passo=PASSO_PROJECAO, max_workers=None, tmpdir=None):
+    """Uma planilha por servidor, geradas em paralelo (processos: a escrita é CPU-bound)."""
+    servidores = servidores or armazenamento.listar_servidores(fonte)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futuros = [
+            executor.submit(gerar_relatorio_servidor, fonte, s, pasta_saida, dias, passo, tmpdir)
+            for s in servidores
+        ]
+        return [f.result() for f in futuros]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera planilhas de crescimento com projeção e gráficos.')
+    parser.add_argument('--fonte', default='saida', choices=sorted(armazenamento.FONTES))
+    parser.add_argument('--servidores', nargs='*', help='Padrão: todos os servidores descobertos')
+    parser.add_argument('--saida', default=PASTA_RELATORIOS)
+    parser.add_argument('--dias', type=int, default=DIAS_PROJECAO)
+    parser.add_argument('--passo', type=int, default=PASSO_PROJECAO)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--tmpdir', help='Pasta para os temporários do xlsxwriter')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    ingestao.garantir(args.fonte)
+    caminhos = gerar_relatorios(args.fonte, args.servidores, args.saida, args.dias, args.passo,
+                                args.workers, args.tmpdir)
+    for caminho in caminhos:
+        print(f'📈 {caminho}')
+    print(f'✅ {len(caminhos)} planilha(s) geradas em {time.perf_counter() - inicio:.1f}s')
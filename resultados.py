@@ -0,0 +1,238 @@
+import argparse
+import os
+import re
+import time
+
+import pandas as pd
+import requests
+from bs4 import BeautifulSoup
+
+# Resultados das partidas guardados localmente em Parquet, um arquivo por (liga, temporada),
+# para o modelo e os backtests usarem várias temporadas sem raspar tudo de novo a cada execução
+PASTA_RESULTADOS = os.path.join(os.environ.get('BETS_PASTA_DADOS', 'data_bets'), 'resultados')
+# Sobrepõe o domínio de todas as ligas (ex.: um servidor local que imita o Transfermarkt)
+URL_BASE = os.environ.get('BETS_URL_BASE')
+TIMEOUT_S = 30
+# Novas tentativas, com espera crescente, quando o site responde 429 (limite) ou 5xx
+TENTATIVAS = 3
+ESPERA_TENTATIVAS_S = 0.5
+# Além das rodadas já em andamento, quantas das próximas são consultadas a cada atualização
+RODADAS_A_FRENTE = 2
+
+CABECALHO = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
+}
+
+# Liga -> página de jogos no Transfermarkt e temporada em andamento
+LIGAS = {
+    'Brasileiro Serie - A': {
+        'dominio': 'https://www.transfermarkt.co.uk', 'caminho': 'campeonato-brasileiro-serie-a', 'codigo': 'BRA1',
+        'temporada': 2024,
+    },
+    'Brasileiro Serie - B': {
+        'dominio': 'https://www.transfermarkt.com.br', 'caminho': 'campeonato-brasileiro-serie-b', 'codigo': 'BRA2',
+        'temporada': 2024,
+    },
+    'MLS': {
+        'dominio': 'https://www.transfermarkt.co.uk', 'caminho': 'major-league-soccer', 'codigo': 'MLS1',
+        'temporada': 2024,
+    },
+    'Premier League': {
+        'dominio': 'https://www.transfermarkt.com.br', 'caminho': 'premier-league', 'codigo': 'GB1',
+        'temporada': 2025,
+    },
+}
+
+COLUNAS = ['liga', 'temporada', 'rodada', 'data', 'hora', 'casa', 'fora', 'gols_casa', 'gols_fora', 'buscado_em']
+PLACAR = re.compile(r'(\d+):(\d+)')
+
+
+def nome_liga(liga):
+    """Nome da liga usável em caminhos ('Brasileiro Serie - A' -> 'brasileiro_serie_a')."""
+    return re.sub(r'[^a-z0-9]+', '_', liga.lower()).strip('_')
+
+
+def caminho_temporada(liga, temporada):
+    return os.path.join(PASTA_RESULTADOS, f'liga={nome_liga(liga)}', f'temporada={temporada}.parquet')
+
+
+def url_jogos(liga, temporada, rodada_de=None, rodada_ate=None):
+    """Página de jogos da temporada; com rodada_de/rodada_ate, só esse intervalo de rodadas."""
+    config = LIGAS[liga]
+    url = f"{URL_BASE or config['dominio']}/{config['caminho']}/gesamtspielplan/wettbewerb/{config['codigo']}" \
+          f"?saison_id={temporada}"
+    if rodada_de is not None:
+        url += f'&spieltagVon={rodada_de}&spieltagBis={rodada_ate}'
+    return url
+
+
+def interpretar_pagina(html):
+    """Jogos de uma página de jogos do Transfermarkt: data, hora, casa, fora, rodada e gols (nulos se não jogado)."""
+    pagina = BeautifulSoup(html, 'html.parser')
+    linhas = []
+    # Data e hora só aparecem na primeira partida de cada dia/horário: as seguintes herdam
+    ultima_data, ultima_hora = '', ''
+    for bloco in pagina.find_all('div', class_='content-box-headline'):
+        numero = re.search(r'\d+', bloco.get_text(strip=True))
+        tabela = bloco.find_next('table')
+        if not numero or not tabela:
+            continue
+        for linha in tabela.find_all('tr'):
+            colunas = linha.find_all('td')
+            if len(colunas) < 7:
+                continue
+            data = colunas[0].get_text(strip=True) or ultima_data
+            hora = colunas[1].get_text(strip=True) or ultima_hora
+            ultima_data, ultima_hora = data, hora
+            placar = PLACAR.search(colunas[4].get_text(strip=True))
+            linhas.append({
+                'rodada': int(numero.group()),
+                'data': data,
+                'hora': hora,
+                'casa': re.sub(r'\(\d+\.\)', '', colunas[2].get_text(strip=True)).strip(),
+                'fora': re.sub(r'\(\d+\.\)', '', colunas[6].get_text(strip=True)).strip(),
+                'gols_casa': int(placar.group(1)) if placar else None,
+                'gols_fora': int(placar.group(2)) if placar else None,
+            })
+    return pd.DataFrame(linhas, columns=['rodada', 'data', 'hora', 'casa', 'fora', 'gols_casa', 'gols_fora'])
+
+
+def _tipar(df, liga, temporada):
+    return df.assign(
+        liga=liga, temporada=int(temporada), buscado_em=pd.Timestamp.now().floor('s'),
+    ).astype({'rodada': 'int16', 'gols_casa': 'Int16', 'gols_fora': 'Int16'})[COLUNAS]
+
+
+def nova_sessao():
+    """Sessão HTTP que repete as requisições recusadas pelo site (429/5xx); falha de conexão não é repetida."""
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    novas_tentativas = Retry(
+        total=TENTATIVAS, connect=0, read=0, backoff_factor=ESPERA_TENTATIVAS_S,
+        status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'],
+    )
+    sessao = requests.Session()
+    sessao.mount('http://', HTTPAdapter(max_retries=novas_tentativas))
+    sessao.mount('https://', HTTPAdapter(max_retries=novas_tentativas))
+    return sessao
+
+
+def buscar(liga, temporada, rodada_de=None, rodada_ate=None, sessao=None):
+    resposta = (sessao or requests).get(
+        url_jogos(liga, temporada, rodada_de, rodada_ate), headers=CABECALHO, timeout=TIMEOUT_S
+    )
+    resposta.raise_for_status()
+    return _tipar(interpretar_pagina(resposta.content), liga, temporada)
+
+
+def carregar_temporada(liga, temporada):
+    caminho = caminho_temporada(liga, temporada)
+    return pd.read_parquet(caminho) if os.path.exists(caminho) else None
+
+
+def rodadas_finais(df):
+    """Rodadas em que todas as partidas já têm placar."""
+    jogadas = df['gols_casa'].notna().groupby(df['rodada']).all()
+    return set(jogadas.index[jogadas])
+
+
+def rodadas_pendentes(df, a_frente=RODADAS_A_FRENTE):
+    """Rodadas que ainda podem mudar: as começadas e não terminadas (inclusive adiadas) e as próximas `a_frente`."""
+    finais = rodadas_finais(df)
+    com_jogo = df.loc[df['gols_casa'].notna(), 'rodada']
+    limite = (com_jogo.max() if not com_jogo.empty else 0) + a_frente
+    return sorted(r for r in df['rodada'].unique() if r not in finais and r <= limite)
+
+
+def _intervalos(rodadas):
+    # Rodadas consecutivas viram uma única consulta com spieltagVon/spieltagBis
+    intervalos = []
+    for rodada in rodadas:
+        if intervalos and rodada == intervalos[-1][1] + 1:
+            intervalos[-1][1] = rodada
+        else:
+            intervalos.append([rodada, rodada])
+    return intervalos
+
+
+def _gravar(df, caminho):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.tmp'
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def atualizar(liga, temporada=None, sessao=None):
+    """Resultados da temporada, buscando no site só as rodadas que faltam ou ainda não terminaram.
+
+    A primeira busca de uma temporada traz a tabela inteira; depois, só os intervalos de rodadas
+    pendentes são consultados e substituídos. Temporadas encerradas não geram mais nenhuma requisição.
+    """
+    temporada = temporada or LIGAS[liga]['temporada']
+    sessao = sessao or nova_sessao()
+    atual = carregar_temporada(liga, temporada)
+    if atual is None or atual.empty:
+        novo = buscar(liga, temporada, sessao=sessao)
+    else:
+        pendentes = rodadas_pendentes(atual)
+        if not pendentes:
+            return atual
+        partes = [
+            buscar(liga, temporada, de, ate, sessao)
+            for de, ate in _intervalos(pendentes)
+        ]
+        buscadas = pd.concat(partes, ignore_index=True)
+        # Só as rodadas pendentes são trocadas (se uma delas não veio na página, fica a versão guardada)
+        buscadas = buscadas[buscadas['rodada'].isin(pendentes)]
+        novo = pd.concat([atual[~atual['rodada'].isin(buscadas['rodada'].unique())], buscadas], ignore_index=True)
+    if novo.empty:
+        return novo
+    novo = novo.sort_values('rodada', kind='stable', ignore_index=True)
+    _gravar(novo, caminho_temporada(liga, temporada))
+    return novo
+
+
+def temporadas_guardadas(liga):
+    pasta = os.path.dirname(caminho_temporada(liga, 0))
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(int(m.group(1)) for m in (re.fullmatch(r'temporada=(\d+)\.parquet', n) for n in os.listdir(pasta)) if m)
+
+
+def carregar(ligas=None, temporadas=None):
+    """Resultados guardados de várias ligas/temporadas (sem acessar o site), para o modelo e os backtests."""
+    partes = [
+        carregar_temporada(liga, temporada)
+        for liga in (ligas or LIGAS)
+        for temporada in (temporadas or temporadas_guardadas(liga))
+    ]
+    partes = [p for p in partes if p is not None]
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS)
+    return pd.concat(partes, ignore_index=True)
+
+
+def formato_app(df):
+    """Tabela no formato que o app sempre usou: data, hora, casa, fora, resultado ('g:g' ou '-:-') e rodada."""
+    jogado = df['gols_casa'].notna()
+    resultado = df['gols_casa'].astype(str).str.cat(df['gols_fora'].astype(str), sep=':').where(jogado, '-:-')
+    return pd.DataFrame({
+        'data': df['data'], 'hora': df['hora'], 'casa': df['casa'], 'fora': df['fora'],
+        'resultado': resultado, 'rodada': df['rodada'].astype(int),
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Atualiza o histórico local de resultados das ligas.')
+    parser.add_argument('--ligas', nargs='*', default=list(LIGAS), choices=list(LIGAS))
+    parser.add_argument('--temporadas', nargs='*', type=int, help='Padrão: a temporada em andamento de cada liga')
+    args = parser.parse_args()
+
+    with nova_sessao() as sessao:
+        for liga in args.ligas:
+            for temporada in args.temporadas or [LIGAS[liga]['temporada']]:
+                inicio = time.perf_counter()
+                df = atualizar(liga, temporada, sessao)
+                finais = len(rodadas_finais(df)) if not df.empty else 0
+                print(f'✅ {liga} {temporada}: {len(df)} jogos, {finais} rodada(s) encerradas '
+                      f'({time.perf_counter() - inicio:.1f}s)')
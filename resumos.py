@@ -0,0 +1,179 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+
+# Tabelas consolidadas gravadas ao lado das partições e mantidas pela ingestão,
+# para os dashboards lerem tabelas pequenas em vez de reagrupar as linhas brutas
+RESUMOS = ('totais_diarios', 'totais_mensais', 'ultimo_por_base', 'crescimento_base')
+
+CHAVES = ['Servidor', 'Base']
+CHAVES_DIA = ['Servidor', 'Data']
+CHAVES_MES = ['Servidor', 'Mês']
+
+
+def caminho_resumo(fonte, nome):
+    return os.path.join(armazenamento.pasta_fonte(fonte), f'_{nome}.parquet')
+
+
+def existem(fonte):
+    return all(os.path.exists(caminho_resumo(fonte, nome)) for nome in RESUMOS)
+
+
+def _variacao(atual, anterior):
+    # Mesma regra de agregados.calcular_crescimento_percentual: 0 na primeira medição e quando o anterior é 0
+    return ((atual - anterior) / anterior.where(anterior != 0) * 100).fillna(0.0)
+
+
+def totais_diarios(df):
+    """Soma do tamanho de todas as bases por servidor e data."""
+    return df.groupby(CHAVES_DIA, as_index=False, observed=True).agg(**{
+        'Tamanho (MB)': ('Tamanho (MB)', 'sum'),
+        'Bases': ('Base', 'size'),
+    })
+
+
+def totais_mensais(diarios):
+    """Por servidor e mês: total na última medição do mês, média e pico dos totais diários."""
+    diarios = diarios.sort_values(CHAVES_DIA)
+    diarios = diarios.assign(**{'Mês': diarios['Data'].dt.to_period('M').dt.to_timestamp()})
+    return diarios.groupby(CHAVES_MES, as_index=False, observed=True).agg(**{
+        'Data': ('Data', 'last'),
+        'Tamanho (MB)': ('Tamanho (MB)', 'last'),
+        'Média (MB)': ('Tamanho (MB)', 'mean'),
+        'Pico (MB)': ('Tamanho (MB)', 'max'),
+    })
+
+
+def ultimo_por_base(df):
+    """Medição mais recente de cada base em cada servidor."""
+    colunas = CHAVES + ['Data', 'Tamanho (MB)']
+    return df[colunas].sort_values('Data', kind='stable').drop_duplicates(CHAVES, keep='last')
+
+
+def crescimento_base(df):
+    """Somas por base que dão as médias de crescimento de qualquer histórico acumulado."""
+    df = df.sort_values(CHAVES + ['Data'])
+    anterior = df.groupby(CHAVES, observed=True)['Tamanho (MB)'].shift()
+    df = df.assign(_variacao=_variacao(df['Tamanho (MB)'], anterior))
+    return df.groupby(CHAVES, as_index=False, observed=True).agg(**{
+        'Medições': ('Data', 'size'),
+        'Soma Crescimento (%)': ('_variacao', 'sum'),
+        'Primeira Data': ('Data', 'first'),
+        'Primeiro Tamanho (MB)': ('Tamanho (MB)', 'first'),
+        'Última Data': ('Data', 'last'),
+        'Último Tamanho (MB)': ('Tamanho (MB)', 'last'),
+    })
+
+
+def calcular(df):
+    diarios = totais_diarios(df)
+    return {
+        'totais_diarios': diarios,
+        'totais_mensais': totais_mensais(diarios),
+        'ultimo_por_base': ultimo_por_base(df),
+        'crescimento_base': crescimento_base(df),
+    }
+
+
+def _substituir(anteriores, novos, chaves):
+    # Linhas de `anteriores` cujas chaves não aparecem em `novos`, mais as novas
+    marcados = anteriores.merge(novos[chaves].drop_duplicates(), on=chaves, how='left', indicator=True)
+    restantes = anteriores[(marcados['_merge'] == 'left_only').to_numpy()]
+    return pd.concat([restantes, novos], ignore_index=True).sort_values(chaves, ignore_index=True)
+
+
+def _avancar_crescimento(anteriores, snapshot, df):
+    """Acumula as medições novas nas somas de cada base.
+
+    Bases cujas medições novas são todas posteriores à última consolidada só somam o que
+    chegou; bases novas ou com medições retroativas são recalculadas a partir de `df`.
+    """
+    consolidado = anteriores.set_index(CHAVES)
+    snapshot = snapshot.sort_values(CHAVES + ['Data'], ignore_index=True)
+    chaves_snapshot = pd.MultiIndex.from_frame(snapshot[CHAVES])
+    ultima = consolidado['Última Data'].reindex(chaves_snapshot).to_numpy()
+    primeira_nova = snapshot.groupby(CHAVES)['Data'].transform('min').to_numpy()
+    avanca = primeira_nova > ultima  # NaT (base nova) compara como falso
+
+    novos = snapshot[avanca]
+    ultimo = consolidado['Último Tamanho (MB)'].reindex(pd.MultiIndex.from_frame(novos[CHAVES])).to_numpy()
+    # A primeira medição nova de cada base varia em relação ao último tamanho consolidado
+    anterior = novos.groupby(CHAVES)['Tamanho (MB)'].shift().where(novos.duplicated(CHAVES), ultimo)
+    parcial = novos.assign(_variacao=_variacao(novos['Tamanho (MB)'], anterior)).groupby(CHAVES).agg(
+        n=('Data', 'size'), soma=('_variacao', 'sum'), ultima=('Data', 'last'), ultimo=('Tamanho (MB)', 'last'),
+    )
+    avancados = consolidado.loc[parcial.index].copy()
+    avancados['Medições'] += parcial['n']
+    avancados['Soma Crescimento (%)'] += parcial['soma']
+    avancados['Última Data'] = parcial['ultima']
+    avancados['Último Tamanho (MB)'] = parcial['ultimo']
+
+    retroativos = snapshot[~avanca][CHAVES].drop_duplicates()
+    recalculados = crescimento_base(df.merge(retroativos, on=CHAVES))
+    atualizados = pd.concat([avancados.reset_index(), recalculados], ignore_index=True)
+    return _substituir(anteriores, atualizados, CHAVES)
+
+
+def atualizar(fonte, snapshot, df):
+    """Atualiza os resumos com um snapshot já gravado; `df` tem as linhas dos servidores afetados."""
+    dias = snapshot[CHAVES_DIA].drop_duplicates()
+    diarios = _substituir(
+        carregar(fonte, 'totais_diarios'), totais_diarios(df.merge(dias, on=CHAVES_DIA)), CHAVES_DIA
+    )
+
+    meses = dias.assign(**{'Mês': dias['Data'].dt.to_period('M').dt.to_timestamp()})
+    diarios_meses = diarios.assign(**{'Mês': diarios['Data'].dt.to_period('M').dt.to_timestamp()})
+    afetados = diarios_meses.merge(meses[CHAVES_MES].drop_duplicates(), on=CHAVES_MES).drop(columns='Mês')
+    mensais = _substituir(carregar(fonte, 'totais_mensais'), totais_mensais(afetados), CHAVES_MES)
+
+    ultimos = ultimo_por_base(pd.concat([carregar(fonte, 'ultimo_por_base'), snapshot], ignore_index=True))
+    crescimento = _avancar_crescimento(carregar(fonte, 'crescimento_base'), snapshot, df)
+
+    gravar(fonte, {
+        'totais_diarios': diarios,
+        'totais_mensais': mensais,
+        'ultimo_por_base': ultimos,
+        'crescimento_base': crescimento,
+    })
+
+
+def gravar(fonte, resumos):
+    for nome, tabela in resumos.items():
+        armazenamento.gravar_atomico(tabela, caminho_resumo(fonte, nome))
+
+
+def recalcular(fonte, df):
+    gravar(fonte, calcular(df))
+
+
+def carregar(fonte, nome):
+    return pd.read_parquet(caminho_resumo(fonte, nome))
+
+
+def top_ultimo_mes(ultimos, servidor, top_n=10):
+    """Maiores bases do servidor no seu mês mais recente: (última data, tabela)."""
+    ultimos = ultimos[ultimos['Servidor'] == servidor]
+    if ultimos.empty:
+        return None, ultimos
+    ultima_data = ultimos['Data'].max()
+    no_mes = ultimos['Data'].dt.to_period('M') == ultima_data.to_period('M')
+    return ultima_data, ultimos[no_mes].nlargest(top_n, 'Tamanho (MB)')
+
+
+def ranking_crescimento(crescimento, bases=None):
+    """Crescimento médio (%) e (MB) por base no histórico inteiro, somando os servidores em que aparece."""
+    if bases is not None:
+        crescimento = crescimento[crescimento['Base'].isin(bases)]
+    somas = crescimento.assign(
+        _passos=crescimento['Medições'] - 1,
+        _delta=crescimento['Último Tamanho (MB)'] - crescimento['Primeiro Tamanho (MB)'],
+    ).groupby('Base').agg(medicoes=('Medições', 'sum'), soma=('Soma Crescimento (%)', 'sum'),
+                          passos=('_passos', 'sum'), delta=('_delta', 'sum'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'Crescimento Médio (%)': somas['soma'] / somas['medicoes'],
+            'Crescimento Médio (MB)': somas['delta'] / somas['passos'].where(somas['passos'] > 0),
+        }).sort_values('Crescimento Médio (%)', ascending=False).reset_index()
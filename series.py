@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Formato das partições (um arquivo por servidor): a série (Base, Data, Tamanho) guardada só com as
+# mudanças. Cada linha é um trecho de coletas seguidas em que o tamanho da base não mudou (run-length),
+# com início e fim como posições no calendário de coletas do servidor (guardado nos metadados do
+# arquivo). O tamanho vira inteiro em centésimos de MB e as colunas numéricas usam a codificação delta
+# do Parquet. Na leitura, o filtro de datas é aplicado nos trechos, antes de expandir para uma linha por coleta
+COLUNAS = ['Base', 'Data', 'Tamanho (MB)']
+# Mesma tolerância do float32 em armazenamento: diferenças menores que isso contam como "não mudou"
+RESOLUCAO_MB = 0.01
+CODIFICACAO = {'Inicio': 'DELTA_BINARY_PACKED', 'Fim': 'DELTA_BINARY_PACKED', 'Tamanho': 'DELTA_BINARY_PACKED'}
+METADADO_DATAS = b'series_datas'
+
+
+def _medicoes(df):
+    # Sem tamanho (NaN/infinito) não há o que guardar: a linha fica de fora e a base some daquela coleta
+    df = df[COLUNAS]
+    df = df[np.isfinite(df['Tamanho (MB)'].to_numpy(dtype='float64'))]
+    return df.assign(Base=df['Base'].astype(str), Data=pd.to_datetime(df['Data']))
+
+
+def _centesimos(tamanhos):
+    return np.round(np.asarray(tamanhos, dtype='float64') / RESOLUCAO_MB).astype(np.int64)
+
+
+def codificar(df):
+    """Trechos (Base, Inicio, Fim, Tamanho) e o calendário de coletas de um DataFrame com COLUNAS.
+
+    Um trecho termina quando o tamanho muda ou quando a base ficou de fora de alguma coleta,
+    então a decodificação devolve exatamente as linhas de origem (com o tamanho arredondado).
+    """
+    df = _medicoes(df).drop_duplicates(['Base', 'Data'], keep='last')
+    df = df.sort_values(['Base', 'Data'], ignore_index=True)
+    datas = pd.DatetimeIndex(np.sort(df['Data'].unique()))
+    posicao = datas.searchsorted(df['Data']).astype(np.int32)
+    tamanho = _centesimos(df['Tamanho (MB)'])
+    base = pd.Categorical(df['Base'])
+    mudou = (base.codes[1:] != base.codes[:-1]) | (tamanho[1:] != tamanho[:-1]) | (posicao[1:] != posicao[:-1] + 1)
+    inicio = np.flatnonzero(np.r_[True, mudou])[:len(df)]
+    fim = np.r_[inicio[1:], len(df)][:len(inicio)] - 1
+    trechos = pd.DataFrame({
+        'Base': np.asarray(base.categories, dtype=object)[base.codes[inicio]],
+        'Inicio': posicao[inicio], 'Fim': posicao[fim], 'Tamanho': tamanho[inicio],
+    })
+    return trechos, datas
+
+
+def decodificar(trechos, datas, desde=None, ate=None):
+    """Uma linha por coleta de cada trecho, só dentro de [desde, ate] (o recorte é feito nos trechos)."""
+    primeira = 0 if desde is None else datas.searchsorted(pd.Timestamp(desde))
+    ultima = len(datas) - 1 if ate is None else datas.searchsorted(pd.Timestamp(ate), side='right') - 1
+    trechos = trechos[(trechos['Fim'] >= primeira) & (trechos['Inicio'] <= ultima)]
+    inicio = np.maximum(trechos['Inicio'].to_numpy(dtype=np.int64), primeira)
+    n = np.minimum(trechos['Fim'].to_numpy(dtype=np.int64), ultima) - inicio + 1
+    linha = np.repeat(np.arange(len(trechos)), n)
+    posicao = inicio[linha] + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    return pd.DataFrame({
+        'Base': trechos['Base'].to_numpy(dtype=object)[linha],
+        'Data': datas[posicao],
+        'Tamanho (MB)': trechos['Tamanho'].to_numpy()[linha] * RESOLUCAO_MB,
+    })
+
+
+def gravar_trechos(caminho, trechos, datas):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    trechos = trechos.sort_values(['Base', 'Inicio'], ignore_index=True).astype(
+        {'Base': str, 'Inicio': np.int32, 'Fim': np.int32, 'Tamanho': np.int64})
+    tabela = pa.Table.from_pandas(trechos, preserve_index=False)
+    metadados = {**(tabela.schema.metadata or {}),
+                 METADADO_DATAS: json.dumps([str(d) for d in datas]).encode()}
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    pq.write_table(tabela.replace_schema_metadata(metadados), caminho + '.tmp', compression='zstd',
+                   use_dictionary=['Base'], column_encoding=CODIFICACAO)
+    os.replace(caminho + '.tmp', caminho)
+    return len(trechos)
+
+
+def gravar(caminho, df):
+    """Grava as medições de `df` (COLUNAS) como trechos; devolve o número de trechos."""
+    return gravar_trechos(caminho, *codificar(df))
+
+
+def codificado(caminho):
+    import pyarrow.parquet as pq
+    return METADADO_DATAS in (pq.read_schema(caminho).metadata or {})
+
+
+def ler_trechos(caminho, desde=None, ate=None):
+    """Trechos e calendário gravados; com `desde`/`ate`, só os trechos que tocam o intervalo são lidos."""
+    import pyarrow.parquet as pq
+    datas = pd.DatetimeIndex(json.loads(pq.read_schema(caminho).metadata[METADADO_DATAS]))
+    filtros = []
+    if desde is not None:
+        filtros.append(('Fim', '>=', int(datas.searchsorted(pd.Timestamp(desde)))))
+    if ate is not None:
+        filtros.append(('Inicio', '<=', int(datas.searchsorted(pd.Timestamp(ate), side='right')) - 1))
+    return pq.read_table(caminho, filters=filtros or None).to_pandas(), datas
+
+
+def ler(caminho, desde=None, ate=None):
+    """Série densa (uma linha por coleta) de um arquivo de trechos."""
+    return decodificar(*ler_trechos(caminho, desde, ate), desde, ate)
+
+
+def estender(caminho, df):
+    """Acrescenta medições a um arquivo de trechos; a medição mais recente de (Base, Data) prevalece.
+
+    Coletas depois da última gravada (o caso diário) só estendem o último trecho de cada base ou abrem
+    um trecho novo, sem expandir o histórico; datas que já existem ou ficam no meio do calendário
+    fazem a série ser decodificada, mesclada e codificada de novo.
+    """
+    novos = _medicoes(df).drop_duplicates(['Base', 'Data'], keep='last')
+    if not os.path.exists(caminho):
+        return gravar(caminho, novos)
+    trechos, datas = ler_trechos(caminho)
+    if novos.empty:
+        return len(trechos)
+    if len(datas) and novos['Data'].min() <= datas[-1]:
+        return gravar(caminho, pd.concat([decodificar(trechos, datas), novos], ignore_index=True))
+
+    trechos = trechos.reset_index(drop=True)
+    # Último trecho de cada base: é o único que uma coleta nova pode estender
+    ultimo = trechos.reset_index().groupby('Base', sort=False)['index'].max()
+    for data, coleta in novos.sort_values('Data').groupby('Data', sort=True):
+        posicao = len(datas)
+        datas = datas.append(pd.DatetimeIndex([data]))
+        tamanho = _centesimos(coleta['Tamanho (MB)'])
+        indice = ultimo.reindex(coleta['Base']).to_numpy()
+        existe = ~np.isnan(indice)
+        linhas = indice[existe].astype(np.int64)
+        continua = np.zeros(len(coleta), dtype=bool)
+        continua[existe] = ((trechos['Fim'].to_numpy()[linhas] == posicao - 1)
+                            & (trechos['Tamanho'].to_numpy()[linhas] == tamanho[existe]))
+        trechos.loc[indice[continua].astype(np.int64), 'Fim'] = posicao
+        novos_trechos = pd.DataFrame({
+            'Base': coleta['Base'].to_numpy()[~continua], 'Inicio': posicao, 'Fim': posicao,
+            'Tamanho': tamanho[~continua],
+        })
+        ultimo = pd.concat([
+            ultimo.drop(novos_trechos['Base'], errors='ignore'),
+            pd.Series(np.arange(len(novos_trechos)) + len(trechos), index=novos_trechos['Base']),
+        ])
+        trechos = pd.concat([trechos, novos_trechos], ignore_index=True)
+    return gravar_trechos(caminho, trechos, datas)
+
+
+def _tamanho_mb(caminhos):
+    return sum(os.path.getsize(c) for c in caminhos if os.path.exists(c)) / 1024 / 1024
+
+
+def comparar(fonte, com_excel=False):
+    """Espaço em disco e tempo de leitura: Excel de origem e partições por trechos."""
+    import pyarrow.parquet as pq
+
+    import armazenamento
+    particoes = [armazenamento.caminho_particao(fonte, s) for s in armazenamento.listar_servidores(fonte)]
+    inicio = time.perf_counter()
+    df = armazenamento.carregar(fonte)
+    tempo_particoes = time.perf_counter() - inicio
+    linha = {
+        'Fonte': fonte, 'Linhas': len(df),
+        'Trechos': sum(pq.read_metadata(c).num_rows for c in particoes),
+        'Excel (MB)': _tamanho_mb([armazenamento.caminho_excel(fonte)]),
+        'Partições (MB)': _tamanho_mb(particoes),
+        'Leitura partições (s)': tempo_particoes,
+    }
+    if com_excel and os.path.exists(armazenamento.caminho_excel(fonte)):
+        inicio = time.perf_counter()
+        pd.read_excel(armazenamento.caminho_excel(fonte), sheet_name=armazenamento.ABA_CRESCIMENTO)
+        linha['Leitura Excel (s)'] = time.perf_counter() - inicio
+    return linha
+
+
+if __name__ == '__main__':
+    import armazenamento
+    parser = argparse.ArgumentParser(description='Compara o Excel de origem com as partições gravadas por trechos.')
+    parser.add_argument('--fontes', nargs='*', default=sorted(armazenamento.FONTES), choices=sorted(armazenamento.FONTES))
+    parser.add_argument('--com-excel', action='store_true', help='Também mede a leitura do Excel (lenta)')
+    args = parser.parse_args()
+
+    print(pd.DataFrame([comparar(fonte, args.com_excel) for fonte in args.fontes]).round(3).to_string(index=False))
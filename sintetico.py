@@ -0,0 +1,61 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import agregados
+import armazenamento
+
+# Frota sintética no formato da aba 'Crescimento (%)', para medir memória e carga em escala
+BASES_PADRAO = 10_000
+DATAS_PADRAO = 65
+SERVIDORES_PADRAO = 4
+PASSO_DIAS = 7
+PREFIXOS = ('x2', 'x1', 'midas2', 'turiion')
+
+
+def gerar(n_bases=BASES_PADRAO, n_datas=DATAS_PADRAO, n_servidores=SERVIDORES_PADRAO,
+          inicio='2024-01-01', passo_dias=PASSO_DIAS, semente=0):
+    """Tamanhos com tendência própria por base, ruído e saltos ocasionais (reprodutível pela semente)."""
+    rng = np.random.default_rng(semente)
+    bases = np.array([f'{PREFIXOS[i % len(PREFIXOS)]}sint{i:05d}' for i in range(n_bases)])
+    servidores = np.array([f's{i + 1}' for i in range(n_servidores)])[rng.integers(0, n_servidores, n_bases)]
+    datas = pd.date_range(inicio, periods=n_datas, freq=f'{passo_dias}D')
+
+    # Tamanho inicial com cauda longa (poucas bases grandes), como nos dados reais
+    inicial = rng.lognormal(mean=3, sigma=1.8, size=n_bases)
+    variacao = rng.normal(rng.normal(0.004, 0.006, size=(n_bases, 1)), 0.002, size=(n_bases, n_datas))
+    saltos = rng.random((n_bases, n_datas)) < 0.005
+    variacao[saltos] += rng.choice([-0.3, 0.5], size=saltos.sum())
+    variacao[:, 0] = 0.0
+    tamanho = inicial[:, None] * np.cumprod(np.clip(1 + variacao, 0.05, None), axis=1)
+
+    df = pd.DataFrame({
+        'Servidor': np.repeat(servidores, n_datas),
+        'Base': np.repeat(bases, n_datas),
+        'Data': np.tile(datas.to_numpy(), n_bases),
+        'Tamanho (MB)': tamanho.ravel(),
+    })
+    df['Diferença (MB)'] = df.groupby('Base')['Tamanho (MB)'].diff()
+    df = agregados.calcular_crescimento_percentual(df)
+    return df[['Servidor', 'Base', 'Data', 'Tamanho (MB)', 'Crescimento (%)', 'Diferença (MB)']]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera partições com uma frota sintética.')
+    parser.add_argument('--bases', type=int, default=BASES_PADRAO)
+    parser.add_argument('--datas', type=int, default=DATAS_PADRAO)
+    parser.add_argument('--servidores', type=int, default=SERVIDORES_PADRAO)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--fonte', default='saida', choices=sorted(armazenamento.FONTES))
+    parser.add_argument('--pasta', default='data_sintetico',
+                        help='Pasta de dados (use depois com DASHBOARD_PASTA_DADOS)')
+    args = parser.parse_args()
+
+    armazenamento.PASTA_DADOS = args.pasta
+    armazenamento.PASTA_PARTICOES = os.path.join(args.pasta, 'particionado')
+    df = gerar(args.bases, args.datas, args.servidores, semente=args.semente)
+    servidores = armazenamento.particionar(df, args.fonte)
+    print(f'✅ {len(df)} medições de {args.bases} bases em {len(servidores)} servidor(es): '
+          f'{armazenamento.pasta_fonte(args.fonte)}')
@@ -0,0 +1,225 @@
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+import traceback
+
+import armazenamento
+
+# Fila local de tarefas demoradas: os dashboards só enfileiram e acompanham o status;
+# processos separados executam. O SQLite guarda fila, progresso e erros
+ARQUIVO_FILA = os.environ.get('DASHBOARD_FILA', os.path.join(armazenamento.PASTA_PARTICOES, '_tarefas.sqlite'))
+INTERVALO_SEGUNDOS = 1.0
+
+# Tipo de tarefa -> (módulo, função); o módulo só é importado no processo que executa
+TIPOS = {
+    'previsao': ('previsao', 'selecionar_modelos'),
+    'tendencias': ('tendencias', 'classificar'),
+}
+
+PENDENTE, EXECUTANDO, CONCLUIDA, ERRO = 'pendente', 'executando', 'concluida', 'erro'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tarefas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    parametros TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    progresso REAL NOT NULL DEFAULT 0,
+    mensagem TEXT,
+    pid INTEGER,
+    criada_em REAL NOT NULL,
+    iniciada_em REAL,
+    concluida_em REAL
+);
+CREATE INDEX IF NOT EXISTS tarefas_chave ON tarefas (chave, id);
+CREATE INDEX IF NOT EXISTS tarefas_estado ON tarefas (estado, id);
+"""
+
+
+def _conectar():
+    os.makedirs(os.path.dirname(ARQUIVO_FILA) or '.', exist_ok=True)
+    # Autocommit; as seções críticas usam BEGIN IMMEDIATE explicitamente
+    conexao = sqlite3.connect(ARQUIVO_FILA, timeout=30, isolation_level=None)
+    conexao.row_factory = sqlite3.Row
+    conexao.execute('PRAGMA journal_mode=WAL')
+    conexao.executescript(ESQUEMA)
+    return conexao
+
+
+def submeter(tipo, parametros, chave=None):
+    """Enfileira uma tarefa; se já houver uma pendente ou em execução com a mesma chave, devolve o id dela."""
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+    chave = chave or f'{tipo}:{json.dumps(parametros, sort_keys=True)}'
+    conexao = _conectar()
+    try:
+        conexao.execute('BEGIN IMMEDIATE')
+        existente = conexao.execute(
+            'SELECT id FROM tarefas WHERE chave = ? AND estado IN (?, ?) ORDER BY id DESC LIMIT 1',
+            (chave, PENDENTE, EXECUTANDO),
+        ).fetchone()
+        if existente:
+            conexao.execute('COMMIT')
+            return existente['id']
+        cursor = conexao.execute(
+            'INSERT INTO tarefas (tipo, chave, parametros, estado, criada_em) VALUES (?, ?, ?, ?, ?)',
+            (tipo, chave, json.dumps(parametros), PENDENTE, time.time()),
+        )
+        conexao.execute('COMMIT')
+        return cursor.lastrowid
+    finally:
+        conexao.close()
+
+
+def consultar(id_tarefa):
+    conexao = _conectar()
+    try:
+        linha = conexao.execute('SELECT * FROM tarefas WHERE id = ?', (id_tarefa,)).fetchone()
+        return dict(linha) if linha else None
+    finally:
+        conexao.close()
+
+
+def ultima(chave):
+    """Tarefa mais recente com a chave informada (ou None)."""
+    conexao = _conectar()
+    try:
+        linha = conexao.execute('SELECT * FROM tarefas WHERE chave = ? ORDER BY id DESC LIMIT 1', (chave,)).fetchone()
+        return dict(linha) if linha else None
+    finally:
+        conexao.close()
+
+
+def acompanhar(tipo, fonte, rotulo, container):
+    """Mantém a tarefa `tipo` da fonte na fila e mostra seu estado no `container` do Streamlit (st ou st.sidebar).
+
+    Depois de uma falha não reenfileira sozinha: mostra o erro e um botão para tentar de novo.
+    Devolve a tarefa acompanhada.
+    """
+    chave = f'{tipo}:{fonte}'
+    tarefa = ultima(chave)
+    if tarefa is not None and tarefa['estado'] == ERRO:
+        container.error(f"❌ A última atualização de {rotulo} falhou.")
+        container.expander("Detalhes do erro").code(tarefa['mensagem'])
+        if container.button("Tentar novamente", key=f'tentar:{chave}'):
+            tarefa = consultar(submeter(tipo, {'fonte': fonte}, chave))
+    else:
+        tarefa = consultar(submeter(tipo, {'fonte': fonte}, chave))
+    if tarefa['estado'] in (PENDENTE, EXECUTANDO):
+        container.progress(tarefa['progresso'], text=f"⏳ Atualizando {rotulo} em segundo plano: {tarefa['mensagem'] or 'na fila'}")
+        container.button("🔄 Atualizar status", key=f'status:{chave}')
+    return tarefa
+
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def recuperar():
+    """Devolve à fila as tarefas 'executando' cujo processo morreu."""
+    conexao = _conectar()
+    try:
+        conexao.execute('BEGIN IMMEDIATE')
+        orfas = [
+            linha['id'] for linha in conexao.execute('SELECT id, pid FROM tarefas WHERE estado = ?', (EXECUTANDO,))
+            if not linha['pid'] or not _processo_vivo(linha['pid'])
+        ]
+        conexao.executemany(
+            'UPDATE tarefas SET estado = ?, pid = NULL, progresso = 0 WHERE id = ?', [(PENDENTE, i) for i in orfas]
+        )
+        conexao.execute('COMMIT')
+        return orfas
+    finally:
+        conexao.close()
+
+
+def _reservar(conexao):
+    # Pega a próxima pendente de forma atômica: dois workers nunca executam a mesma tarefa
+    conexao.execute('BEGIN IMMEDIATE')
+    linha = conexao.execute(
+        'SELECT * FROM tarefas WHERE estado = ? ORDER BY id LIMIT 1', (PENDENTE,)
+    ).fetchone()
+    if linha:
+        conexao.execute(
+            'UPDATE tarefas SET estado = ?, pid = ?, iniciada_em = ? WHERE id = ?',
+            (EXECUTANDO, os.getpid(), time.time(), linha['id']),
+        )
+    conexao.execute('COMMIT')
+    return dict(linha) if linha else None
+
+
+def _executar(conexao, tarefa):
+    def progresso(feitas, total):
+        conexao.execute(
+            'UPDATE tarefas SET progresso = ?, mensagem = ? WHERE id = ?',
+            (feitas / total if total else 1.0, f'{feitas}/{total}', tarefa['id']),
+        )
+
+    modulo, funcao = TIPOS[tarefa['tipo']]
+    try:
+        getattr(importlib.import_module(modulo), funcao)(**json.loads(tarefa['parametros']), progresso=progresso)
+        estado, mensagem = CONCLUIDA, None
+    except Exception:
+        estado, mensagem = ERRO, traceback.format_exc(limit=5)
+    conexao.execute(
+        'UPDATE tarefas SET estado = ?, progresso = CASE WHEN ? THEN 1 ELSE progresso END, '
+        'mensagem = COALESCE(?, mensagem), concluida_em = ? WHERE id = ?',
+        (estado, estado == CONCLUIDA, mensagem, time.time(), tarefa['id']),
+    )
+
+
+def trabalhar(parar_quando_vazia=False, vigiar_pid=None, intervalo=INTERVALO_SEGUNDOS):
+    """Laço do worker: executa as tarefas pendentes em ordem de chegada.
+
+    Com `vigiar_pid`, sai quando esse processo (ex.: o servidor do Streamlit) terminar.
+    """
+    recuperar()
+    conexao = _conectar()
+    try:
+        while True:
+            tarefa = _reservar(conexao)
+            if tarefa:
+                _executar(conexao, tarefa)
+                continue
+            if parar_quando_vazia or (vigiar_pid and not _processo_vivo(vigiar_pid)):
+                return
+            time.sleep(intervalo)
+    finally:
+        conexao.close()
+
+
+def iniciar_workers(quantidade=1):
+    """Sobe workers em processos separados, que terminam junto com o processo que os criou."""
+    comando = [sys.executable, os.path.abspath(__file__), '--workers', str(quantidade), '--vigiar-pai']
+    return subprocess.Popen(comando, cwd=os.getcwd(), env=os.environ.copy())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Executa as tarefas enfileiradas pelos dashboards.')
+    parser.add_argument('--workers', type=int, default=1, help='Tarefas executadas ao mesmo tempo')
+    parser.add_argument('--uma-vez', action='store_true', help='Sai quando a fila esvaziar')
+    parser.add_argument('--vigiar-pai', action='store_true', help='Sai quando o processo pai terminar')
+    args = parser.parse_args()
+
+    vigiar_pid = os.getppid() if args.vigiar_pai else None
+    processos = [
+        multiprocessing.Process(target=trabalhar, args=(args.uma_vez, vigiar_pid))
+        for _ in range(max(args.workers, 1))
+    ]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join()
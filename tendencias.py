@@ -0,0 +1,180 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import ingestao
+
+# Decomposição tendência/sazonalidade de cada base da frota e classificação do comportamento do
+# crescimento, calculadas em lote fora do dashboard (como as previsões) e gravadas ao lado das
+# partições: o dashboard só filtra a tabela pronta. A decomposição é a clássica (média móvel centrada
+# + média por fase) sobre a série reamostrada numa grade regular com a cadência típica da base
+RITMO_CONSTANTE, ACELERANDO, CICLICA, PLANA, POUCOS_PONTOS = 'Ritmo constante', 'Acelerando', 'Cíclica', 'Plana', 'Poucos pontos'
+COMPORTAMENTOS = [RITMO_CONSTANTE, ACELERANDO, CICLICA, PLANA, POUCOS_PONTOS]
+CHAVES = ['Servidor', 'Base']
+COLUNAS = CHAVES + ['Pontos', 'Última Data', 'Período (dias)', 'Força Tendência', 'Força Sazonal',
+                    'Amplitude Sazonal (%)', 'Crescimento (%)', 'Inclinação (MB/dia)', 'Aceleração', 'Comportamento']
+MINIMO_PONTOS = 8
+# Ciclos procurados (mensal e trimestral); fica o de maior força sazonal
+PERIODOS_DIAS = (28, 91)
+# Cíclica: sazonalidade forte (força de Hyndman) e com amplitude relevante frente ao tamanho médio
+LIMIAR_SAZONAL = 0.5
+AMPLITUDE_MINIMA = 0.02
+# Plana: a tendência variou menos que isso (fração do tamanho médio) no histórico inteiro
+LIMIAR_PLANO = 0.05
+# Acelerando: inclinação da segunda metade acima da primeira por mais que essa fração da inclinação geral
+LIMIAR_ACELERACAO = 0.5
+ESCALA_MINIMA_MB = 1e-6
+BASES_POR_TAREFA = 500
+
+
+def caminho_tendencias(fonte):
+    return os.path.join(armazenamento.pasta_fonte(fonte), '_tendencias.parquet')
+
+
+def _grade(datas, y):
+    dias = (datas - datas[0]) / np.timedelta64(1, 'D')
+    passo = max(float(np.median(np.diff(dias))), 1.0)
+    t = np.arange(0, dias[-1] + passo / 2, passo)
+    return passo, t, np.interp(t, dias, y)
+
+
+def decompor(y, periodo):
+    """Tendência (média móvel centrada 2 x m para período par), sazonal por fase e resíduo, no miolo da série."""
+    pesos = np.r_[0.5, np.ones(periodo - 1), 0.5] / periodo if periodo % 2 == 0 else np.ones(periodo) / periodo
+    borda = (len(pesos) - 1) // 2
+    tendencia = np.convolve(y, pesos, mode='valid')
+    sem_tendencia = y[borda:len(y) - borda] - tendencia
+    fase = (np.arange(len(sem_tendencia)) + borda) % periodo
+    por_fase = np.bincount(fase, sem_tendencia, periodo) / np.maximum(np.bincount(fase, minlength=periodo), 1)
+    sazonal = (por_fase - por_fase.mean())[fase]
+    return tendencia, sazonal, sem_tendencia - sazonal
+
+
+def _forca(componente, residuo):
+    total = np.var(componente + residuo)
+    return max(0.0, 1 - np.var(residuo) / total) if total > 0 else 0.0
+
+
+def _inclinacao(t, y):
+    return np.polyfit(t, y, 1)[0] if len(t) > 1 else 0.0
+
+
+def analisar_serie(datas, y):
+    """Forças de tendência/sazonalidade, crescimento, aceleração e comportamento de uma base."""
+    linha = {**dict.fromkeys(COLUNAS[2:], np.nan), 'Pontos': len(y), 'Última Data': datas[-1],
+             'Comportamento': POUCOS_PONTOS}
+    if len(y) < MINIMO_PONTOS:
+        return linha
+    passo, t, yg = _grade(datas, y)
+    escala = max(abs(float(np.mean(yg))), ESCALA_MINIMA_MB)
+
+    melhor = None
+    for dias in PERIODOS_DIAS:
+        periodo = int(round(dias / passo))
+        if periodo < 2 or len(yg) < 2 * periodo + 1:
+            continue
+        tendencia, sazonal, residuo = decompor(yg, periodo)
+        forca = _forca(sazonal, residuo)
+        if melhor is None or forca > melhor[1]:
+            melhor = (periodo, forca, tendencia, sazonal, residuo)
+    if melhor is None:
+        # Curta demais para qualquer ciclo: a tendência é a reta ajustada
+        borda, tendencia = 0, np.polyval(np.polyfit(t, yg, 1), t)
+    else:
+        periodo, forca_sazonal, tendencia, sazonal, residuo = melhor
+        borda = (len(yg) - len(tendencia)) // 2
+        linha.update({
+            'Período (dias)': periodo * passo,
+            'Força Tendência': _forca(tendencia, residuo),
+            'Força Sazonal': forca_sazonal,
+            'Amplitude Sazonal (%)': (sazonal.max() - sazonal.min()) / escala * 100,
+        })
+
+    t_tendencia = t[borda:borda + len(tendencia)]
+    metade = len(tendencia) // 2
+    geral = _inclinacao(t_tendencia, tendencia)
+    primeira, segunda = _inclinacao(t_tendencia[:metade], tendencia[:metade]), _inclinacao(t_tendencia[metade:], tendencia[metade:])
+    variacao = (tendencia[-1] - tendencia[0]) / escala
+    aceleracao = (segunda - primeira) / abs(geral) if geral else 0.0
+
+    if linha['Força Sazonal'] >= LIMIAR_SAZONAL and linha['Amplitude Sazonal (%)'] >= AMPLITUDE_MINIMA * 100:
+        comportamento = CICLICA
+    elif abs(variacao) < LIMIAR_PLANO:
+        comportamento = PLANA
+    elif segunda > 0 and aceleracao > LIMIAR_ACELERACAO:
+        comportamento = ACELERANDO
+    else:
+        comportamento = RITMO_CONSTANTE
+    linha.update({
+        'Crescimento (%)': variacao * 100, 'Inclinação (MB/dia)': _inclinacao(t, yg),
+        'Aceleração': aceleracao, 'Comportamento': comportamento,
+    })
+    return linha
+
+
+def _analisar_lote(series):
+    return [{'Servidor': servidor, 'Base': base, **analisar_serie(datas, y)} for servidor, base, datas, y in series]
+
+
+def classificar(fonte, servidores=None, max_workers=None, progresso=None):
+    """Analisa todas as bases em paralelo (processos) e grava a tabela de comportamentos.
+
+    `progresso(feitas, total)` é chamado a cada lote de bases concluído.
+    """
+    df = armazenamento.carregar(fonte, servidores, colunas=ingestao.COLUNAS_SNAPSHOT)
+    df = df.dropna(subset=['Tamanho (MB)']).sort_values(CHAVES + ['Data'])
+    series = [
+        (servidor, base, grupo['Data'].to_numpy(), grupo['Tamanho (MB)'].to_numpy(dtype=float))
+        for (servidor, base), grupo in df.groupby(CHAVES, sort=False)
+    ]
+    lotes = [series[i:i + BASES_POR_TAREFA] for i in range(0, len(series), BASES_POR_TAREFA)]
+
+    linhas, feitas = [], 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(_analisar_lote, lote): len(lote) for lote in lotes}
+        for futuro in as_completed(futuros):
+            linhas += futuro.result()
+            feitas += futuros[futuro]
+            if progresso:
+                progresso(feitas, len(series))
+
+    tabela = pd.DataFrame(linhas, columns=COLUNAS).sort_values(CHAVES, ignore_index=True)
+    tabela['Calculado em'] = pd.Timestamp.now().floor('s')
+    armazenamento.gravar_atomico(tabela, caminho_tendencias(fonte))
+    return tabela
+
+
+def desatualizada(fonte):
+    # Sem tabela ou com partições gravadas depois da última classificação
+    caminho = caminho_tendencias(fonte)
+    if not os.path.exists(caminho):
+        return True
+    particoes = [armazenamento.caminho_particao(fonte, s) for s in armazenamento.listar_servidores(fonte)]
+    return max((os.path.getmtime(p) for p in particoes), default=0) > os.path.getmtime(caminho)
+
+
+def carregar(fonte):
+    return pd.read_parquet(caminho_tendencias(fonte)) if os.path.exists(caminho_tendencias(fonte)) else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Decompõe a série de cada base e classifica o comportamento do crescimento.')
+    parser.add_argument('--fonte', default='saida', choices=sorted(armazenamento.FONTES))
+    parser.add_argument('--servidores', nargs='*', help='Padrão: todos os servidores descobertos')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    ingestao.garantir(args.fonte)
+    tabela = classificar(
+        args.fonte, args.servidores, args.workers,
+        progresso=lambda feitas, total: print(f'⏳ {feitas}/{total} bases', end='\r')
+    )
+    print()
+    print(tabela['Comportamento'].value_counts().to_string())
+    print(f'✅ {len(tabela)} bases classificadas em {time.perf_counter() - inicio:.1f}s')
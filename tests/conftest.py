@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def pasta_dados(tmp_path, monkeypatch):
+    """Pasta de dados vazia no lugar de data_raw (como DASHBOARD_PASTA_DADOS)."""
+    import armazenamento
+    monkeypatch.setattr(armazenamento, 'PASTA_DADOS', str(tmp_path))
+    monkeypatch.setattr(armazenamento, 'PASTA_PARTICOES', str(tmp_path / 'particionado'))
+    return tmp_path
@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+import api
+
+
+def _tabela():
+    return pd.DataFrame({'Base': [f'b{i}' for i in range(10)], 'Tamanho (MB)': range(10)})
+
+
+@pytest.mark.parametrize('limite', ['0', '-3'])
+def test_limite_menor_que_um_e_rejeitado(limite):
+    with pytest.raises(api.ErroConsulta):
+        api.consultar(_tabela(), {'limite': limite})
+
+
+def test_paginacao():
+    pagina, total, limite, deslocamento = api.consultar(_tabela(), {'limite': '4', 'deslocamento': '8'})
+    assert (total, limite, deslocamento) == (10, 4, 8)
+    assert pagina['Base'].tolist() == ['b8', 'b9']
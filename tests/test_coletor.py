@@ -0,0 +1,43 @@
+import pytest
+
+import coletor
+
+pgserver = pytest.importorskip('pgserver')
+pytest.importorskip('psycopg2')
+
+BANCOS = 45
+
+
+@pytest.fixture(scope='module')
+def postgres(tmp_path_factory):
+    # Postgres local de verdade (pgserver), com mais bancos do que cabem nas conexões de um pool
+    servidor = pgserver.get_server(tmp_path_factory.mktemp('pg'), cleanup_mode='stop')
+    for i in range(BANCOS):
+        servidor.psql(f'CREATE DATABASE banco_{i:02d};')
+    yield servidor
+    servidor.cleanup()
+
+
+def test_coletar_nao_passa_das_conexoes_do_servidor(postgres, monkeypatch):
+    # Consultas lentas (pg_sleep) e um banco por consulta: as consultas de cada servidor se sobrepõem
+    # e todas disputam as `conexoes` do seu pool; getconn acima do máximo levantaria PoolError
+    monkeypatch.setattr(coletor, 'CONSULTA_TAMANHOS', (
+        'SELECT datname, pg_database_size(datname) FROM pg_database, pg_sleep(0.05) WHERE datname = ANY(%s)'
+    ))
+    uri = postgres.get_uri('postgres')
+    snapshot, falhas = coletor.coletar({'s1': uri, 's2': uri}, conexoes=2, bancos_por_consulta=1, data='2024-02-29')
+
+    assert falhas == {}
+    for servidor in ('s1', 's2'):
+        bases = set(snapshot.loc[snapshot['Servidor'] == servidor, 'Base'])
+        assert {f'banco_{i:02d}' for i in range(BANCOS)} <= bases
+    assert (snapshot['Tamanho (MB)'] > 0).all()
+    assert (snapshot['Data'] == '2024-02-29').all()
+
+
+def test_coletar_isola_servidor_inacessivel(postgres):
+    servidores = {'s1': postgres.get_uri('postgres'), 's9': 'postgresql://nada@127.0.0.1:1/postgres'}
+    snapshot, falhas = coletor.coletar(servidores)
+
+    assert set(falhas) == {'s9'}
+    assert set(snapshot['Servidor']) == {'s1'}
@@ -0,0 +1,84 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import elo
+import resultados
+
+LIGA = 'MLS'
+TIMES = ['A', 'B', 'C', 'D']
+
+
+def _temporada(temporada, voltas=3, semente=0):
+    # Cada par se enfrenta várias vezes com o mesmo mandante, como na MLS
+    rng = np.random.default_rng(semente + temporada)
+    linhas, rodada = [], 0
+    for _ in range(voltas):
+        for casa, fora in itertools.permutations(TIMES, 2):
+            rodada += 1
+            dia = pd.Timestamp(f'{temporada}-03-01') + pd.Timedelta(days=7 * rodada)
+            linhas.append({'liga': LIGA, 'temporada': temporada, 'rodada': rodada, 'data': dia.strftime('%d/%m/%y'),
+                           'hora': None, 'casa': casa, 'fora': fora,
+                           'gols_casa': float(rng.integers(0, 4)), 'gols_fora': float(rng.integers(0, 4)),
+                           'buscado_em': None})
+    return pd.DataFrame(linhas, columns=resultados.COLUNAS)
+
+
+@pytest.fixture
+def guardados(tmp_path, monkeypatch):
+    monkeypatch.setattr(elo, 'PASTA_ELO', str(tmp_path / 'elo'))
+    armazenados = {'jogos': pd.DataFrame(columns=resultados.COLUNAS)}
+    monkeypatch.setattr(resultados, 'carregar', lambda ligas=None, temporadas=None: armazenados['jogos'])
+    return armazenados
+
+
+def _ratings():
+    return pd.Series(elo.carregar_estado(LIGA)['ratings']).sort_index()
+
+
+def test_confronto_repetido_na_temporada_conta_todos_os_jogos(guardados):
+    jogos = _temporada(2024)
+    assert elo.atualizar(LIGA, jogos) == len(jogos)
+    assert elo.atualizar(LIGA, jogos) == 0
+
+
+def test_incremental_igual_ao_processamento_completo(guardados):
+    jogos = _temporada(2024)
+    for rodada in range(1, jogos['rodada'].max() + 1):
+        # A cada chamada a temporada inteira, com placar só até a rodada atual
+        parcial = jogos.copy()
+        parcial.loc[parcial['rodada'] > rodada, ['gols_casa', 'gols_fora']] = np.nan
+        assert elo.atualizar(LIGA, parcial) == 1
+    incremental = _ratings()
+
+    elo.reconstruir(LIGA)
+    elo.atualizar(LIGA, jogos)
+    pd.testing.assert_series_equal(incremental, _ratings())
+
+
+def test_jogo_adiado_entra_quando_tem_placar(guardados):
+    jogos = _temporada(2024)
+    adiado = jogos['rodada'] == 3
+    parcial = jogos.copy()
+    parcial.loc[adiado, ['gols_casa', 'gols_fora']] = np.nan
+    assert elo.atualizar(LIGA, parcial) == len(jogos) - 1
+    assert elo.carregar_estado(LIGA)['pendentes'] == ['2024|3|A|D']
+
+    assert elo.atualizar(LIGA, jogos) == 1
+    assert elo.carregar_estado(LIGA)['pendentes'] == []
+    assert elo.atualizar(LIGA, jogos) == 0
+
+
+def test_temporada_anterior_guardada_depois_reprocessa_a_liga(guardados):
+    guardados['jogos'] = _temporada(2024)
+    elo.atualizar(LIGA)
+
+    guardados['jogos'] = pd.concat([_temporada(2023), _temporada(2024)], ignore_index=True)
+    assert elo.atualizar(LIGA) == len(guardados['jogos'])
+    backfill = _ratings()
+
+    elo.reconstruir(LIGA)
+    pd.testing.assert_series_equal(backfill, _ratings())
+    assert sorted(elo.carregar_estado(LIGA)['ultima_rodada']) == ['2023', '2024']
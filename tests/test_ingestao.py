@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import ingestao
+
+FONTE = 'saida'
+
+
+def _gravar_excel(pasta, linhas):
+    df = pd.DataFrame(linhas, columns=['Servidor', 'Base', 'Data', 'Tamanho (MB)'])
+    with pd.ExcelWriter(pasta / armazenamento.FONTES[FONTE]['excel']) as escritor:
+        df.to_excel(escritor, sheet_name=armazenamento.ABA_CRESCIMENTO, index=False)
+
+
+def _historico():
+    datas = pd.date_range('2024-01-07', periods=12, freq='7D')
+    return [('s5', base, data.strftime('%Y-%m-%d'), 100.0 + i * k)
+            for k, base in enumerate(['a', 'b'], start=1) for i, data in enumerate(datas)]
+
+
+def test_reconstruir_mantem_snapshots_ingeridos(pasta_dados):
+    _gravar_excel(pasta_dados, _historico())
+    ingestao.garantir(FONTE)
+    snapshot = pd.DataFrame({
+        'Servidor': ['s5', 's5', 's7'], 'Base': ['a', 'b', 'c'],
+        'Data': pd.Timestamp('2024-04-07'), 'Tamanho (MB)': [150.0, 160.0, 10.0],
+    })
+    ingestao.ingerir_snapshot(FONTE, snapshot)
+
+    # Excel mais novo que as partições e reconstrução explícita: nenhuma das duas apaga o snapshot
+    for servidor in armazenamento.listar_servidores(FONTE):
+        caminho = armazenamento.caminho_particao(FONTE, servidor)
+        os.utime(caminho, (os.path.getmtime(caminho) - 60,) * 2)
+    assert armazenamento.particoes_desatualizadas(FONTE)
+    ingestao.garantir(FONTE)
+    ingestao.reconstruir(FONTE)
+
+    df = armazenamento.carregar(FONTE, colunas=ingestao.COLUNAS_SNAPSHOT)
+    ingerido = df[df['Data'] == pd.Timestamp('2024-04-07')].sort_values('Base')
+    assert ingerido['Base'].tolist() == ['a', 'b', 'c']
+    assert np.allclose(ingerido['Tamanho (MB)'], [150.0, 160.0, 10.0])
+    assert armazenamento.listar_servidores(FONTE) == ['s5', 's7']
+    assert len(df) == len(_historico()) + 3
+    assert not armazenamento.particoes_desatualizadas(FONTE)
+
+
+def test_excel_corrige_linhas_ja_gravadas(pasta_dados):
+    _gravar_excel(pasta_dados, _historico())
+    ingestao.garantir(FONTE)
+    corrigido = [(s, b, d, 999.0 if (b, d) == ('a', '2024-01-07') else t) for s, b, d, t in _historico()]
+    _gravar_excel(pasta_dados, corrigido)
+    ingestao.reconstruir(FONTE)
+
+    df = armazenamento.carregar(FONTE, colunas=ingestao.COLUNAS_SNAPSHOT)
+    assert len(df) == len(_historico())
+    linha = df[(df['Base'] == 'a') & (df['Data'] == pd.Timestamp('2024-01-07'))]
+    assert linha['Tamanho (MB)'].tolist() == [999.0]
@@ -0,0 +1,31 @@
+from datetime import date
+
+import pandas as pd
+
+import listagens
+
+PREFIXO = '-rw-r--r-- 1 dump dump 1048576 '
+
+
+def _linha(data, numero):
+    return f'{PREFIXO}{data} s01_lwdump_x2abc_{numero}.7z.001\n'
+
+
+def test_mes_desconhecido_e_dia_inexistente_descartam_so_a_linha():
+    linhas = [
+        _linha('Okt 12 10:00', 1),   # mês de outro idioma
+        _linha('Feb 31 10:00', 2),   # dia que não existe
+        _linha('Feb 29  2023', 3),   # 29/02 fora de ano bissexto
+        _linha('Feb 29  2024', 4),
+        _linha('out  5 10:00', 5),
+    ]
+    registros = listagens.interpretar_linhas(linhas, date(2025, 11, 1))
+
+    assert registros['Arquivo'].tolist() == ['s01_lwdump_x2abc_4.7z.001', 's01_lwdump_x2abc_5.7z.001']
+    assert registros['Data'].tolist() == [pd.Timestamp('2024-02-29'), pd.Timestamp('2025-10-05')]
+
+
+def test_bloco_so_com_linhas_invalidas_fica_vazio():
+    registros = listagens.interpretar_linhas([_linha('Okt 12 10:00', 1)], date(2025, 11, 1))
+    assert registros.empty
+    assert list(registros.columns) == listagens.CHAVES_ARQUIVO + ['Base', 'Tipo']
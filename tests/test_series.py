@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+import series
+
+
+def _historico(datas=10, bases=30, semente=0):
+    rng = np.random.default_rng(semente)
+    linhas = []
+    for i, data in enumerate(pd.date_range('2024-01-01', periods=datas, freq='D')):
+        for b in range(bases):
+            # Metade das bases fica parada por vários dias; algumas faltam em coletas avulsas
+            if rng.random() < 0.05:
+                continue
+            tamanho = 100.0 + b + (i // 3 if b % 2 else i * rng.random())
+            linhas.append((f'base{b:02d}', data, round(tamanho, 2)))
+    return pd.DataFrame(linhas, columns=series.COLUNAS)
+
+
+def _ordenado(df):
+    return df.sort_values(['Base', 'Data'], ignore_index=True)
+
+
+def test_ida_e_volta_e_recorte_de_datas(tmp_path):
+    df = _historico()
+    caminho = str(tmp_path / 'Servidor=s1.parquet')
+    trechos = series.gravar(caminho, df)
+
+    assert trechos < len(df)
+    pdt.assert_frame_equal(_ordenado(series.ler(caminho)), _ordenado(df), check_exact=False, atol=0.005)
+    recorte = series.ler(caminho, desde='2024-01-04', ate='2024-01-06')
+    esperado = df[df['Data'].between('2024-01-04', '2024-01-06')]
+    pdt.assert_frame_equal(_ordenado(recorte), _ordenado(esperado), check_exact=False, atol=0.005)
+
+
+def test_tamanho_sem_valor_nao_e_gravado(tmp_path):
+    df = _historico(datas=3, bases=2)
+    df.loc[1, 'Tamanho (MB)'] = np.nan
+    df.loc[2, 'Tamanho (MB)'] = np.inf
+    caminho = str(tmp_path / 'Servidor=s1.parquet')
+    series.gravar(caminho, df)
+
+    lido = series.ler(caminho)
+    assert len(lido) == len(df) - 2
+    assert np.isfinite(lido['Tamanho (MB)']).all()
+    assert lido['Tamanho (MB)'].abs().max() < 1e6
+
+
+def test_estender_igual_a_gravar_tudo(tmp_path):
+    df = _historico(datas=12)
+    datas = sorted(df['Data'].unique())
+    incremental = str(tmp_path / 'incremental.parquet')
+    completo = str(tmp_path / 'completo.parquet')
+
+    series.gravar(incremental, df[df['Data'] < datas[6]])
+    # Coletas novas uma a uma, duas de uma vez, uma base nova e uma correção de data já gravada
+    for data in datas[6:9]:
+        series.estender(incremental, df[df['Data'] == data])
+    series.estender(incremental, df[df['Data'].isin(datas[9:11])])
+    nova = pd.DataFrame({'Base': ['base99'], 'Data': [datas[11]], 'Tamanho (MB)': [5.0]})
+    series.estender(incremental, pd.concat([df[df['Data'] == datas[11]], nova]))
+    correcao = pd.DataFrame({'Base': ['base00'], 'Data': [datas[2]], 'Tamanho (MB)': [1.0]})
+    series.estender(incremental, correcao)
+
+    esperado = pd.concat([df, nova, correcao], ignore_index=True)
+    series.gravar(completo, esperado)
+    trechos_inc, datas_inc = series.ler_trechos(incremental)
+    trechos_comp, datas_comp = series.ler_trechos(completo)
+    assert datas_inc.equals(datas_comp)
+    pdt.assert_frame_equal(trechos_inc, trechos_comp)
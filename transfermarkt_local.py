@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import resultados
+
+# Servidor HTTP local no lugar do Transfermarkt, para testar a raspagem sem depender do site:
+# responde às mesmas URLs de página de jogos (resultados.url_jogos) das quatro ligas, com latência,
+# erros e variações de layout configuráveis. Cada página vem, por ordem de preferência, de:
+# - uma página gravada do site (python transfermarkt_local.py --gravar), servida como está;
+# - com guardados=True, os resultados guardados localmente (resultados.py);
+# - uma temporada sintética reprodutível (20 times, turno e returno).
+PORTA = 8765
+PASTA_GRAVACOES = os.path.join(os.environ.get('BETS_PASTA_DADOS', 'data_bets'), 'transfermarkt')
+N_TIMES = 20
+# Rodadas já jogadas na temporada em andamento das temporadas sintéticas
+RODADAS_JOGADAS = 19
+# 'quebrado' troca a classe do título das rodadas: a página chega, mas o parser não acha nenhum jogo
+LAYOUTS = ['padrao', 'sem_posicao', 'placar_link', 'quebrado']
+INICIO_TEMPORADA = {'BRA1': '04-13', 'BRA2': '04-19', 'MLS1': '02-22', 'GB1': '08-16'}
+DIAS_SEMANA = {
+    'br': ['seg.', 'ter.', 'qua.', 'qui.', 'sex.', 'sáb.', 'dom.'],
+    'uk': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+}
+CONFIG_PADRAO = {
+    'latencia_ms': 0.0,
+    'variacao_ms': 0.0,
+    # Fração das respostas com erro 5xx e com 429 (limite de requisições)
+    'erros': 0.0,
+    'limite': 0.0,
+    'layouts': ['padrao'],
+    'jogadas': RODADAS_JOGADAS,
+    'semente': 0,
+    # Servir os resultados guardados em resultados.py (no mesmo processo do app/teste, seria a própria base dele)
+    'guardados': False,
+}
+
+
+def caminho_gravacao(liga, temporada):
+    return os.path.join(PASTA_GRAVACOES, f'liga={resultados.nome_liga(liga)}', f'temporada={temporada}.html')
+
+
+def _liga_do_codigo(codigo):
+    return next((liga for liga, config in resultados.LIGAS.items() if config['codigo'] == codigo), None)
+
+
+def _tabela(n_times):
+    # Turno pelo método do círculo; o returno inverte os mandos
+    rotacao, rodadas = list(range(n_times)), []
+    for r in range(n_times - 1):
+        pares = [(rotacao[i], rotacao[n_times - 1 - i]) for i in range(n_times // 2)]
+        rodadas.append(pares if r % 2 == 0 else [(b, a) for a, b in pares])
+        rotacao = [rotacao[0], rotacao[-1]] + rotacao[1:-1]
+    return rodadas + [[(b, a) for a, b in pares] for pares in rodadas]
+
+
+def temporada_sintetica(liga, temporada, jogadas=RODADAS_JOGADAS, semente=0):
+    """Temporada no formato de resultados.py: gols de Poisson com força própria de cada time."""
+    codigo = resultados.LIGAS[liga]['codigo']
+    rng = np.random.default_rng([semente, temporada, sum(map(ord, codigo))])
+    times = [f'{codigo} Clube {i + 1:02d}' for i in range(N_TIMES)]
+    ataque, defesa = rng.normal(0, 0.25, N_TIMES), rng.normal(0, 0.2, N_TIMES)
+    # Temporadas passadas terminaram; a em andamento tem só as primeiras `jogadas` rodadas
+    jogadas = jogadas if temporada >= resultados.LIGAS[liga]['temporada'] else 2 * (N_TIMES - 1)
+    inicio = pd.Timestamp(f"{temporada}-{INICIO_TEMPORADA.get(codigo, '04-01')}")
+    linhas = []
+    for rodada, pares in enumerate(_tabela(N_TIMES), 1):
+        dia = inicio + pd.Timedelta(days=7 * (rodada - 1))
+        for k, (casa, fora) in enumerate(pares):
+            quando = dia + pd.Timedelta(days=k % 2)
+            jogou = rodada <= jogadas
+            linhas.append({
+                'rodada': rodada, 'data': quando, 'hora': ['16:00', '18:30', '21:00'][k % 3],
+                'casa': times[casa], 'fora': times[fora],
+                'gols_casa': int(rng.poisson(np.exp(0.35 + ataque[casa] - defesa[fora]))) if jogou else None,
+                'gols_fora': int(rng.poisson(np.exp(0.1 + ataque[fora] - defesa[casa]))) if jogou else None,
+            })
+    df = pd.DataFrame(linhas)
+    dias = DIAS_SEMANA['br' if resultados.LIGAS[liga]['dominio'].endswith('.br') else 'uk']
+    df['data'] = [f"{dias[d.weekday()]} {d:%d/%m/%y}" for d in df['data']]
+    return df
+
+
+def renderizar(jogos, de=None, ate=None, layout='padrao'):
+    """Página de jogos no layout do Transfermarkt (o que resultados.interpretar_pagina lê)."""
+    de = jogos['rodada'].min() if de is None else de
+    ate = jogos['rodada'].max() if ate is None else ate
+    classe = 'box-titel' if layout == 'quebrado' else 'content-box-headline'
+    partes = ['<html><head><meta charset="utf-8"></head><body><div class="large-8 columns">']
+    for rodada, df in jogos[jogos['rodada'].between(de, ate)].groupby('rodada', sort=True):
+        partes.append(f'<div class="box"><div class="{classe}">{rodada}.Rodada</div><table><tbody>')
+        ultima_data = ultima_hora = None
+        for posicao, jogo in enumerate(df.itertuples(index=False), 1):
+            # Como no site: data e hora só aparecem quando mudam
+            data = '' if jogo.data == ultima_data else jogo.data
+            hora = '' if (jogo.hora, jogo.data) == (ultima_hora, ultima_data) else jogo.hora
+            ultima_data, ultima_hora = jogo.data, jogo.hora
+            jogado = pd.notna(jogo.gols_casa)
+            placar = f'{int(jogo.gols_casa)}:{int(jogo.gols_fora)}' if jogado else '-:-'
+            if layout == 'placar_link':
+                placar = f'<a class="ergebnis-link" href="/spielbericht/index/spielbericht/{rodada}{posicao}"><span>{placar}</span></a>'
+            casa, fora = jogo.casa, jogo.fora
+            if layout != 'sem_posicao':
+                casa, fora = f'({posicao}.) {casa}', f'{fora} ({posicao + 10}.)'
+            partes.append(
+                f'<tr><td class="hide-for-small">{data}</td><td class="zentriert hide-for-small">{hora}</td>'
+                f'<td class="text-right no-border-rechts hauptlink">{casa}</td><td class="zentriert no-border-links"></td>'
+                f'<td class="zentriert hauptlink">{placar}</td><td class="zentriert no-border-rechts"></td>'
+                f'<td class="no-border-links hauptlink">{fora}</td><td class="zentriert"></td></tr>'
+            )
+        partes.append('</tbody></table></div>')
+    partes.append('</div></body></html>')
+    return ''.join(partes).encode('utf-8')
+
+
+class _Tratador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _responder(self, status, corpo, tipo='text/html; charset=utf-8', cabecalhos=None):
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _json(self, dados):
+        self._responder(200, json.dumps(dados, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def do_GET(self):
+        servidor = self.server
+        url = urllib.parse.urlparse(self.path)
+        parametros = dict(urllib.parse.parse_qsl(url.query))
+        if url.path == '/_config':
+            servidor.configurar(**parametros)
+            return self._json(servidor.config)
+        if url.path == '/_estatisticas':
+            return self._json(servidor.estatisticas())
+
+        liga = _liga_do_codigo(url.path.rstrip('/').rsplit('/', 1)[-1])
+        if liga is None or 'saison_id' not in parametros:
+            servidor.contar('404')
+            return self._responder(404, b'nao encontrado')
+        config, sorteio = servidor.config, servidor.sortear()
+        espera = config['latencia_ms'] + config['variacao_ms'] * sorteio['variacao']
+        time.sleep(max(espera, 0) / 1000)
+        if sorteio['erro'] < config['erros']:
+            servidor.contar('503')
+            return self._responder(503, b'indisponivel')
+        if sorteio['limite'] < config['limite']:
+            servidor.contar('429')
+            return self._responder(429, b'muitas requisicoes', cabecalhos={'Retry-After': '0'})
+
+        layout = parametros.get('layout') or config['layouts'][sorteio['layout'] % len(config['layouts'])]
+        de, ate = parametros.get('spieltagVon'), parametros.get('spieltagBis')
+        corpo = servidor.pagina(liga, int(parametros['saison_id']), de and int(de), ate and int(ate), layout)
+        servidor.contar('200', layout)
+        self._responder(200, corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorTransfermarkt(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, **config):
+        super().__init__(endereco, _Tratador)
+        self.config = dict(CONFIG_PADRAO)
+        self._trava = threading.Lock()
+        self._contagem = {}
+        self._temporadas = {}
+        self._rng = np.random.default_rng(self.config['semente'])
+        self.configurar(**config)
+
+    @property
+    def url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def configurar(self, **config):
+        for chave, valor in config.items():
+            if chave == 'layouts':
+                valor = valor.split(',') if isinstance(valor, str) else list(valor)
+            elif chave in ('jogadas', 'semente'):
+                valor = int(valor)
+            elif chave == 'guardados':
+                valor = str(valor).lower() in ('1', 'true', 'sim')
+            elif chave in CONFIG_PADRAO:
+                valor = float(valor)
+            else:
+                continue
+            self.config[chave] = valor
+        with self._trava:
+            if {'jogadas', 'semente', 'guardados'} & set(config):
+                self._temporadas.clear()
+            if 'semente' in config:
+                self._rng = np.random.default_rng(self.config['semente'])
+
+    def sortear(self):
+        with self._trava:
+            return {
+                'variacao': self._rng.uniform(-1, 1), 'erro': self._rng.random(), 'limite': self._rng.random(),
+                'layout': int(self._rng.integers(0, 1 << 30)),
+            }
+
+    def contar(self, status, layout=None):
+        with self._trava:
+            self._contagem[status] = self._contagem.get(status, 0) + 1
+            if layout:
+                self._contagem[f'layout:{layout}'] = self._contagem.get(f'layout:{layout}', 0) + 1
+
+    def estatisticas(self):
+        with self._trava:
+            return dict(self._contagem)
+
+    def pagina(self, liga, temporada, de, ate, layout):
+        gravada = caminho_gravacao(liga, temporada)
+        if os.path.exists(gravada):
+            # Página gravada vai inteira: quem pediu um intervalo de rodadas filtra do lado dele
+            with open(gravada, 'rb') as f:
+                return f.read()
+        chave = (liga, temporada)
+        with self._trava:
+            jogos = self._temporadas.get(chave)
+        if jogos is None:
+            jogos = resultados.carregar_temporada(liga, temporada) if self.config['guardados'] else None
+            if jogos is None:
+                jogos = temporada_sintetica(liga, temporada, self.config['jogadas'], self.config['semente'])
+            with self._trava:
+                self._temporadas[chave] = jogos
+        return renderizar(jogos, de, ate, layout)
+
+
+def iniciar(porta=0, host='127.0.0.1', **config):
+    """Sobe o servidor numa thread (porta 0 = qualquer livre); a URL fica em `servidor.url`."""
+    servidor = ServidorTransfermarkt((host, porta), **config)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def gravar(liga, temporada):
+    """Grava a página de jogos da temporada direto do site (precisa de acesso à internet)."""
+    sessao = resultados.nova_sessao()
+    resposta = sessao.get(resultados.url_jogos(liga, temporada), headers=resultados.CABECALHO,
+                          timeout=resultados.TIMEOUT_S)
+    resposta.raise_for_status()
+    caminho = caminho_gravacao(liga, temporada)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho + '.tmp', 'wb') as f:
+        f.write(resposta.content)
+    os.replace(caminho + '.tmp', caminho)
+    return caminho
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor local no lugar do Transfermarkt.')
+    parser.add_argument('--porta', type=int, default=PORTA)
+    parser.add_argument('--latencia-ms', type=float, default=0.0)
+    parser.add_argument('--variacao-ms', type=float, default=0.0, help='Latência sorteada em ± este valor')
+    parser.add_argument('--erros', type=float, default=0.0, help='Fração de respostas 503')
+    parser.add_argument('--limite', type=float, default=0.0, help='Fração de respostas 429')
+    parser.add_argument('--layouts', default='padrao', help=f'Sorteados entre: {",".join(LAYOUTS)}')
+    parser.add_argument('--jogadas', type=int, default=RODADAS_JOGADAS,
+                        help='Rodadas jogadas na temporada atual das ligas sintéticas')
+    parser.add_argument('--guardados', action='store_true',
+                        help='Serve os resultados guardados localmente quando houver (senão, temporadas sintéticas)')
+    parser.add_argument('--gravar', action='store_true', help='Grava as páginas reais das ligas e sai')
+    parser.add_argument('--temporadas', nargs='*', type=int, help='Com --gravar; padrão: a temporada atual')
+    args = parser.parse_args()
+
+    if args.gravar:
+        for liga, config in resultados.LIGAS.items():
+            for temporada in args.temporadas or [config['temporada']]:
+                print(f'📁 {liga} {temporada}: {gravar(liga, temporada)}')
+    else:
+        servidor = ServidorTransfermarkt(('127.0.0.1', args.porta), latencia_ms=args.latencia_ms,
+                                         variacao_ms=args.variacao_ms, erros=args.erros, limite=args.limite,
+                                         layouts=args.layouts, jogadas=args.jogadas,
+                                         guardados=args.guardados)
+        print(f'✅ Transfermarkt local em {servidor.url} (use BETS_URL_BASE={servidor.url})')
+        servidor.serve_forever()